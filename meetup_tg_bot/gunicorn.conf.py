@@ -0,0 +1,45 @@
+"""Настройки gunicorn для сервиса web; gunicorn читает этот файл из рабочего каталога.
+
+`WEB_SERVER_MODE=asgi` запускает uvicorn-воркеры вместо sync (в режиме webhook это
+режим по умолчанию), число воркеров подбирается по числу ядер (`meetuptg_bot.server`),
+`WEB_CONCURRENCY` задаёт его явно (в режиме webhook больше одного воркера нельзя).
+"""
+import os
+
+from environs import Env, validate
+from prometheus_client import multiprocess
+
+from meetuptg_bot.server import (
+    APPLICATIONS,
+    ASGI,
+    WORKER_CLASSES,
+    available_cpus,
+    check_webhook_workers,
+    default_mode,
+    worker_count,
+)
+
+env = Env()
+env.read_env()
+
+bot_mode = env.str('TELEGRAM_BOT_MODE', 'polling')
+mode = env.str('WEB_SERVER_MODE', default_mode(bot_mode), validate=validate.OneOf(APPLICATIONS))
+
+wsgi_app = APPLICATIONS[mode]
+worker_class = WORKER_CLASSES[mode]
+if mode == ASGI:
+    # синхронный код ASGI-запросов идёт в разных потоках, и постоянные соединения копились
+    # бы по одному на поток; воркеры читают настройки Django уже с этой переменной
+    os.environ.setdefault('DB_CONN_MAX_AGE', '0')
+workers = env.int('WEB_CONCURRENCY', 0) or worker_count(mode, available_cpus(), webhook=bot_mode == 'webhook')
+if bot_mode == 'webhook':
+    check_webhook_workers(workers)
+bind = env.str('WEB_BIND', '0.0.0.0:8000')
+# соединения от nginx и Telegram держим открытыми между запросами
+keepalive = 5
+
+
+def child_exit(server, worker):
+    # живые gauge умершего воркера иначе остаются в каталоге метрик и попадают в выдачу
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        multiprocess.mark_process_dead(worker.pid)
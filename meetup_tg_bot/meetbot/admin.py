@@ -1,20 +1,90 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.db.models import Q
 
 from .models import (
+    Broadcast,
+    BroadcastStatus,
     Donation,
+    DonationStatus,
     Event,
+    EventStats,
     NetworkingMatch,
     NetworkingProfile,
+    OutboxMessage,
     Participant,
     Place,
     Question,
+    QuestionStatus,
     Subscription,
     Talk,
 )
+from .outbox import retry_failed
+from .program import switch_current_talk
+from .search import (
+    fulltext_query,
+    fulltext_vector,
+    matching_participants,
+    uses_search_indexes,
+    words_filter,
+)
+from .stats import acceptance_rate, refresh_event_stats
+
+
+class RelatedAdmin(admin.ModelAdmin):
+    """Подтягивает связи из `list_select_related` во всех запросах админки.
+
+    `ChangeList` применяет `list_select_related` только к списку, а
+    автодополнение и страница объекта берут `get_queryset` напрямую — без
+    этого `__str__`, который ходит по связям, делает запрос на каждую строку.
+    Внешние ключи на большие таблицы выбираются через `autocomplete_fields`,
+    чтобы форма не строила `<select>` со всеми строками.
+    """
+
+    list_select_related = ()
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        if self.list_select_related:
+            queryset = queryset.select_related(*self.list_select_related)
+        return queryset
+
+
+class IndexedSearchMixin:
+    """Поиск, который на Postgres идёт по индексам (см. `meetbot.search`).
+
+    `participant_lookups` — пути к `Participant`, участники ищутся одним
+    подзапросом по триграммным индексам; `fulltext_field` — поле с
+    полнотекстовым индексом; `plain_search_fields` — поля небольших таблиц,
+    где хватает `icontains`. `search_fields` по-прежнему нужны: по ним Django
+    показывает строку поиска и разрешает автодополнение.
+    """
+
+    participant_lookups = ()
+    fulltext_field = None
+    plain_search_fields = ()
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        condition = Q()
+        if self.participant_lookups:
+            participants = matching_participants(search_term)
+            for lookup in self.participant_lookups:
+                condition |= Q(**{f'{lookup}__in': participants})
+        if self.plain_search_fields:
+            condition |= words_filter(search_term, self.plain_search_fields)
+        if self.fulltext_field and uses_search_indexes():
+            queryset = queryset.alias(search_document=fulltext_vector(self.fulltext_field))
+            condition |= Q(search_document=fulltext_query(search_term))
+        elif self.fulltext_field:
+            condition |= words_filter(search_term, (self.fulltext_field,))
+        # подзапросы не размножают строки, distinct не нужен
+        return queryset.filter(condition), False
 
 
 @admin.register(Participant)
-class ParticipantAdmin(admin.ModelAdmin):
+class ParticipantAdmin(IndexedSearchMixin, admin.ModelAdmin):
     list_display = (
         'id',
         'first_name',
@@ -25,6 +95,7 @@ class ParticipantAdmin(admin.ModelAdmin):
         'created_at',
     )
     search_fields = ('first_name', 'last_name', 'tg_username', 'tg_id')
+    participant_lookups = ('pk',)
     list_filter = ('is_speaker', 'is_organizer', 'wants_notifications')
     readonly_fields = ('created_at', 'updated_at')
 
@@ -35,8 +106,22 @@ class PlaceAdmin(admin.ModelAdmin):
     search_fields = ('name', 'address')
 
 
+class EventAdminForm(forms.ModelForm):
+    class Meta:
+        model = Event
+        fields = '__all__'
+
+    def clean_current_talk(self):
+        talk = self.cleaned_data['current_talk']
+        # автодополнение предлагает доклады всех мероприятий
+        if talk is not None and talk.event_id != self.instance.pk:
+            raise forms.ValidationError('Доклад относится к другому мероприятию.')
+        return talk
+
+
 @admin.register(Event)
-class EventAdmin(admin.ModelAdmin):
+class EventAdmin(RelatedAdmin):
+    form = EventAdminForm
     list_display = (
         'id',
         'name',
@@ -47,12 +132,25 @@ class EventAdmin(admin.ModelAdmin):
         'is_published',
     )
     list_filter = ('is_active', 'is_published', 'place')
+    list_select_related = ('place',)
+    autocomplete_fields = ('place', 'current_talk')
     search_fields = ('name',)
     readonly_fields = ('created_at', 'updated_at')
+    actions = ('refresh_stats',)
+
+    @admin.action(description='Пересчитать статистику')
+    def refresh_stats(self, request, queryset):
+        count = refresh_event_stats(queryset.values_list('pk', flat=True))
+        self.message_user(request, f'Статистика пересчитана для мероприятий: {count}.')
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if 'current_talk' in form.changed_data:
+            switch_current_talk(obj.pk, obj.current_talk_id)
 
 
 @admin.register(Talk)
-class TalkAdmin(admin.ModelAdmin):
+class TalkAdmin(IndexedSearchMixin, RelatedAdmin):
     list_display = (
         'id',
         'title',
@@ -63,24 +161,52 @@ class TalkAdmin(admin.ModelAdmin):
         'is_current',
     )
     list_filter = ('status', 'is_current', 'event')
+    list_select_related = ('event', 'speaker')
+    autocomplete_fields = ('event', 'speaker')
     search_fields = ('title', 'speaker__first_name', 'speaker__last_name', 'speaker__tg_username')
+    participant_lookups = ('speaker',)
+    plain_search_fields = ('title',)
     ordering = ('event', 'order', 'start_at')
     readonly_fields = ('created_at', 'updated_at')
+    actions = ('make_current',)
+
+    def save_model(self, request, obj, form, change):
+        make_current = 'is_current' in form.changed_data and obj.is_current
+        # флаг выставит switch_current_talk, сняв его с предыдущего доклада
+        obj.is_current = obj.is_current and not make_current
+        super().save_model(request, obj, form, change)
+        if 'is_current' in form.changed_data:
+            switch_current_talk(obj.event_id, obj.pk if make_current else None)
+            obj.is_current = make_current
+
+    @admin.action(description='Сделать текущим докладом')
+    def make_current(self, request, queryset):
+        talks = list(queryset[:2])
+        if len(talks) != 1:
+            self.message_user(request, 'Выберите один доклад.', messages.WARNING)
+            return
+        switch_current_talk(talks[0].event_id, talks[0].pk)
 
 
 @admin.register(Question)
-class QuestionAdmin(admin.ModelAdmin):
-    list_display = ('id', 'talk', 'author', 'status', 'asked_at')
+class QuestionAdmin(IndexedSearchMixin, RelatedAdmin):
+    list_display = ('id', 'talk', 'author', 'status', 'delivery_attempts', 'asked_at')
     list_filter = ('status', 'talk__event')
+    list_select_related = ('talk__event', 'author')
+    autocomplete_fields = ('talk', 'author')
     search_fields = ('text', 'author__first_name', 'author__last_name', 'author__tg_username')
-    readonly_fields = ('asked_at', 'answered_at')
+    participant_lookups = ('author',)
+    fulltext_field = 'text'
+    readonly_fields = ('asked_at', 'answered_at', 'delivery_attempts')
     ordering = ('-asked_at',)
 
 
 @admin.register(NetworkingProfile)
-class NetworkingProfileAdmin(admin.ModelAdmin):
+class NetworkingProfileAdmin(IndexedSearchMixin, RelatedAdmin):
     list_display = ('id', 'participant', 'event', 'role', 'is_active', 'created_at')
     list_filter = ('event', 'is_active')
+    list_select_related = ('participant', 'event')
+    autocomplete_fields = ('participant', 'event')
     search_fields = (
         'participant__first_name',
         'participant__last_name',
@@ -88,39 +214,153 @@ class NetworkingProfileAdmin(admin.ModelAdmin):
         'role',
         'stack',
     )
+    participant_lookups = ('participant',)
+    plain_search_fields = ('role', 'stack')
     readonly_fields = ('created_at', 'updated_at')
 
 
 @admin.register(NetworkingMatch)
-class NetworkingMatchAdmin(admin.ModelAdmin):
+class NetworkingMatchAdmin(IndexedSearchMixin, RelatedAdmin):
     list_display = ('id', 'event', 'source_profile', 'target_profile', 'status', 'created_at')
     list_filter = ('status', 'event')
+    list_select_related = ('event', 'source_profile__participant', 'target_profile__participant')
+    autocomplete_fields = ('event', 'source_profile', 'target_profile')
     search_fields = (
         'source_profile__participant__tg_username',
         'target_profile__participant__tg_username',
     )
+    participant_lookups = ('source_profile__participant', 'target_profile__participant')
     readonly_fields = ('created_at', 'responded_at')
 
 
 @admin.register(Donation)
-class DonationAdmin(admin.ModelAdmin):
+class DonationAdmin(IndexedSearchMixin, RelatedAdmin):
     list_display = ('id', 'event', 'participant', 'amount', 'currency', 'status', 'created_at')
     list_filter = ('status', 'currency', 'event')
+    list_select_related = ('event', 'participant')
+    autocomplete_fields = ('event', 'participant')
     search_fields = (
         'participant__first_name',
         'participant__last_name',
         'participant__tg_username',
     )
+    participant_lookups = ('participant',)
     readonly_fields = ('created_at',)
 
 
 @admin.register(Subscription)
-class SubscriptionAdmin(admin.ModelAdmin):
+class SubscriptionAdmin(IndexedSearchMixin, RelatedAdmin):
     list_display = ('id', 'participant', 'event', 'subscription_type', 'is_active', 'created_at')
     list_filter = ('subscription_type', 'is_active', 'event')
+    list_select_related = ('participant', 'event')
+    autocomplete_fields = ('participant', 'event')
     search_fields = (
         'participant__first_name',
         'participant__last_name',
         'participant__tg_username',
     )
+    participant_lookups = ('participant',)
     readonly_fields = ('created_at',)
+
+
+@admin.register(Broadcast)
+class BroadcastAdmin(RelatedAdmin):
+    list_display = (
+        'id',
+        'event',
+        'subscription_type',
+        'status',
+        'sent_count',
+        'failed_count',
+        'created_at',
+    )
+    list_filter = ('status', 'subscription_type', 'event')
+    list_select_related = ('event',)
+    autocomplete_fields = ('event',)
+    search_fields = ('text',)
+    readonly_fields = (
+        'last_participant_id',
+        'sent_count',
+        'failed_count',
+        'claimed_by',
+        'lease_until',
+        'created_at',
+        'started_at',
+        'finished_at',
+    )
+    actions = ('cancel_broadcasts',)
+
+    @admin.action(description='Остановить рассылку')
+    def cancel_broadcasts(self, request, queryset):
+        queryset.filter(
+            status__in=[BroadcastStatus.PENDING, BroadcastStatus.RUNNING],
+        ).update(status=BroadcastStatus.CANCELLED)
+
+
+@admin.register(EventStats)
+class EventStatsAdmin(RelatedAdmin):
+    """Сводка по мероприятиям: только чтение готовых строк `EventStats`."""
+
+    list_display = (
+        'event',
+        'questions_total',
+        'questions_answered',
+        'donations_succeeded',
+        'matches_total',
+        'match_acceptance',
+        'refreshed_at',
+    )
+    list_select_related = ('event',)
+    ordering = ('-event__start_at',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    @admin.display(description='Вопросов')
+    def questions_total(self, obj):
+        return sum(obj.question_counts.values())
+
+    @admin.display(description='Отвечено')
+    def questions_answered(self, obj):
+        return obj.question_counts.get(QuestionStatus.ANSWERED, 0)
+
+    @admin.display(description='Донаты (успешные)')
+    def donations_succeeded(self, obj):
+        totals = [
+            f'{total["amount"]} {total["currency"]}'
+            for total in obj.donation_totals
+            if total['status'] == DonationStatus.SUCCEEDED
+        ]
+        return ', '.join(totals) or '—'
+
+    @admin.display(description='Знакомств')
+    def matches_total(self, obj):
+        return sum(obj.match_counts.values())
+
+    @admin.display(description='Приняли знакомство')
+    def match_acceptance(self, obj):
+        rate = acceptance_rate(obj.match_counts)
+        return '—' if rate is None else f'{rate:.0%}'
+
+
+@admin.register(OutboxMessage)
+class OutboxMessageAdmin(admin.ModelAdmin):
+    list_display = ('id', 'topic', 'object_id', 'attempts', 'failed_at', 'created_at')
+    list_filter = ('topic', ('failed_at', admin.EmptyFieldListFilter))
+    readonly_fields = ('topic', 'object_id', 'attempts', 'failed_at', 'created_at')
+    actions = ('retry',)
+
+    def has_add_permission(self, request):
+        # сообщения пишут сигналы моделей в транзакции правки
+        return False
+
+    @admin.action(description='Вернуть в очередь бота')
+    def retry(self, request, queryset):
+        count = retry_failed(queryset.values_list('pk', flat=True))
+        self.message_user(request, f'Возвращено в очередь: {count}.')
@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class MeetbotConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'meetbot'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from . import signals  # noqa: F401
+        from .metrics import instrument_connection
+
+        connection_created.connect(instrument_connection, dispatch_uid='meetbot.metrics')
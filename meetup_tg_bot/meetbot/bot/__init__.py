@@ -1,4 +1,10 @@
-from .runner import run_bot
-from .runner import build_application
-
 __all__ = ['run_bot', 'build_application']
+
+
+def __getattr__(name):
+    # runner импортирует модели, а пакет загружается и до django.setup() (python -m meetbot.bot)
+    if name in __all__:
+        from . import runner
+
+        return getattr(runner, name)
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
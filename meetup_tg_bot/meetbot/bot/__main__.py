@@ -0,0 +1,41 @@
+"""Быстрый запуск бота: `python -m meetbot.bot`.
+
+В отличие от `manage.py runbot`, здесь не загружаются админка, сессии и
+статика (боту нужны только модели `meetbot`) и не выполняются системные
+проверки Django — они импортируют URLconf и всю админку. numpy для подбора
+собеседников подгружается при первом обращении. Прогрев кешей и расписания
+идёт в фоне, когда бот уже принимает апдейты (`meetbot.bot.warmup`).
+"""
+import logging
+import os
+
+BOT_APPS = ['meetbot.apps.MeetbotConfig']
+
+logger = logging.getLogger('meetbot.bot')
+
+
+def setup() -> None:
+    """`django.setup()` только с приложениями бота."""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'meetuptg_bot.settings')
+
+    import django
+    from django.conf import settings
+
+    settings.INSTALLED_APPS = BOT_APPS
+    django.setup()
+
+
+def main() -> None:
+    setup()
+
+    from .runner import run_bot
+
+    try:
+        run_bot()
+    except Exception:
+        logger.exception('Bot crashed')
+        raise
+
+
+if __name__ == '__main__':
+    main()
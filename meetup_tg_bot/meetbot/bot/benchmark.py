@@ -0,0 +1,248 @@
+"""Синтетическая нагрузка на бота для оценки мощности перед митапом.
+
+Приложение собирается обычным `build_application`, но вместо Telegram
+отвечает `FakeBotApi`. Каждый синтетический пользователь проходит сценарий
+(`/start`, меню, вопрос спикеру, знакомства) строго по очереди, как живой
+человек; разные пользователи работают одновременно, но не больше
+`concurrency` апдейтов сразу — как `ChatOrderedUpdateProcessor` в бою.
+
+Задержка — время `Application.process_update`, то есть всех обработчиков
+апдейта вместе с ожиданием пула БД и ответа Bot API. Запросы к БД
+считаются на всех соединениях процесса, включая фоновые записи (вопросы,
+участники, состояние диалогов), и делятся на число апдейтов.
+"""
+import asyncio
+import logging
+import math
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Any
+
+from django.db.backends.signals import connection_created
+from django.utils import timezone
+from telegram import Update
+from telegram.ext import ContextTypes
+
+from meetbot.matching import match_indexes
+from meetbot.models import Event, Participant, Place, Talk
+from meetbot.program import invalidate_caches, switch_current_talk
+
+from .db import run_db
+from .fake_telegram import FakeBotApi, FakeTelegramSender
+from .handlers import CALLBACK_NETWORKING, CALLBACK_PROGRAM, CALLBACK_QUESTION, CALLBACK_SUBSCRIBE
+from .identity import participant_directory
+from .runner import build_application
+from .warmup import wait_for_warmup
+
+logger = logging.getLogger(__name__)
+
+BENCHMARK_TOKEN = '123:BENCHMARK'
+
+# tg_id синтетических пользователей, чтобы не пересекаться со спикерами
+FIRST_USER_ID = 10_000_000
+
+
+@dataclass(frozen=True)
+class Step:
+    kind: str
+    data: str
+
+    def update(self, sender: FakeTelegramSender, user_id: int) -> dict[str, Any]:
+        if self.kind == 'callback':
+            return sender.callback(user_id, self.data)
+        return sender.message(user_id, self.data)
+
+    @property
+    def label(self) -> str:
+        return self.data if self.kind == 'callback' or self.data.startswith('/') else 'question_text'
+
+
+def user_script(questions: int = 1) -> list[Step]:
+    """Сценарий одного участника: открыть меню, посмотреть программу, задать вопросы, познакомиться."""
+    steps = [Step('message', '/start'), Step('callback', CALLBACK_PROGRAM)]
+    for number in range(1, questions + 1):
+        steps += [Step('callback', CALLBACK_QUESTION), Step('message', f'Вопрос номер {number}: что с GIL?')]
+    steps += [Step('callback', CALLBACK_NETWORKING), Step('callback', CALLBACK_SUBSCRIBE)]
+    return steps
+
+
+def seed_benchmark_event(talks: int = 3) -> Event:
+    """Активное мероприятие с программой и текущим докладом, чтобы обработчики шли по полному пути."""
+    now = timezone.now()
+    place = Place.objects.create(name='Бенчмарк', address='localhost')
+    speaker = Participant.objects.create(tg_id=FIRST_USER_ID - 1, first_name='Спикер', is_speaker=True)
+    event = Event.objects.create(
+        name='Benchmark Meetup',
+        place=place,
+        start_at=now,
+        end_at=now + timedelta(hours=3),
+        is_active=True,
+    )
+    created = Talk.objects.bulk_create(
+        Talk(
+            event=event,
+            title=f'Доклад {number}',
+            speaker=speaker,
+            order=number,
+            start_at=now + timedelta(minutes=40 * number),
+            end_at=now + timedelta(minutes=40 * number + 30),
+        )
+        for number in range(talks)
+    )
+    switch_current_talk(event.pk, created[0].pk)
+    return event
+
+
+class QueryCounter:
+    """Считает SQL-запросы на всех соединениях, открытых после `install`."""
+
+    def __init__(self):
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        with self._lock:
+            self.count += 1
+        return execute(sql, params, many, context)
+
+    def _on_connection_created(self, sender, connection, **kwargs) -> None:
+        # соединение в потоке пула переоткрывается тем же объектом, обёртку ставим один раз
+        if self not in connection.execute_wrappers:
+            connection.execute_wrappers.append(self)
+
+    def install(self) -> None:
+        connection_created.connect(self._on_connection_created, dispatch_uid=id(self))
+
+    def uninstall(self) -> None:
+        connection_created.disconnect(dispatch_uid=id(self))
+
+
+def percentile(values: list[float], percent: float) -> float:
+    """Перцентиль по методу ближайшего ранга; 0 для пустого списка."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(math.ceil(percent / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+@dataclass
+class BenchmarkResult:
+    users: int
+    updates: int
+    duration: float
+    queries: int
+    api_calls: int
+    errors: int
+    latencies: dict[str, list[float]] = field(default_factory=dict)
+
+    @property
+    def all_latencies(self) -> list[float]:
+        return [value for values in self.latencies.values() for value in values]
+
+    @property
+    def throughput(self) -> float:
+        return self.updates / self.duration if self.duration else 0.0
+
+    @property
+    def queries_per_update(self) -> float:
+        return self.queries / self.updates if self.updates else 0.0
+
+    @property
+    def api_calls_per_update(self) -> float:
+        return self.api_calls / self.updates if self.updates else 0.0
+
+    def as_dict(self) -> dict[str, Any]:
+        latencies = self.all_latencies
+        return {
+            'users': self.users,
+            'updates': self.updates,
+            'duration_s': round(self.duration, 3),
+            'throughput_per_s': round(self.throughput, 1),
+            'latency_ms': {
+                f'p{percent}': round(percentile(latencies, percent) * 1000, 2) for percent in (50, 95, 99)
+            } | {'max': round(max(latencies, default=0) * 1000, 2)},
+            'latency_p95_ms_by_step': {
+                label: round(percentile(values, 95) * 1000, 2) for label, values in sorted(self.latencies.items())
+            },
+            'db_queries': self.queries,
+            'db_queries_per_update': round(self.queries_per_update, 2),
+            'api_calls_per_update': round(self.api_calls_per_update, 2),
+            'errors': self.errors,
+        }
+
+
+async def run_benchmark(
+    users: int,
+    concurrency: int,
+    questions: int = 1,
+    api_latency: float = 0.0,
+) -> BenchmarkResult:
+    """Прогоняет `users` синтетических пользователей через бота и собирает метрики.
+
+    Данные для сценария (`seed_benchmark_event`) должны быть в базе заранее.
+    """
+    api = FakeBotApi(latency=api_latency)
+    sender = FakeTelegramSender()
+    application = build_application(BENCHMARK_TOKEN, request=api)
+    errors = 0
+
+    async def count_error(update: object, context: ContextTypes.DEFAULT_TYPE) -> None:
+        nonlocal errors
+        errors += 1
+        logger.error('Handler failed during benchmark', exc_info=context.error)
+
+    application.add_error_handler(count_error)
+    latencies: dict[str, list[float]] = defaultdict(list)
+    slots = asyncio.Semaphore(concurrency)
+    script = user_script(questions)
+
+    async def play(user_id: int) -> None:
+        for step in script:
+            update = Update.de_json(step.update(sender, user_id), application.bot)
+            async with slots:
+                started = time.perf_counter()
+                await application.process_update(update)
+                latencies[step.label].append(time.perf_counter() - started)
+
+    counter = QueryCounter()
+    counter.install()
+    # кеши процесса не должны помнить строки из другой базы
+    participant_directory.forget()
+    match_indexes.invalidate()
+    await run_db(invalidate_caches)
+    try:
+        await application.initialize()
+        try:
+            if application.post_init:
+                await application.post_init(application)
+            # меряем работу под нагрузкой, а не прогрев кешей
+            await wait_for_warmup()
+            api.calls.clear()
+            counter.count = 0
+            started = time.perf_counter()
+            await asyncio.gather(*(play(FIRST_USER_ID + number) for number in range(users)))
+            duration = time.perf_counter() - started
+        finally:
+            # отложенные записи (вопросы, состояние) тоже нагрузка от этих апдейтов;
+            # фоновые задачи бота останавливаются и если сценарий упал
+            if application.post_stop:
+                await application.post_stop(application)
+            await application.shutdown()
+            if application.post_shutdown:
+                await application.post_shutdown(application)
+    finally:
+        counter.uninstall()
+
+    return BenchmarkResult(
+        users=users,
+        updates=users * len(script),
+        duration=duration,
+        queries=counter.count,
+        api_calls=len(api.calls),
+        errors=errors,
+        latencies=dict(latencies),
+    )
@@ -0,0 +1,337 @@
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Q
+from django.utils import timezone
+from telegram import Bot
+from telegram.error import BadRequest, Forbidden, NetworkError, RetryAfter
+from telegram.ext import Application
+
+from meetbot.models import (
+    Broadcast,
+    BroadcastStatus,
+    Participant,
+    Subscription,
+    SubscriptionType,
+)
+from meetbot.program import announce_events
+
+from .db import run_db
+
+logger = logging.getLogger(__name__)
+
+MAX_SEND_ATTEMPTS = 5
+NETWORK_RETRY_DELAY = 2.0
+
+
+class RateLimiter:
+    """Держит общий темп отправки и не чаще одного сообщения в секунду в чат.
+
+    Слоты раздаются заранее под блокировкой, а ждут их уже без неё, поэтому
+    воркеры не выстраиваются в очередь за одним lock. После 429 все слоты
+    сдвигаются за `retry_after`.
+    """
+
+    def __init__(self, rate: float, per_chat_interval: float = 1.0):
+        self._interval = 1 / rate
+        self._per_chat_interval = per_chat_interval
+        self._next_slot = 0.0
+        self._paused_until = 0.0
+        self._chat_slots: dict[int, float] = {}
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, chat_id: int) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            async with self._lock:
+                now = loop.time()
+                slot = max(now, self._next_slot, self._paused_until, self._chat_slots.get(chat_id, 0.0))
+                self._next_slot = slot + self._interval
+                self._chat_slots[chat_id] = slot + self._per_chat_interval
+                if len(self._chat_slots) > 10_000:
+                    self._chat_slots = {
+                        chat: chat_slot for chat, chat_slot in self._chat_slots.items() if chat_slot > now
+                    }
+            if slot > now:
+                await asyncio.sleep(slot - now)
+            # за время ожидания могли получить 429 — тогда берём новый слот
+            if loop.time() >= self._paused_until:
+                return
+
+    def pause(self, seconds: float) -> None:
+        until = asyncio.get_running_loop().time() + seconds
+        self._paused_until = max(self._paused_until, until)
+
+
+@dataclass
+class DeliveryStats:
+    sent: int = 0
+    failed: int = 0
+
+
+def claim_next_broadcast(owner: str, lease: timedelta) -> Optional[Broadcast]:
+    """Берёт в работу новую рассылку или прерванную, срок захвата которой истёк.
+
+    Блокировка строки держится только до коммита, поэтому рассылку за
+    процессом закрепляют `claimed_by` и `lease_until`: другие процессы её не
+    берут, пока владелец продлевает срок.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        broadcast = (
+            Broadcast.objects.select_for_update(skip_locked=True)
+            .filter(
+                Q(lease_until__isnull=True) | Q(lease_until__lt=now),
+                status__in=[BroadcastStatus.RUNNING, BroadcastStatus.PENDING],
+                # с выключенными анонсами рассылка ждёт, пока их не включат обратно
+                event__announcements_enabled=True,
+            )
+            # 'running' > 'pending': сначала доводим прерванные рассылки
+            .order_by('-status', 'created_at')
+            .first()
+        )
+        if broadcast is None:
+            return None
+        update_fields = ['claimed_by', 'lease_until']
+        if broadcast.status == BroadcastStatus.PENDING:
+            broadcast.status = BroadcastStatus.RUNNING
+            broadcast.started_at = now
+            update_fields += ['status', 'started_at']
+        broadcast.claimed_by = owner
+        broadcast.lease_until = now + lease
+        broadcast.save(update_fields=update_fields)
+    return broadcast
+
+
+def renew_lease(broadcast_id: int, owner: str, lease: timedelta) -> bool:
+    """Продлевает захват; False, если рассылка уже не за этим процессом."""
+    return bool(
+        Broadcast.objects.filter(pk=broadcast_id, claimed_by=owner).update(lease_until=timezone.now() + lease)
+    )
+
+
+def release_broadcast(broadcast_id: int, owner: str) -> None:
+    """Отпускает рассылку, чтобы другой процесс мог продолжить её сразу."""
+    Broadcast.objects.filter(pk=broadcast_id, claimed_by=owner).update(claimed_by='', lease_until=None)
+
+
+def fetch_recipients(broadcast: Broadcast, after_id: int, limit: int) -> Optional[list[tuple[int, int]]]:
+    """Следующая пачка `(participant_id, tg_id)` по курсору id.
+
+    Возвращает None, если рассылку отменили или у мероприятия выключили анонсы.
+    """
+    state = (
+        Broadcast.objects.filter(pk=broadcast.pk)
+        .values('status', 'event__announcements_enabled')
+        .first()
+    )
+    if (
+        state is None
+        or state['status'] != BroadcastStatus.RUNNING
+        or not state['event__announcements_enabled']
+    ):
+        return None
+
+    subscriptions = Subscription.objects.filter(
+        participant=OuterRef('pk'),
+        subscription_type=broadcast.subscription_type,
+        is_active=True,
+    )
+    if broadcast.subscription_type == SubscriptionType.EVENT:
+        subscriptions = subscriptions.filter(event_id=broadcast.event_id)
+
+    return list(
+        Participant.objects.filter(Exists(subscriptions), wants_notifications=True, id__gt=after_id)
+        .order_by('id')
+        .values_list('id', 'tg_id')[:limit]
+    )
+
+
+def save_checkpoint(
+    broadcast_id: int, owner: str, last_participant_id: int, stats: DeliveryStats, lease: timedelta
+) -> bool:
+    """Сохраняет курсор и продлевает захват; False, если рассылку забрал другой процесс."""
+    return bool(
+        Broadcast.objects.filter(pk=broadcast_id, claimed_by=owner).update(
+            last_participant_id=last_participant_id,
+            sent_count=F('sent_count') + stats.sent,
+            failed_count=F('failed_count') + stats.failed,
+            lease_until=timezone.now() + lease,
+        )
+    )
+
+
+def finish_broadcast(broadcast_id: int, owner: str) -> None:
+    Broadcast.objects.filter(pk=broadcast_id, status=BroadcastStatus.RUNNING, claimed_by=owner).update(
+        status=BroadcastStatus.DONE,
+        finished_at=timezone.now(),
+        claimed_by='',
+        lease_until=None,
+    )
+
+
+class BroadcastEngine:
+    """Фоновая отправка рассылок из таблицы `Broadcast`.
+
+    Получатели читаются пачками по курсору, пачка раздаётся воркерам через
+    очередь, после её доставки курсор сохраняется в БД. Если процесс бота
+    упадёт, рассылка продолжится с последней сохранённой пачки — часть
+    сообщений из неё может прийти повторно.
+
+    Рассылку отправляет только захвативший её процесс (`claimed_by`); он
+    продлевает захват каждую треть `BROADCAST_LEASE_SECONDS`. Захват упавшего
+    процесса истекает, и рассылку продолжает другой.
+    """
+
+    def __init__(
+        self,
+        rate: Optional[float] = None,
+        workers: Optional[int] = None,
+        chunk_size: Optional[int] = None,
+        poll_interval: Optional[float] = None,
+        lease_seconds: Optional[float] = None,
+    ):
+        self.rate = rate or settings.BROADCAST_RATE_PER_SECOND
+        self.workers = workers or settings.BROADCAST_WORKERS
+        self.chunk_size = chunk_size or settings.BROADCAST_CHUNK_SIZE
+        self.poll_interval = poll_interval or settings.BROADCAST_POLL_INTERVAL
+        self.lease = timedelta(seconds=lease_seconds or settings.BROADCAST_LEASE_SECONDS)
+        self.owner = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        self.limiter = RateLimiter(self.rate)
+        self._bot: Optional[Bot] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    async def start(self, application: Application) -> None:
+        self._bot = application.bot
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run(), name='broadcast-engine')
+
+    async def stop(self, application: Optional[Application] = None) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def wake(self) -> None:
+        """Проверить рассылки сейчас, не дожидаясь `poll_interval`."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def announce_events(self, application: Application, event_ids: list[int]) -> None:
+        """Обработчик outbox: анонс опубликованных мероприятий подписчикам будущих."""
+        if await run_db(announce_events, event_ids):
+            self.wake()
+
+    async def _idle(self) -> None:
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                broadcast = await run_db(claim_next_broadcast, self.owner, self.lease)
+                if broadcast is None:
+                    await self._idle()
+                    continue
+                if not await self.deliver(broadcast):
+                    # рассылку остановили, ничего не отправив: не берём её снова сразу же
+                    await self._idle()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception('Broadcast engine failed, retrying')
+                await asyncio.sleep(self.poll_interval)
+
+    async def deliver(self, broadcast: Broadcast) -> bool:
+        """Доставляет рассылку; False, если её остановили, не отправив ни одного сообщения."""
+        logger.info('Broadcast %s: resuming after participant %s', broadcast.pk, broadcast.last_participant_id)
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.chunk_size)
+        stats = DeliveryStats()
+        workers = [
+            asyncio.create_task(self._worker(queue, broadcast.text, stats))
+            for _ in range(self.workers)
+        ]
+        renewal = asyncio.create_task(self._renew_lease(broadcast.pk))
+        cursor = broadcast.last_participant_id
+        try:
+            while True:
+                chunk = await run_db(fetch_recipients, broadcast, cursor, self.chunk_size)
+                if chunk is None:
+                    logger.info('Broadcast %s stopped', broadcast.pk)
+                    return cursor != broadcast.last_participant_id
+                if not chunk:
+                    await run_db(finish_broadcast, broadcast.pk, self.owner)
+                    logger.info('Broadcast %s finished', broadcast.pk)
+                    return True
+                for _, tg_id in chunk:
+                    await queue.put(tg_id)
+                await queue.join()
+                cursor = chunk[-1][0]
+                if not await run_db(save_checkpoint, broadcast.pk, self.owner, cursor, stats, self.lease):
+                    logger.warning('Broadcast %s was taken over by another process', broadcast.pk)
+                    return True
+                stats.sent = stats.failed = 0
+        finally:
+            for task in (renewal, *workers):
+                task.cancel()
+            await asyncio.gather(renewal, *workers, return_exceptions=True)
+            try:
+                await run_db(release_broadcast, broadcast.pk, self.owner)
+            except Exception:
+                # захват истечёт сам через BROADCAST_LEASE_SECONDS
+                logger.exception('Cannot release broadcast %s', broadcast.pk)
+
+    async def _renew_lease(self, broadcast_id: int) -> None:
+        # пачка с паузами после 429 может идти дольше срока захвата
+        while True:
+            await asyncio.sleep(self.lease.total_seconds() / 3)
+            try:
+                if not await run_db(renew_lease, broadcast_id, self.owner, self.lease):
+                    return
+            except Exception:
+                logger.exception('Cannot renew lease of broadcast %s', broadcast_id)
+
+    async def _worker(self, queue: asyncio.Queue, text: str, stats: DeliveryStats) -> None:
+        while True:
+            chat_id = await queue.get()
+            try:
+                if await self._send(chat_id, text):
+                    stats.sent += 1
+                else:
+                    stats.failed += 1
+            finally:
+                queue.task_done()
+
+    async def _send(self, chat_id: int, text: str) -> bool:
+        for _ in range(MAX_SEND_ATTEMPTS):
+            await self.limiter.acquire(chat_id)
+            try:
+                await self._bot.send_message(chat_id=chat_id, text=text)
+            except RetryAfter as exc:
+                logger.warning('Flood control, pausing broadcast for %s s', exc.retry_after)
+                self.limiter.pause(exc.retry_after)
+            except (Forbidden, BadRequest) as exc:
+                logger.info('Cannot deliver to %s: %s', chat_id, exc)
+                return False
+            except NetworkError as exc:
+                logger.warning('Network error while sending to %s: %s', chat_id, exc)
+                await asyncio.sleep(NETWORK_RETRY_DELAY)
+            else:
+                return True
+        return False
@@ -0,0 +1,86 @@
+"""Доступ к ORM из асинхронных обработчиков бота.
+
+Синхронные запросы Django выполняются в отдельном пуле потоков, чтобы не
+блокировать event loop. У каждого потока пула своё соединение с БД, поэтому
+размер пула (`BOT_DB_POOL_SIZE`) — это и верхняя граница числа соединений
+процесса бота с Postgres. Соединения переиспользуются в пределах
+`BOT_DB_CONN_MAX_AGE` — и под ASGI, где у запросов веба `CONN_MAX_AGE=0`; протухшие и сломанные закрываются перед каждым вызовом и
+после него.
+"""
+import asyncio
+import contextvars
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+from django.conf import settings
+from django.db import close_old_connections, connections
+
+T = TypeVar('T')
+
+logger = logging.getLogger(__name__)
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.BOT_DB_POOL_SIZE,
+            thread_name_prefix='bot-db',
+            initializer=_keep_connections,
+        )
+    return _executor
+
+
+def _keep_connections() -> None:
+    # соединения потока — его собственные объекты, общий settings_dict не меняется
+    for connection in connections.all():
+        connection.settings_dict = connection.settings_dict | {'CONN_MAX_AGE': settings.BOT_DB_CONN_MAX_AGE}
+
+
+def _call_with_fresh_connection(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    close_old_connections()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+async def run_db(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Выполняет синхронную функцию с запросами к БД в пуле потоков."""
+    loop = asyncio.get_running_loop()
+    call = functools.partial(_call_with_fresh_connection, func, *args, **kwargs)
+    # контекст (например, обработчик для метрик БД) переезжает в поток вместе с вызовом
+    return await loop.run_in_executor(get_executor(), contextvars.copy_context().run, call)
+
+
+def submit_db(func: Callable[..., Any], *args: Any) -> None:
+    """Запускает функцию в пуле потоков БД, не дожидаясь результата."""
+    future = get_executor().submit(contextvars.copy_context().run, _call_with_fresh_connection, func, *args)
+    future.add_done_callback(_log_failure)
+
+
+def _log_failure(future) -> None:
+    if not future.cancelled() and future.exception() is not None:
+        logger.error('Background DB call failed', exc_info=future.exception())
+
+
+def db_call(func: Callable[..., T]) -> Callable[..., Any]:
+    """Декоратор: превращает синхронную функцию с ORM в корутину через `run_db`."""
+
+    @functools.wraps(func)
+    async def wrapper(*args: Any, **kwargs: Any) -> T:
+        return await run_db(func, *args, **kwargs)
+
+    wrapper.sync = func
+    return wrapper
+
+
+async def shutdown_db_executor(application: Any = None) -> None:
+    global _executor
+    executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True)
@@ -0,0 +1,75 @@
+"""Донат из бота: выбор суммы и ссылка на оплату в YooKassa.
+
+Платёж создаётся в отдельной задаче, а не в обработчике, поэтому медленный
+ответ YooKassa не задерживает следующие апдейты этого чата (вопросы,
+программу).
+"""
+import logging
+from decimal import Decimal
+from typing import Final
+
+from django.conf import settings
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Message, Update
+from telegram.ext import ContextTypes
+
+from meetbot.donations import attach_payment, create_donation
+from meetbot.program import current_talk_cache
+from meetbot.yookassa import YooKassaError, yookassa_client
+
+from .db import run_db
+from .identity import participant_directory
+
+logger = logging.getLogger(__name__)
+
+CALLBACK_DONATION_AMOUNT: Final = 'donate'
+
+
+def donation_keyboard() -> InlineKeyboardMarkup:
+    buttons = [
+        InlineKeyboardButton(f'{amount} ₽', callback_data=f'{CALLBACK_DONATION_AMOUNT}:{amount}')
+        for amount in settings.DONATION_AMOUNTS
+    ]
+    return InlineKeyboardMarkup([buttons[i:i + 2] for i in range(0, len(buttons), 2)])
+
+
+async def _issue_payment(message: Message, event_id: int, participant_id: int, amount: Decimal) -> None:
+    donation = await run_db(create_donation, event_id, participant_id, amount)
+    try:
+        payment = await yookassa_client.create_payment(
+            amount=donation.amount,
+            currency=donation.currency,
+            description=donation.description,
+            idempotence_key=donation.idempotence_key,
+            metadata={'donation_id': donation.pk},
+        )
+    except YooKassaError:
+        logger.exception('Cannot create payment for donation %s', donation.pk)
+        await message.edit_text('Платёжный сервис сейчас не отвечает. Попробуйте чуть позже, пожалуйста.')
+        return
+    await run_db(attach_payment, donation.pk, payment)
+    await message.edit_text(
+        f'Спасибо за поддержку! Сумма: {amount} ₽',
+        reply_markup=InlineKeyboardMarkup(
+            [[InlineKeyboardButton('💳 Оплатить', url=payment.confirmation_url)]]
+        ),
+    )
+
+
+async def handle_donation_amount(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    query = update.callback_query
+    amount = int(query.data.split(':', 1)[1])
+    if amount not in settings.DONATION_AMOUNTS:
+        await query.answer('Такой суммы нет в списке')
+        return
+    await query.answer()
+
+    state = current_talk_cache.cached() or await run_db(current_talk_cache.load)
+    if state.event_id is None:
+        await query.edit_message_text('Сейчас нет активного мероприятия.')
+        return
+    identity = await participant_directory.resolve(update.effective_user)
+    await query.edit_message_text('Готовим ссылку на оплату…')
+    context.application.create_task(
+        _issue_payment(query.message, state.event_id, identity.participant_id, Decimal(amount)),
+        update=update,
+    )
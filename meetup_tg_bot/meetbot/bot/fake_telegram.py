@@ -0,0 +1,206 @@
+"""Поддельный Telegram для тестов и локальных прогонов без сети.
+
+`FakeBotApi` подставляется в `build_application(..., request=...)` вместо
+HTTP-клиента PTB и отвечает на вызовы Bot API, запоминая их.
+`FakeBotApiServer` отвечает так же, но по HTTP — для бота в отдельном
+процессе (`TELEGRAM_API_BASE_URL`).
+`FakeTelegramSender` собирает апдейты в том виде, в каком их присылает
+Telegram, и доставляет их в вебхук.
+"""
+import asyncio
+import itertools
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Optional
+from urllib.parse import parse_qsl
+
+from telegram.request import BaseRequest, RequestData
+
+BOT_USER = {'id': 1, 'is_bot': True, 'first_name': 'Meetup', 'username': 'meetup_test_bot'}
+
+# пауза пустого ответа getUpdates, чтобы polling не крутился вхолостую
+EMPTY_POLL_DELAY = 0.05
+
+
+class FakeBotApi(BaseRequest):
+    """Отвечает на запросы бота как Bot API и сохраняет их в `calls`."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls: list[tuple[str, dict[str, Any]]] = []
+        self._message_ids = itertools.count(1)
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    async def do_request(
+        self,
+        url: str,
+        method: str,
+        request_data: Optional[RequestData] = None,
+        read_timeout=None,
+        write_timeout=None,
+        connect_timeout=None,
+        pool_timeout=None,
+    ) -> tuple[int, bytes]:
+        api_method = url.rsplit('/', 1)[-1]
+        params = request_data.parameters if request_data else {}
+        self.calls.append((api_method, params))
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        result = self._result(api_method, params)
+        return 200, json.dumps({'ok': True, 'result': result}).encode()
+
+    def _result(self, api_method: str, params: dict[str, Any]) -> Any:
+        if api_method == 'getMe':
+            return BOT_USER
+        if api_method == 'getUpdates':
+            return []
+        if api_method in ('sendMessage', 'editMessageText'):
+            return {
+                'message_id': params.get('message_id') or next(self._message_ids),
+                'date': int(time.time()),
+                'chat': {'id': params.get('chat_id'), 'type': 'private'},
+                'from': BOT_USER,
+                'text': params.get('text', ''),
+            }
+        return True
+
+    def calls_to(self, api_method: str) -> list[dict[str, Any]]:
+        return [params for method, params in self.calls if method == api_method]
+
+
+def _decode_parameter(value: str) -> Any:
+    # PTB шлёт параметры формой: строки как есть, остальное — в JSON
+    try:
+        return json.loads(value)
+    except ValueError:
+        return value
+
+
+class FakeBotApiServer:
+    """`FakeBotApi` по HTTP на localhost.
+
+    `getUpdates` отдаёт `updates`, пока бот не подтвердит их через `offset`,
+    потом — пустые ответы. Время первого вызова каждого метода
+    (`time.perf_counter()`) запоминается в `first_calls`.
+    """
+
+    def __init__(self, updates: Optional[list[dict[str, Any]]] = None):
+        self.api = FakeBotApi()
+        self.first_calls: dict[str, float] = {}
+        self._updates = list(updates or ())
+        self._lock = threading.Lock()
+        self._replied = threading.Event()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self) -> None:
+                server._respond(self)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+        self._httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f'http://{host}:{port}/bot'
+
+    def __enter__(self) -> 'FakeBotApiServer':
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name='fake-bot-api', daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        self._thread.join()
+
+    def wait_for_reply(self, timeout: float) -> bool:
+        """Ждёт первого `sendMessage` от бота."""
+        return self._replied.wait(timeout)
+
+    def _respond(self, handler: BaseHTTPRequestHandler) -> None:
+        api_method = handler.path.rsplit('/', 1)[-1]
+        body = handler.rfile.read(int(handler.headers.get('Content-Length') or 0)).decode()
+        params = {name: _decode_parameter(value) for name, value in parse_qsl(body)}
+        with self._lock:
+            self.first_calls.setdefault(api_method, time.perf_counter())
+            self.api.calls.append((api_method, params))
+        if api_method == 'getUpdates':
+            offset = params.get('offset') or 0
+            result = [update for update in self._updates if update['update_id'] >= offset]
+            if not result:
+                time.sleep(EMPTY_POLL_DELAY)
+        else:
+            result = self.api._result(api_method, params)
+        if api_method == 'sendMessage':
+            self._replied.set()
+
+        payload = json.dumps({'ok': True, 'result': result}).encode()
+        handler.send_response(200)
+        handler.send_header('Content-Type', 'application/json')
+        handler.send_header('Content-Length', str(len(payload)))
+        handler.end_headers()
+        try:
+            handler.wfile.write(payload)
+        except (BrokenPipeError, ConnectionResetError):
+            # бота остановили посреди long polling
+            pass
+
+
+class FakeTelegramSender:
+    """Собирает апдейты от имени пользователей и отправляет их в вебхук."""
+
+    def __init__(self, secret_token: str = ''):
+        self.secret_token = secret_token
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1)
+
+    def _user(self, user_id: int) -> dict[str, Any]:
+        return {'id': user_id, 'is_bot': False, 'first_name': f'User {user_id}', 'username': f'user{user_id}'}
+
+    def _message(self, user_id: int, text: str) -> dict[str, Any]:
+        message = {
+            'message_id': next(self._message_ids),
+            'date': int(time.time()),
+            'chat': {'id': user_id, 'type': 'private'},
+            'from': self._user(user_id),
+            'text': text,
+        }
+        if text.startswith('/'):
+            command = text.split()[0]
+            message['entities'] = [{'type': 'bot_command', 'offset': 0, 'length': len(command)}]
+        return message
+
+    def message(self, user_id: int, text: str) -> dict[str, Any]:
+        return {'update_id': next(self._update_ids), 'message': self._message(user_id, text)}
+
+    def callback(self, user_id: int, data: str) -> dict[str, Any]:
+        return {
+            'update_id': next(self._update_ids),
+            'callback_query': {
+                'id': str(next(self._update_ids)),
+                'from': self._user(user_id),
+                'chat_instance': str(user_id),
+                'data': data,
+                'message': {**self._message(user_id, 'menu'), 'from': BOT_USER},
+            },
+        }
+
+    async def send(self, client, path: str, update: dict[str, Any]):
+        """Отправляет апдейт через тестовый клиент Django (`AsyncClient`)."""
+        return await client.post(
+            path,
+            data=json.dumps(update),
+            content_type='application/json',
+            headers={'X-Telegram-Bot-Api-Secret-Token': self.secret_token},
+        )
@@ -4,6 +4,15 @@ from typing import Final
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update
 from telegram.ext import ContextTypes
 
+from meetbot.matching import ProfileCard, suggest_match
+from meetbot.models import Question
+from meetbot.program import current_talk_cache, program_cache
+
+from .db import run_db
+from .donations import donation_keyboard
+from .identity import participant_directory
+from .questions import QuestionDraft, question_intake
+
 logger = logging.getLogger(__name__)
 
 CALLBACK_PROGRAM: Final = 'menu_program'
@@ -12,6 +21,9 @@ CALLBACK_NETWORKING: Final = 'menu_networking'
 CALLBACK_DONATE: Final = 'menu_donate'
 CALLBACK_SUBSCRIBE: Final = 'menu_subscribe'
 
+AWAITING_QUESTION: Final = 'awaiting_question_talk_id'
+QUESTION_MAX_LENGTH: Final = Question._meta.get_field('text').max_length
+
 
 def _menu_keyboard() -> InlineKeyboardMarkup:
     buttons = [
@@ -28,6 +40,69 @@ def _menu_keyboard() -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(buttons)
 
 
+async def _program_text() -> str:
+    snapshot = program_cache.cached()
+    if snapshot is None:
+        snapshot = await run_db(program_cache.load)
+    return snapshot.text
+
+
+async def _current_state():
+    state = current_talk_cache.cached()
+    if state is None:
+        state = await run_db(current_talk_cache.load)
+    return state
+
+
+async def _current_talk():
+    return (await _current_state()).talk
+
+
+def _profile_text(card: ProfileCard) -> str:
+    lines = [f'🤝 {card.name}']
+    position = ', '.join(part for part in (card.role, card.company) if part)
+    if position:
+        lines.append(position)
+    if card.stack:
+        lines.append(f'Стек: {card.stack}')
+    if card.interests:
+        lines.append(f'Интересы: {card.interests}')
+    if card.goals:
+        lines.append(f'Цель: {card.goals}')
+    lines.append(f'Контакт: {card.contact}')
+    lines.append('\nНажмите «Познакомиться» ещё раз, чтобы увидеть следующего участника.')
+    return '\n'.join(lines)
+
+
+async def _networking_text(update: Update) -> str:
+    state = await _current_state()
+    if state.event_id is None:
+        return 'Сейчас нет активного мероприятия.'
+    identity = await participant_directory.resolve(update.effective_user)
+    suggestion = await run_db(suggest_match, state.event_id, identity.participant_id)
+    if not suggestion.has_profile:
+        return 'Сначала заполните анкету для знакомств — организаторы помогут на стойке регистрации.'
+    if suggestion.card is None:
+        return 'Вы уже познакомились со всеми, кто заполнил анкету. Загляните позже!'
+    return _profile_text(suggestion.card)
+
+
+async def _question_prompt(context: ContextTypes.DEFAULT_TYPE) -> str:
+    talk = await _current_talk()
+    if talk is None:
+        return 'Сейчас нет доклада, которому можно задать вопрос. Загляните в программу!'
+    context.user_data[AWAITING_QUESTION] = talk.talk_id
+    speaker = f' ({talk.speaker_name})' if talk.speaker_name else ''
+    return f'Напишите одним сообщением вопрос к докладу «{talk.title}»{speaker}.'
+
+
+async def track_participant(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Заводит или обновляет участника до остальных обработчиков."""
+    user = update.effective_user
+    if user and not user.is_bot:
+        await participant_directory.resolve(user)
+
+
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     
     text = (
@@ -54,17 +129,51 @@ async def handle_menu_callback(update: Update, context: ContextTypes.DEFAULT_TYP
     data = query.data
 
     messages = {
-        CALLBACK_PROGRAM: 'Скоро покажу программу и текущий доклад.',
-        CALLBACK_QUESTION: 'Здесь появится форма для вопроса текущему спикеру.',
-        CALLBACK_NETWORKING: 'Подготовим анкету для знакомства и предложим собеседника.',
-        CALLBACK_DONATE: 'Добавим кнопку доната и покажем, как поддержать митап.',
         CALLBACK_SUBSCRIBE: 'Настроим подписку на обновления и будущие события.',
     }
-    text = messages.get(data, 'Команда в разработке.')
+    if data == CALLBACK_DONATE:
+        await query.edit_message_text(
+            'Поддержите митап: выберите сумму, и бот пришлёт ссылку на оплату.',
+            reply_markup=donation_keyboard(),
+        )
+        return
+    if data == CALLBACK_PROGRAM:
+        text = await _program_text()
+    elif data == CALLBACK_QUESTION:
+        text = await _question_prompt(context)
+    elif data == CALLBACK_NETWORKING:
+        text = await _networking_text(update)
+    else:
+        text = messages.get(data, 'Команда в разработке.')
 
     await query.edit_message_text(text, reply_markup=_menu_keyboard())
 
 
+async def handle_question_text(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Принимает текст вопроса после нажатия «Вопрос спикеру»."""
+    message = update.message
+    talk_id = context.user_data.get(AWAITING_QUESTION)
+    if not message or talk_id is None:
+        return
+
+    text = message.text.strip()
+    if len(text) > QUESTION_MAX_LENGTH:
+        await message.reply_text(f'Вопрос длиннее {QUESTION_MAX_LENGTH} символов, сократите его, пожалуйста.')
+        return
+
+    del context.user_data[AWAITING_QUESTION]
+    identity = await participant_directory.resolve(update.effective_user)
+    reply = await message.reply_text('Вопрос отправлен спикеру. Спасибо!', reply_markup=_menu_keyboard())
+    question_intake.submit(
+        QuestionDraft(
+            talk_id=talk_id,
+            author_id=identity.participant_id,
+            text=text,
+            attendee_message_id=reply.message_id,
+        )
+    )
+
+
 async def unknown_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     
     logger.debug('Unknown command: %s', update.message.text if update.message else 'n/a')
@@ -0,0 +1,86 @@
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Optional
+
+from django.conf import settings
+from telegram import User
+
+from meetbot.participants import ParticipantIdentity, TelegramProfile, upsert_participants
+
+from .db import run_db
+
+logger = logging.getLogger(__name__)
+
+
+class ParticipantDirectory:
+    """LRU-кеш `tg_id → участник` перед пакетным upsert.
+
+    Если пользователь есть в кеше и его ник/имя не менялись, обращения к БД
+    нет. Промахи за короткое окно (`BOT_IDENTITY_BATCH_WINDOW`) копятся и
+    записываются одним запросом.
+    """
+
+    def __init__(self, capacity: Optional[int] = None, batch_window: Optional[float] = None):
+        self.capacity = capacity or settings.BOT_IDENTITY_CACHE_SIZE
+        self.batch_window = settings.BOT_IDENTITY_BATCH_WINDOW if batch_window is None else batch_window
+        self._cache: OrderedDict[int, ParticipantIdentity] = OrderedDict()
+        self._pending: dict[int, tuple[TelegramProfile, asyncio.Future]] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+
+    def cached(self, tg_id: int) -> Optional[ParticipantIdentity]:
+        return self._cache.get(tg_id)
+
+    async def resolve(self, user: User) -> ParticipantIdentity:
+        profile = TelegramProfile.from_user(user)
+        identity = self._cache.get(profile.tg_id)
+        if identity is not None and identity.profile == profile:
+            self._cache.move_to_end(profile.tg_id)
+            return identity
+
+        pending = self._pending.get(profile.tg_id)
+        if pending is None:
+            future = asyncio.get_running_loop().create_future()
+        else:
+            future = pending[1]
+        self._pending[profile.tg_id] = (profile, future)
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_later())
+        return await asyncio.shield(future)
+
+    def forget(self, tg_id: Optional[int] = None) -> None:
+        if tg_id is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(tg_id, None)
+
+    def on_participant_changed(self, payload: Optional[str]) -> None:
+        """Обработчик NOTIFY: payload — tg_id изменённого участника."""
+        self.forget(int(payload) if payload else None)
+
+    def _remember(self, identity: ParticipantIdentity) -> None:
+        self._cache[identity.tg_id] = identity
+        self._cache.move_to_end(identity.tg_id)
+        while len(self._cache) > self.capacity:
+            self._cache.popitem(last=False)
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.batch_window)
+        batch, self._pending = self._pending, {}
+        self._flush_task = None
+        try:
+            identities = await run_db(upsert_participants, [profile for profile, _ in batch.values()])
+        except Exception as exc:
+            logger.exception('Participant upsert failed')
+            for _, future in batch.values():
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        for tg_id, (_, future) in batch.items():
+            identity = identities[tg_id]
+            self._remember(identity)
+            if not future.done():
+                future.set_result(identity)
+
+
+participant_directory = ParticipantDirectory()
@@ -0,0 +1,167 @@
+"""Входящие вопросы спикера в Telegram.
+
+Курсор страницы передаётся в callback_data: `inbox:<talk_id>:<cursor>`,
+отметка «отвечено» — `inboxok:<question_id>:<talk_id>:<cursor>`. Пустой курсор
+означает первую страницу.
+"""
+import asyncio
+import logging
+from typing import Final, Optional
+
+from django.utils import timezone
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup, ReplyParameters, Update
+from telegram.error import BadRequest, Forbidden, RetryAfter
+from telegram.ext import Application, ContextTypes
+
+from meetbot.inbox import (
+    AnsweredQuestion,
+    InboxPage,
+    answer_notice,
+    answered_questions,
+    can_manage_talk,
+    decode_cursor,
+    inbox_page,
+    set_question_status,
+    speaker_talks,
+)
+from meetbot.models import QuestionStatus
+
+from .db import run_db
+from .identity import participant_directory
+
+logger = logging.getLogger(__name__)
+
+CALLBACK_INBOX: Final = 'inbox'
+CALLBACK_ANSWERED: Final = 'inboxok'
+
+PAGE_SIZE: Final = 5
+PREVIEW_LENGTH: Final = 300
+
+
+def _talk_button(talk_id: int, title: str, unread: int) -> InlineKeyboardButton:
+    return InlineKeyboardButton(f'{title} · {unread} без ответа', callback_data=f'{CALLBACK_INBOX}:{talk_id}:')
+
+
+def _page_view(page: InboxPage, cursor: str) -> tuple[str, InlineKeyboardMarkup]:
+    lines = [
+        f'📥 «{page.talk_title}»',
+        f'Без ответа: {page.unread_count} · отвечено: {page.answered_count}',
+    ]
+    buttons = []
+    for number, question in enumerate(page.questions, start=1):
+        text = question.text
+        if len(text) > PREVIEW_LENGTH:
+            text = text[:PREVIEW_LENGTH] + '…'
+        lines.append(f'\n{number}. {text}')
+        buttons.append(
+            InlineKeyboardButton(
+                f'✅ {number}',
+                callback_data=f'{CALLBACK_ANSWERED}:{question.question_id}:{page.talk_id}:{cursor}',
+            )
+        )
+    if not page.questions:
+        lines.append('\nНовых вопросов нет.')
+
+    keyboard = [buttons] if buttons else []
+    navigation = []
+    if cursor:
+        navigation.append(InlineKeyboardButton('⏮ В начало', callback_data=f'{CALLBACK_INBOX}:{page.talk_id}:'))
+    if page.next_cursor:
+        navigation.append(
+            InlineKeyboardButton('Дальше ▶️', callback_data=f'{CALLBACK_INBOX}:{page.talk_id}:{page.next_cursor}')
+        )
+    if navigation:
+        keyboard.append(navigation)
+    return '\n'.join(lines), InlineKeyboardMarkup(keyboard)
+
+
+async def _render_page(update: Update, talk_id: int, cursor: str) -> None:
+    query = update.callback_query
+    identity = await participant_directory.resolve(update.effective_user)
+    page: Optional[InboxPage] = await run_db(
+        inbox_page,
+        talk_id,
+        identity.participant_id,
+        cursor=decode_cursor(cursor),
+        limit=PAGE_SIZE,
+        is_organizer=identity.is_organizer,
+    )
+    if page is None:
+        await query.edit_message_text('Это не ваш доклад.')
+        return
+    if not page.questions and cursor:
+        # на странице ничего не осталось — возвращаемся к первой
+        await _render_page(update, talk_id, '')
+        return
+    text, keyboard = _page_view(page, cursor)
+    await query.edit_message_text(text, reply_markup=keyboard)
+
+
+async def show_inbox(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """/inbox: список докладов спикера со счётчиками вопросов."""
+    message = update.message
+    if not message:
+        return
+    identity = await participant_directory.resolve(update.effective_user)
+    if not (identity.is_speaker or identity.is_organizer):
+        await message.reply_text('Входящие вопросы доступны только спикерам.')
+        return
+    talks = await run_db(speaker_talks, identity.participant_id, is_organizer=identity.is_organizer)
+    if not talks:
+        await message.reply_text('У вас нет докладов на текущем мероприятии.')
+        return
+    keyboard = InlineKeyboardMarkup(
+        [[_talk_button(talk_id, title, unread)] for talk_id, title, unread, _ in talks]
+    )
+    await message.reply_text('Выберите доклад:', reply_markup=keyboard)
+
+
+async def handle_inbox_page(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    query = update.callback_query
+    await query.answer()
+    _, talk_id, cursor = query.data.split(':', 2)
+    await _render_page(update, int(talk_id), cursor)
+
+
+async def handle_mark_answered(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    query = update.callback_query
+    _, question_id, talk_id, cursor = query.data.split(':', 3)
+    identity = await participant_directory.resolve(update.effective_user)
+    allowed = await run_db(
+        can_manage_talk, int(talk_id), identity.participant_id, is_organizer=identity.is_organizer
+    )
+    if not allowed:
+        await query.answer('Это не ваш доклад.')
+        return
+    # talk_id в фильтре не даёт отметить вопрос к чужому докладу
+    await run_db(
+        set_question_status,
+        [int(question_id)],
+        QuestionStatus.ANSWERED,
+        talk_id=int(talk_id),
+        answered_at=timezone.now(),
+    )
+    await query.answer('Отмечено как отвеченный')
+    await _render_page(update, int(talk_id), cursor)
+
+
+async def _send_answer_notice(application: Application, question: AnsweredQuestion) -> None:
+    reply_to = None
+    if question.attendee_message_id:
+        # ответ приходит реплаем на «вопрос отправлен», если то сообщение ещё есть
+        reply_to = ReplyParameters(question.attendee_message_id, allow_sending_without_reply=True)
+    await application.bot.send_message(
+        chat_id=question.author_tg_id, text=answer_notice(question), reply_parameters=reply_to
+    )
+
+
+async def send_answer_notices(application: Application, question_ids: list[int]) -> None:
+    """Обработчик outbox: сообщает авторам, что спикер ответил на их вопросы."""
+    for question in await run_db(answered_questions, question_ids):
+        try:
+            await _send_answer_notice(application, question)
+        except RetryAfter as exc:
+            await asyncio.sleep(exc.retry_after)
+            await _send_answer_notice(application, question)
+        except (Forbidden, BadRequest) as exc:
+            logger.info('Cannot notify %s about answer: %s', question.author_tg_id, exc)
@@ -0,0 +1,138 @@
+"""Метрики бота: обработчики, вызовы Bot API и очередь апдейтов.
+
+`instrument_handlers` оборачивает колбэк каждого зарегистрированного
+обработчика: время и ошибки пишутся с меткой `handler`, а запросы к БД
+изнутри обработчика получают её же в `meetbot_db_queries_total`.
+`InstrumentedRequest` меряет вызовы Bot API по методам. Процесс бота в
+режиме polling отдаёт метрики своим HTTP-листенером (`BOT_METRICS_PORT`),
+в режиме webhook — вместе с веб-приложением.
+"""
+import functools
+import time
+import weakref
+from typing import Any, Awaitable, Callable, Optional
+
+from prometheus_client.core import GaugeMetricFamily
+from telegram.error import TelegramError
+from telegram.ext import Application, ApplicationHandlerStop
+from telegram.request import BaseRequest, RequestData
+
+from meetbot.metrics import (
+    HANDLER_DURATION,
+    HANDLER_ERRORS,
+    TELEGRAM_API_DURATION,
+    TELEGRAM_API_ERRORS,
+    metrics_source,
+    register_live_collector,
+)
+
+from .processor import update_processing_metrics
+
+HandlerCallback = Callable[..., Awaitable[Any]]
+
+
+def _handler_name(callback: HandlerCallback) -> str:
+    return getattr(callback, '__name__', type(callback).__name__)
+
+
+def instrumented(callback: HandlerCallback) -> HandlerCallback:
+    """Обёртка колбэка обработчика с метриками; повторно не оборачивает."""
+    if getattr(callback, 'instrumented', False):
+        return callback
+    name = _handler_name(callback)
+    duration = HANDLER_DURATION.labels(name)
+
+    @functools.wraps(callback)
+    async def wrapper(update: object, context: Any) -> Any:
+        token = metrics_source.set(name)
+        started = time.perf_counter()
+        try:
+            return await callback(update, context)
+        except ApplicationHandlerStop:
+            raise
+        except Exception as exc:
+            HANDLER_ERRORS.labels(name, type(exc).__name__).inc()
+            raise
+        finally:
+            duration.observe(time.perf_counter() - started)
+            metrics_source.reset(token)
+
+    wrapper.instrumented = True
+    return wrapper
+
+
+def instrument_handlers(application: Application) -> None:
+    """Оборачивает все обработчики приложения, включая добавленные позже в `build_application`."""
+    for handlers in application.handlers.values():
+        for handler in handlers:
+            handler.callback = instrumented(handler.callback)
+
+
+class InstrumentedRequest(BaseRequest):
+    """Прослойка над HTTP-клиентом PTB: время и ошибки вызовов Bot API по методам."""
+
+    def __init__(self, request: BaseRequest):
+        self.request = request
+
+    @property
+    def read_timeout(self) -> Optional[float]:
+        return self.request.read_timeout
+
+    async def initialize(self) -> None:
+        await self.request.initialize()
+
+    async def shutdown(self) -> None:
+        await self.request.shutdown()
+
+    async def do_request(
+        self,
+        url: str,
+        method: str,
+        request_data: Optional[RequestData] = None,
+        read_timeout=BaseRequest.DEFAULT_NONE,
+        write_timeout=BaseRequest.DEFAULT_NONE,
+        connect_timeout=BaseRequest.DEFAULT_NONE,
+        pool_timeout=BaseRequest.DEFAULT_NONE,
+    ) -> tuple[int, bytes]:
+        api_method = url.rsplit('/', 1)[-1]
+        started = time.perf_counter()
+        try:
+            code, payload = await self.request.do_request(
+                url,
+                method,
+                request_data=request_data,
+                read_timeout=read_timeout,
+                write_timeout=write_timeout,
+                connect_timeout=connect_timeout,
+                pool_timeout=pool_timeout,
+            )
+        except TelegramError as exc:
+            TELEGRAM_API_ERRORS.labels(api_method, type(exc).__name__).inc()
+            raise
+        finally:
+            TELEGRAM_API_DURATION.labels(api_method).observe(time.perf_counter() - started)
+        if code >= 400:
+            # ответ с ошибкой разбирает PTB; здесь хватает кода (429 — флуд-лимит)
+            TELEGRAM_API_ERRORS.labels(api_method, f'HTTP {code}').inc()
+        return code, payload
+
+
+class UpdateQueueCollector:
+    """Глубина очереди и загрузка пула обработчиков на момент опроса метрик."""
+
+    def __init__(self):
+        self._application: Optional[weakref.ref] = None
+
+    def track(self, application: Application) -> None:
+        self._application = weakref.ref(application)
+
+    def collect(self):
+        application = self._application() if self._application else None
+        if application is None:
+            return
+        for name, value in update_processing_metrics(application).items():
+            yield GaugeMetricFamily(f'meetbot_{name}', 'Состояние обработки апдейтов', value=value)
+
+
+update_queue_collector = UpdateQueueCollector()
+register_live_collector(update_queue_collector)
@@ -0,0 +1,138 @@
+"""Чтение outbox (`meetbot.outbox`) в процессе бота.
+
+Бот просыпается по NOTIFY `OUTBOX_CHANNEL` и сразу забирает накопившиеся
+сообщения; пока LISTEN-соединения нет (SQLite, обрыв связи с Postgres),
+outbox опрашивается раз в `OUTBOX_POLL_INTERVAL` секунд. При старте и после
+переподключения LISTEN всё пропущенное забирается одной проверкой.
+
+Доставка — at-least-once: сообщения удаляются только после обработчика,
+поэтому после падения бота часть из них обработается повторно. Повторы
+внутри процесса отсекаются: одинаковые объекты одной темы в пачке
+передаются обработчику один раз, а уже обработанные, но не удалённые
+(ошибка БД при подтверждении), не обрабатываются снова. Каждое падение
+обработчика засчитывается сообщениям темы, и после `OUTBOX_MAX_ATTEMPTS`
+падений они откладываются, а не повторяются на каждой проверке.
+"""
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Optional
+
+from django.conf import settings
+from telegram.ext import Application
+
+from meetbot.outbox import PendingMessage, acknowledge, pending_messages, record_failure
+from meetbot.pubsub import PgListener
+
+from .db import run_db
+
+logger = logging.getLogger(__name__)
+
+OutboxHandler = Callable[[Application, list[int]], Awaitable[Any]]
+
+
+class OutboxConsumer:
+    def __init__(
+        self,
+        listener: PgListener,
+        batch_size: Optional[int] = None,
+        poll_interval: Optional[float] = None,
+        max_attempts: Optional[int] = None,
+    ):
+        self.listener = listener
+        self.batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+        self.poll_interval = poll_interval or settings.OUTBOX_POLL_INTERVAL
+        self.max_attempts = max_attempts or settings.OUTBOX_MAX_ATTEMPTS
+        self._handlers: dict[str, OutboxHandler] = {}
+        self._handled: set[int] = set()
+        self._application: Optional[Application] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def register(self, topic: str, handler: OutboxHandler) -> None:
+        self._handlers[topic] = handler
+
+    def on_notify(self, payload: Optional[str]) -> None:
+        """Обработчик NOTIFY; `payload=None` после переподключения — тоже повод проверить outbox."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def start(self, application: Application) -> None:
+        self._application = application
+        self._wakeup = asyncio.Event()
+        # сообщения, накопившиеся, пока бот не работал
+        self._wakeup.set()
+        self._task = asyncio.create_task(self._run(), name='outbox')
+
+    async def stop(self, application: Optional[Application] = None) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await self._idle()
+            try:
+                drained = await self.drain()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception('Outbox delivery failed, retrying')
+                drained = False
+            if not drained:
+                await asyncio.sleep(self.poll_interval)
+                self._wakeup.set()
+
+    async def _idle(self) -> None:
+        # с LISTEN ждём только уведомления, без него — опрашиваем
+        timeout = None if self.listener.is_listening else self.poll_interval
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+    async def drain(self) -> bool:
+        """Обрабатывает накопившиеся сообщения; False, если какой-то обработчик упал."""
+        while True:
+            batch = await run_db(pending_messages, self.batch_size)
+            if not batch:
+                return True
+            done, failed = await self._handle(batch)
+            if done:
+                await run_db(acknowledge, done)
+                self._handled.difference_update(done)
+            if failed:
+                # упавшая тема останется в outbox и повторится после паузы, пока не кончатся попытки
+                shelved = await run_db(record_failure, failed, self.max_attempts)
+                if shelved:
+                    logger.error('Outbox: %s messages shelved after %s failed attempts', shelved, self.max_attempts)
+                return False
+
+    async def _handle(self, batch: list[PendingMessage]) -> tuple[list[int], list[int]]:
+        by_topic: dict[str, list[PendingMessage]] = defaultdict(list)
+        for message in batch:
+            by_topic[message.topic].append(message)
+        done, failed = [], []
+        for topic, messages in by_topic.items():
+            fresh = [message for message in messages if message.message_id not in self._handled]
+            handler = self._handlers.get(topic)
+            if handler is None:
+                logger.warning('No handler for outbox topic %s, dropping %s messages', topic, len(messages))
+            elif fresh:
+                object_ids = list(dict.fromkeys(message.object_id for message in fresh))
+                try:
+                    await handler(self._application, object_ids)
+                except Exception:
+                    logger.exception('Outbox handler for %s failed', topic)
+                    failed += [message.message_id for message in fresh]
+                    continue
+            message_ids = [message.message_id for message in messages]
+            self._handled.update(message_ids)
+            done += message_ids
+        return done, failed
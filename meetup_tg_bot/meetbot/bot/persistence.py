@@ -0,0 +1,195 @@
+"""Хранение user_data, chat_data и состояний диалогов в БД.
+
+PTB раз в `BOT_PERSISTENCE_INTERVAL` секунд отдаёт записи, которых касались
+апдейты, одной пачкой вызовов `update_*`; те, что действительно изменились,
+пишутся одним upsert и одним DELETE на вид записи. Данные пользователей и
+чатов читаются лениво — при первом апдейте от пользователя или из чата, а
+не все разом на старте. bot_data бот не использует и не хранит.
+
+Все данные должны сериализоваться в JSON.
+"""
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from typing import Any, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from telegram.ext import BasePersistence, PersistenceInput
+
+from meetbot.models import BotState, BotStateKind
+
+from .db import run_db
+
+logger = logging.getLogger(__name__)
+
+StateKey = tuple[str, str]
+
+
+def conversation_key(name: str, key: tuple) -> str:
+    return f'{name}:{json.dumps(list(key), separators=(",", ":"))}'
+
+
+def load_state(kind: str, key: str) -> Optional[Any]:
+    return BotState.objects.filter(kind=kind, key=key).values_list('data', flat=True).first()
+
+
+def load_conversations(name: str) -> dict[tuple, object]:
+    prefix = f'{name}:'
+    rows = BotState.objects.filter(kind=BotStateKind.CONVERSATION, key__startswith=prefix)
+    return {
+        tuple(json.loads(key[len(prefix):])): data
+        for key, data in rows.values_list('key', 'data')
+    }
+
+
+def save_states(upserts: dict[StateKey, Any], deletes: set[StateKey]) -> None:
+    """Пишет накопленные изменения одним upsert и одним DELETE на вид записи."""
+    now = timezone.now()
+    with transaction.atomic():
+        if upserts:
+            BotState.objects.bulk_create(
+                [BotState(kind=kind, key=key, data=data, updated_at=now) for (kind, key), data in upserts.items()],
+                update_conflicts=True,
+                unique_fields=['kind', 'key'],
+                update_fields=['data', 'updated_at'],
+            )
+        keys_by_kind = defaultdict(list)
+        for kind, key in deletes:
+            keys_by_kind[kind].append(key)
+        for kind, keys in keys_by_kind.items():
+            BotState.objects.filter(kind=kind, key__in=keys).delete()
+
+
+class DjangoPersistence(BasePersistence):
+    """`BasePersistence` поверх модели `BotState`.
+
+    Записи, изменённые за один проход PTB, копятся в `_upserts`/`_deletes`
+    и сбрасываются одной задачей, которую ждут все вызовы этого прохода.
+    Если запись не удалась, изменения возвращаются в буфер (более новые
+    значения не затираются) и уйдут со следующим проходом.
+
+    PTB передаёт в `update_*` каждого пользователя и чат, которых касались
+    апдейты, даже если данные не менялись. `_snapshots` хранит JSON последнего
+    записанного (или поставленного в очередь) значения, и совпадающие записи
+    пропускаются; `None` — записи в БД нет.
+    """
+
+    def __init__(self, update_interval: Optional[float] = None):
+        super().__init__(
+            store_data=PersistenceInput(bot_data=False, callback_data=False),
+            update_interval=settings.BOT_PERSISTENCE_INTERVAL if update_interval is None else update_interval,
+        )
+        self._upserts: dict[StateKey, Any] = {}
+        self._deletes: set[StateKey] = set()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._loaded: set[StateKey] = set()
+        self._loading: dict[StateKey, asyncio.Future] = {}
+        self._snapshots: dict[StateKey, Optional[str]] = {}
+
+    async def _write(self, state_key: StateKey, data: Any) -> None:
+        snapshot = None if data is None else json.dumps(data, sort_keys=True)
+        if state_key in self._snapshots and self._snapshots[state_key] == snapshot:
+            return
+        self._snapshots[state_key] = snapshot
+        if data is None:
+            self._upserts.pop(state_key, None)
+            self._deletes.add(state_key)
+        else:
+            self._deletes.discard(state_key)
+            self._upserts[state_key] = data
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_batch())
+        await asyncio.shield(self._flush_task)
+
+    async def _flush_batch(self) -> None:
+        # даём остальным update_* этого прохода PTB попасть в ту же пачку
+        await asyncio.sleep(0)
+        upserts, self._upserts = self._upserts, {}
+        deletes, self._deletes = self._deletes, set()
+        self._flush_task = None
+        if not upserts and not deletes:
+            return
+        try:
+            await run_db(save_states, upserts, deletes)
+        except Exception:
+            for state_key, data in upserts.items():
+                if state_key not in self._upserts and state_key not in self._deletes:
+                    self._upserts[state_key] = data
+            self._deletes |= {key for key in deletes if key not in self._upserts}
+            raise
+
+    async def _refresh(self, state_key: StateKey, data: dict) -> None:
+        """Подгружает сохранённые данные при первом обращении в этом процессе."""
+        if state_key in self._loaded:
+            return
+        loading = self._loading.get(state_key)
+        if loading is None:
+            loading = asyncio.ensure_future(run_db(load_state, *state_key))
+            self._loading[state_key] = loading
+        try:
+            stored = await asyncio.shield(loading)
+        finally:
+            self._loading.pop(state_key, None)
+        if state_key in self._loaded:
+            return
+        self._loaded.add(state_key)
+        self._snapshots.setdefault(state_key, None if stored is None else json.dumps(stored, sort_keys=True))
+        if stored:
+            for name, value in stored.items():
+                data.setdefault(name, value)
+
+    async def get_user_data(self) -> dict[int, dict]:
+        return {}
+
+    async def get_chat_data(self) -> dict[int, dict]:
+        return {}
+
+    async def get_bot_data(self) -> dict:
+        return {}
+
+    async def get_callback_data(self) -> None:
+        return None
+
+    async def get_conversations(self, name: str) -> dict:
+        # у диалогов нет ленивого refresh в PTB, поэтому они читаются на старте
+        return await run_db(load_conversations, name)
+
+    async def update_user_data(self, user_id: int, data: dict) -> None:
+        await self._write((BotStateKind.USER, str(user_id)), data or None)
+
+    async def update_chat_data(self, chat_id: int, data: dict) -> None:
+        await self._write((BotStateKind.CHAT, str(chat_id)), data or None)
+
+    async def update_bot_data(self, data: dict) -> None:
+        pass
+
+    async def update_callback_data(self, data) -> None:
+        pass
+
+    async def update_conversation(self, name: str, key: tuple, new_state: Optional[object]) -> None:
+        await self._write((BotStateKind.CONVERSATION, conversation_key(name, key)), new_state)
+
+    async def drop_user_data(self, user_id: int) -> None:
+        await self._write((BotStateKind.USER, str(user_id)), None)
+
+    async def drop_chat_data(self, chat_id: int) -> None:
+        await self._write((BotStateKind.CHAT, str(chat_id)), None)
+
+    async def refresh_user_data(self, user_id: int, user_data: dict) -> None:
+        await self._refresh((BotStateKind.USER, str(user_id)), user_data)
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: dict) -> None:
+        await self._refresh((BotStateKind.CHAT, str(chat_id)), chat_data)
+
+    async def refresh_bot_data(self, bot_data: dict) -> None:
+        pass
+
+    async def flush(self) -> None:
+        if self._flush_task is not None:
+            await asyncio.shield(self._flush_task)
+        elif self._upserts or self._deletes:
+            self._flush_task = asyncio.create_task(self._flush_batch())
+            await self._flush_task
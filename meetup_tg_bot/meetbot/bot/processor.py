@@ -0,0 +1,98 @@
+import asyncio
+import sys
+from typing import Any, Awaitable, Hashable, Optional
+
+from telegram import Update
+from telegram.ext import Application, BaseUpdateProcessor
+
+
+def _ordering_key(update: object) -> Optional[Hashable]:
+    if not isinstance(update, Update):
+        return None
+    if update.effective_chat:
+        return update.effective_chat.id
+    if update.effective_user:
+        return ('user', update.effective_user.id)
+    return None
+
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """Параллельная обработка апдейтов с сохранением порядка внутри чата.
+
+    Апдейты одного чата выполняются строго по очереди, разные чаты —
+    одновременно, но не больше `max_concurrent_updates` штук. Апдейт сначала
+    ждёт свой чат и только потом занимает слот пула, поэтому один
+    «шумный» чат не забирает слоты у остальных.
+    """
+
+    def __init__(self, max_concurrent_updates: int):
+        super().__init__(max_concurrent_updates)
+        # семафор базового класса занимает слот раньше блокировки чата, и ждущие свой
+        # чат апдейты забивали бы пул; он не ограничивает, слоты считает `_slots`
+        self._semaphore = asyncio.BoundedSemaphore(sys.maxsize)
+        self._slots = asyncio.Semaphore(max_concurrent_updates)
+        self._chat_locks: dict[Hashable, list] = {}
+        self.waiting = 0
+        self.in_flight = 0
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        key = _ordering_key(update)
+        self.waiting += 1
+        if key is None:
+            await self._run(coroutine)
+            return
+        lock_entry = self._chat_locks.setdefault(key, [asyncio.Lock(), 0])
+        lock_entry[1] += 1
+        try:
+            try:
+                await lock_entry[0].acquire()
+            except BaseException:
+                self.waiting -= 1
+                raise
+            try:
+                await self._run(coroutine)
+            finally:
+                lock_entry[0].release()
+        finally:
+            lock_entry[1] -= 1
+            if not lock_entry[1]:
+                del self._chat_locks[key]
+
+    async def _run(self, coroutine: Awaitable[Any]) -> None:
+        """Занимает слот пула; `waiting` уже учитывает этот апдейт."""
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        try:
+            await coroutine
+        finally:
+            self.in_flight -= 1
+            self._slots.release()
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    @property
+    def active_chats(self) -> int:
+        return len(self._chat_locks)
+
+
+def update_processing_metrics(application: Application) -> dict[str, int]:
+    """Глубина очереди апдейтов и загрузка пула обработчиков."""
+    metrics = {
+        'update_queue_depth': application.update_queue.qsize(),
+        'max_concurrent_updates': application.update_processor.max_concurrent_updates,
+    }
+    processor = application.update_processor
+    if isinstance(processor, ChatOrderedUpdateProcessor):
+        metrics.update(
+            updates_in_flight=processor.in_flight,
+            updates_waiting=processor.waiting,
+            active_chats=processor.active_chats,
+        )
+    return metrics
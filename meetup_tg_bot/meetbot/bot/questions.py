@@ -0,0 +1,267 @@
+import asyncio
+import logging
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Optional
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import BigIntegerField, Case, F, Value, When
+from telegram import Bot
+from telegram.error import TelegramError
+from telegram.ext import Application
+
+from meetbot.inbox import count_new_questions
+from meetbot.models import Question, QuestionStatus, Talk
+
+from .db import run_db
+
+logger = logging.getLogger(__name__)
+
+MESSAGE_LIMIT = 4096
+RETRY_DELAY = 1.0
+
+
+@dataclass(frozen=True)
+class QuestionDraft:
+    talk_id: int
+    author_id: Optional[int]
+    text: str
+    attendee_message_id: Optional[int] = None
+
+
+@dataclass(frozen=True)
+class SavedQuestion:
+    question_id: int
+    text: str
+
+
+@dataclass(frozen=True)
+class SpeakerBatch:
+    talk_title: str
+    speaker_tg_id: Optional[int]
+    questions: list[SavedQuestion]
+
+
+def save_questions(drafts: list[QuestionDraft]) -> list[SpeakerBatch]:
+    """Сохраняет вопросы одним INSERT и группирует их по докладам."""
+    questions = [
+        Question(
+            talk_id=draft.talk_id,
+            author_id=draft.author_id,
+            text=draft.text,
+            attendee_message_id=draft.attendee_message_id,
+        )
+        for draft in drafts
+    ]
+    # bulk_create не шлёт сигналы, поэтому счётчики входящих обновляем сами
+    try:
+        with transaction.atomic():
+            Question.objects.bulk_create(questions)
+            count_new_questions(questions)
+    except IntegrityError:
+        # доклад или автора удалили, пока вопрос ждал в буфере — сохраняем остальные
+        saved = []
+        for question in questions:
+            try:
+                with transaction.atomic():
+                    Question.objects.bulk_create([question])
+                    count_new_questions([question])
+            except IntegrityError:
+                logger.warning('Dropping question for missing talk %s', question.talk_id)
+            else:
+                saved.append(question)
+        questions = saved
+
+    by_talk = defaultdict(list)
+    for question in questions:
+        by_talk[question.talk_id].append(SavedQuestion(question.pk, question.text))
+
+    talks = Talk.objects.filter(pk__in=by_talk).values_list('pk', 'title', 'speaker__tg_id')
+    return [
+        SpeakerBatch(talk_title=title, speaker_tg_id=speaker_tg_id, questions=by_talk[talk_id])
+        for talk_id, title, speaker_tg_id in talks
+    ]
+
+
+def undelivered_questions(max_attempts: int) -> list[SpeakerBatch]:
+    """Неотправленные вопросы докладов со спикером, у которых остались попытки.
+
+    Сюда же попадают вопросы без попыток: заданные, пока у доклада не было
+    спикера, — они уходят, когда спикера назначат.
+    """
+    rows = (
+        Question.objects.filter(
+            status=QuestionStatus.PENDING,
+            delivery_attempts__lt=max_attempts,
+            talk__speaker__isnull=False,
+        )
+        .order_by('asked_at', 'pk')
+        .values_list('pk', 'text', 'talk_id', 'talk__title', 'talk__speaker__tg_id')
+    )
+    by_talk: dict[int, SpeakerBatch] = {}
+    for question_id, text, talk_id, title, speaker_tg_id in rows:
+        batch = by_talk.setdefault(talk_id, SpeakerBatch(title, speaker_tg_id, []))
+        batch.questions.append(SavedQuestion(question_id, text))
+    return list(by_talk.values())
+
+
+def mark_failed(question_ids: list[int]) -> None:
+    Question.objects.filter(pk__in=question_ids, status=QuestionStatus.PENDING).update(
+        delivery_attempts=F('delivery_attempts') + 1
+    )
+
+
+def mark_sent(deliveries: list[tuple[list[int], int]]) -> None:
+    """Переводит вопросы в «отправлен» одним UPDATE, с id сообщения у спикера."""
+    whens = [
+        When(pk__in=question_ids, then=Value(message_id))
+        for question_ids, message_id in deliveries
+    ]
+    question_ids = [pk for ids, _ in deliveries for pk in ids]
+    Question.objects.filter(pk__in=question_ids, status=QuestionStatus.PENDING).update(
+        status=QuestionStatus.SENT_TO_SPEAKER,
+        speaker_message_id=Case(*whens, output_field=BigIntegerField()),
+    )
+
+
+def format_digests(talk_title: str, questions: list[SavedQuestion]) -> list[tuple[str, list[int]]]:
+    """Тексты сообщений спикеру и id вопросов в каждом из них.
+
+    Один вопрос уходит отдельным сообщением, несколько — сводкой, которая
+    режется по лимиту длины сообщения Telegram.
+    """
+    if len(questions) == 1:
+        question = questions[0]
+        return [(f'❓ Новый вопрос к докладу «{talk_title}»:\n\n{question.text}', [question.question_id])]
+
+    digests = []
+    header = f'❓ Новые вопросы к докладу «{talk_title}»:'
+    text, ids = header, []
+    for number, question in enumerate(questions, start=1):
+        line = f'\n\n{number}. {question.text}'
+        if ids and len(text) + len(line) > MESSAGE_LIMIT:
+            digests.append((text, ids))
+            text, ids = header, []
+        text += line
+        ids.append(question.question_id)
+    digests.append((text, ids))
+    return digests
+
+
+class QuestionIntake:
+    """Буфер вопросов: пакетная запись в БД и сводки спикерам.
+
+    Вопросы копятся `QUESTION_FLUSH_INTERVAL` секунд, затем пишутся одним
+    `bulk_create`. Каждый спикер получает одно сообщение на пакет, а статусы
+    доставленных вопросов меняются одним UPDATE. Если сообщение спикеру не
+    ушло, вопросы остаются в статусе «получен», у них растёт счётчик попыток,
+    и раз в `QUESTION_RETRY_INTERVAL` секунд доставка повторяется — до
+    `QUESTION_MAX_DELIVERY_ATTEMPTS` попыток. Тот же проход отправляет вопросы
+    докладов, которым спикера назначили уже после вопроса.
+    """
+
+    def __init__(self, flush_interval: Optional[float] = None, retry_interval: Optional[float] = None):
+        self.flush_interval = (
+            settings.QUESTION_FLUSH_INTERVAL if flush_interval is None else flush_interval
+        )
+        self.retry_interval = (
+            settings.QUESTION_RETRY_INTERVAL if retry_interval is None else retry_interval
+        )
+        self._buffer: list[QuestionDraft] = []
+        self._has_questions: Optional[asyncio.Event] = None
+        self._bot: Optional[Bot] = None
+        self._task: Optional[asyncio.Task] = None
+        self._flushing: Optional[asyncio.Future] = None
+
+    async def start(self, application: Application) -> None:
+        self._bot = application.bot
+        self._has_questions = asyncio.Event()
+        if self._buffer:
+            self._has_questions.set()
+        self._task = asyncio.create_task(self._run(), name='question-intake')
+
+    async def stop(self, application: Optional[Application] = None) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        # начатую запись и отправку доводим до конца, потом сбрасываем остаток
+        if self._flushing is not None and not self._flushing.done():
+            await asyncio.wait([self._flushing])
+        await self.flush()
+
+    def submit(self, draft: QuestionDraft) -> None:
+        self._buffer.append(draft)
+        if self._has_questions is not None:
+            self._has_questions.set()
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        redeliver_at = loop.time() + self.retry_interval
+        while True:
+            try:
+                await asyncio.wait_for(self._has_questions.wait(), max(redeliver_at - loop.time(), 0))
+            except asyncio.TimeoutError:
+                pass
+            if self._has_questions.is_set():
+                await asyncio.sleep(self.flush_interval)
+                self._has_questions.clear()
+                self._flushing = asyncio.ensure_future(self.flush())
+                try:
+                    await asyncio.shield(self._flushing)
+                except Exception:
+                    logger.exception('Failed to flush questions')
+                    await asyncio.sleep(RETRY_DELAY)
+                    if self._buffer:
+                        self._has_questions.set()
+            if loop.time() >= redeliver_at:
+                # в той же задаче, что и запись: вопрос не уйдёт спикеру двумя путями сразу
+                self._flushing = asyncio.ensure_future(self.redeliver())
+                try:
+                    await asyncio.shield(self._flushing)
+                except Exception:
+                    logger.exception('Failed to redeliver questions')
+                redeliver_at = loop.time() + self.retry_interval
+
+    async def flush(self) -> None:
+        drafts, self._buffer = self._buffer, []
+        if not drafts:
+            return
+        try:
+            batches = await run_db(save_questions, drafts)
+        except Exception:
+            self._buffer[:0] = drafts
+            raise
+        await self._deliver(batches)
+
+    async def redeliver(self) -> None:
+        """Повторяет доставку вопросов, которые раньше не ушли спикеру."""
+        batches = await run_db(undelivered_questions, settings.QUESTION_MAX_DELIVERY_ATTEMPTS)
+        await self._deliver(batches)
+
+    async def _deliver(self, batches: list[SpeakerBatch]) -> None:
+        deliveries, failed = [], []
+        for batch in batches:
+            if batch.speaker_tg_id is None:
+                continue
+            digests = format_digests(batch.talk_title, batch.questions)
+            for number, (text, question_ids) in enumerate(digests):
+                try:
+                    message = await self._bot.send_message(chat_id=batch.speaker_tg_id, text=text)
+                except TelegramError as exc:
+                    logger.warning('Cannot deliver questions to speaker %s: %s', batch.speaker_tg_id, exc)
+                    failed.extend(pk for _, ids in digests[number:] for pk in ids)
+                    break
+                deliveries.append((question_ids, message.message_id))
+        if deliveries:
+            await run_db(mark_sent, deliveries)
+        if failed:
+            await run_db(mark_failed, failed)
+
+
+question_intake = QuestionIntake()
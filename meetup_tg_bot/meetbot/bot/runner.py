@@ -1,26 +1,129 @@
 import logging
+from typing import Awaitable, Callable, Optional
 
 from django.conf import settings
+from prometheus_client import start_http_server
+from telegram import Update
+from telegram.request import BaseRequest, HTTPXRequest
 from telegram.ext import (
     Application,
     ApplicationBuilder,
     CallbackQueryHandler,
     CommandHandler,
     MessageHandler,
+    TypeHandler,
     filters,
 )
 
-from .handlers import handle_menu_callback, start, unknown_command
+from meetbot.matching import NETWORKING_CHANNEL, match_indexes
+from meetbot.models import OutboxTopic
+from meetbot.outbox import OUTBOX_CHANNEL
+from meetbot.participants import PARTICIPANT_CHANNEL
+from meetbot.program import PROGRAM_CHANNEL, invalidate_caches
+from meetbot.pubsub import PgListener
+from meetbot.yookassa import yookassa_client
+
+from .broadcast import BroadcastEngine
+from .db import shutdown_db_executor, submit_db
+from .donations import CALLBACK_DONATION_AMOUNT, handle_donation_amount
+from .handlers import (
+    handle_menu_callback,
+    handle_question_text,
+    start,
+    track_participant,
+    unknown_command,
+)
+from .identity import participant_directory
+from .persistence import DjangoPersistence
+from .inbox import handle_inbox_page, handle_mark_answered, send_answer_notices, show_inbox
+from .metrics import InstrumentedRequest, instrument_handlers, update_queue_collector
+from .outbox import OutboxConsumer
+from .processor import ChatOrderedUpdateProcessor
+from .questions import question_intake
+from .stats import EventStatsRefresher
+from .timeline import TalkScheduler
+from .warmup import Warmup, warm_program_caches
 
 logger = logging.getLogger(__name__)
 
+# как у ApplicationBuilder по умолчанию
+TELEGRAM_CONNECTION_POOL_SIZE = 256
+
+LifecycleHook = Callable[[Application], Awaitable[None]]
+
+
+def _chain(*hooks: LifecycleHook) -> LifecycleHook:
+    async def run_hooks(application: Application) -> None:
+        for hook in hooks:
+            await hook(application)
 
-def build_application(token: str) -> Application:
-    
-    application = ApplicationBuilder().token(token).build()
+    return run_hooks
+
+
+def build_application(token: str, request: Optional[BaseRequest] = None) -> Application:
+
+    broadcasts = BroadcastEngine()
+    stats = EventStatsRefresher()
+    timeline = TalkScheduler()
+    listener = PgListener()
+    listener.subscribe(PROGRAM_CHANNEL, invalidate_caches)
+    listener.subscribe(PARTICIPANT_CHANNEL, participant_directory.on_participant_changed)
+    # пересчёт ряда анкеты читает БД — уводим его из event loop
+    listener.subscribe(NETWORKING_CHANNEL, lambda payload: submit_db(match_indexes.on_profile_changed, payload))
+    outbox = OutboxConsumer(listener)
+    outbox.register(OutboxTopic.TALK_CHANGED, timeline.on_talks_changed)
+    outbox.register(OutboxTopic.EVENT_CHANGED, timeline.on_events_changed)
+    outbox.register(OutboxTopic.EVENT_PUBLISHED, broadcasts.announce_events)
+    outbox.register(OutboxTopic.QUESTION_ANSWERED, send_answer_notices)
+    listener.subscribe(OUTBOX_CHANNEL, outbox.on_notify)
+    # соединения и чтение БД — в фоне, чтобы бот начал принимать апдейты сразу
+    warmup = Warmup(listener.start, warm_program_caches, timeline.start, outbox.start)
+
+    builder = (
+        ApplicationBuilder()
+        .token(token)
+        .persistence(DjangoPersistence())
+        .post_init(_chain(yookassa_client.open, broadcasts.start, question_intake.start, stats.start, warmup.start))
+        .post_stop(
+            _chain(
+                warmup.stop,
+                outbox.stop,
+                timeline.stop,
+                stats.stop,
+                question_intake.stop,
+                broadcasts.stop,
+                listener.stop,
+            )
+        )
+        .post_shutdown(_chain(yookassa_client.aclose, shutdown_db_executor))
+    )
+    if settings.TELEGRAM_API_BASE_URL:
+        builder = builder.base_url(settings.TELEGRAM_API_BASE_URL)
+    if settings.BOT_CONCURRENT_UPDATES > 1:
+        builder = builder.concurrent_updates(
+            ChatOrderedUpdateProcessor(settings.BOT_CONCURRENT_UPDATES)
+        )
+    builder = builder.request(
+        InstrumentedRequest(request or HTTPXRequest(connection_pool_size=TELEGRAM_CONNECTION_POOL_SIZE))
+    )
+    if request is not None:
+        # например, FakeBotApi в тестах
+        builder = builder.get_updates_request(request)
+    application = builder.build()
+    application.add_handler(TypeHandler(Update, track_participant), group=-1)
     application.add_handler(CommandHandler('start', start))
+    application.add_handler(CommandHandler('inbox', show_inbox))
     application.add_handler(CallbackQueryHandler(handle_menu_callback, pattern='^menu_'))
+    application.add_handler(CallbackQueryHandler(handle_inbox_page, pattern='^inbox:'))
+    application.add_handler(
+        CallbackQueryHandler(handle_donation_amount, pattern=f'^{CALLBACK_DONATION_AMOUNT}:')
+    )
+    application.add_handler(CallbackQueryHandler(handle_mark_answered, pattern='^inboxok:'))
     application.add_handler(MessageHandler(filters.COMMAND, unknown_command))
+    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_question_text))
+    # после всех add_handler: метрики получают и обработчики, добавленные выше
+    instrument_handlers(application)
+    update_queue_collector.track(application)
     return application
 
 
@@ -28,6 +131,17 @@ def run_bot() -> None:
 
     if not settings.TELEGRAM_BOT_TOKEN:
         raise RuntimeError('TELEGRAM_BOT_TOKEN не задан в переменных окружения')
+    if settings.TELEGRAM_BOT_MODE == 'webhook':
+        # штатное завершение: docker-compose с restart: on-failure не перезапускает сервис по кругу
+        logger.warning(
+            'TELEGRAM_BOT_MODE=webhook: бот принимает апдейты через ASGI-приложение, '
+            'отдельный процесс с long polling не нужен'
+        )
+        return
+
+    if settings.BOT_METRICS_PORT:
+        start_http_server(settings.BOT_METRICS_PORT, addr=settings.BOT_METRICS_ADDR)
+        logger.info('Metrics are served on port %s', settings.BOT_METRICS_PORT)
 
     logger.info('Starting Telegram bot...')
     application = build_application(settings.TELEGRAM_BOT_TOKEN)
@@ -0,0 +1,90 @@
+"""Холодный старт бота: сколько проходит от запуска процесса до ответа.
+
+Бот запускается отдельным процессом — как `bot` в docker-compose — и ходит
+в `FakeBotApiServer` вместо Telegram (`TELEGRAM_API_BASE_URL`). Первый же
+`getUpdates` отдаёт `/start`; замеряется время до первого `getUpdates`
+(бот начал polling) и до `sendMessage` с ответом (первый апдейт обработан).
+Время отсчитывается от запуска процесса, то есть включает импорт Django,
+PTB и кода бота.
+"""
+import os
+import statistics
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Any
+
+from django.conf import settings
+
+from .benchmark import BENCHMARK_TOKEN, FIRST_USER_ID
+from .fake_telegram import FakeBotApiServer, FakeTelegramSender
+
+STARTUP_TIMEOUT = 60.0
+
+ENTRY_POINTS = {
+    'runbot': ['manage.py', 'runbot'],
+    'lean': ['-m', 'meetbot.bot'],
+}
+
+
+@dataclass
+class StartupResult:
+    entry_point: str
+    polling: list[float] = field(default_factory=list)
+    first_reply: list[float] = field(default_factory=list)
+
+    def as_dict(self) -> dict[str, Any]:
+        def summary(values: list[float]) -> dict[str, float]:
+            return {
+                'median': round(statistics.median(values) * 1000, 1),
+                'min': round(min(values) * 1000, 1),
+                'max': round(max(values) * 1000, 1),
+            }
+
+        return {
+            'entry_point': self.entry_point,
+            'runs': len(self.first_reply),
+            'polling_ms': summary(self.polling),
+            'first_reply_ms': summary(self.first_reply),
+        }
+
+
+def measure_startup(entry_point: str, environment: dict[str, str]) -> tuple[float, float]:
+    """Один запуск; возвращает секунды до первого getUpdates и до ответа на /start."""
+    sender = FakeTelegramSender()
+    with FakeBotApiServer([sender.message(FIRST_USER_ID, '/start')]) as api:
+        environment = environment | {
+            'TELEGRAM_API_BASE_URL': api.base_url,
+            'TELEGRAM_BOT_TOKEN': BENCHMARK_TOKEN,
+            'TELEGRAM_BOT_MODE': 'polling',
+            'BOT_METRICS_PORT': '0',
+        }
+        started = time.perf_counter()
+        process = subprocess.Popen(
+            [sys.executable, *ENTRY_POINTS[entry_point]],
+            cwd=settings.BASE_DIR,
+            env=environment,
+        )
+        try:
+            deadline = started + STARTUP_TIMEOUT
+            while not api.wait_for_reply(0.05):
+                if process.poll() is not None:
+                    raise RuntimeError(f'бот завершился с кодом {process.returncode}')
+                if time.perf_counter() > deadline:
+                    raise RuntimeError(f'бот не ответил за {STARTUP_TIMEOUT:.0f} с')
+        finally:
+            process.terminate()
+            process.wait(timeout=STARTUP_TIMEOUT)
+    return api.first_calls['getUpdates'] - started, api.first_calls['sendMessage'] - started
+
+
+def benchmark_startup(entry_point: str, runs: int, database: str) -> StartupResult:
+    """`database` — имя базы, в которую бот пишет участника из /start."""
+    environment = os.environ | {'POSTGRES_DB': database}
+    result = StartupResult(entry_point)
+    for _ in range(runs):
+        polling, first_reply = measure_startup(entry_point, environment)
+        result.polling.append(polling)
+        result.first_reply.append(first_reply)
+    return result
@@ -0,0 +1,41 @@
+import asyncio
+import logging
+from typing import Optional
+
+from django.conf import settings
+from telegram.ext import Application
+
+from meetbot.stats import refresh_event_stats
+
+from .db import run_db
+
+logger = logging.getLogger(__name__)
+
+
+class EventStatsRefresher:
+    """Пересчитывает статистику активных мероприятий раз в `EVENT_STATS_REFRESH_INTERVAL` секунд."""
+
+    def __init__(self, interval: Optional[float] = None):
+        self.interval = settings.EVENT_STATS_REFRESH_INTERVAL if interval is None else interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self, application: Optional[Application] = None) -> None:
+        self._task = asyncio.create_task(self._run(), name='event-stats')
+
+    async def stop(self, application: Optional[Application] = None) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await run_db(refresh_event_stats)
+            except Exception:
+                logger.exception('Failed to refresh event stats')
@@ -0,0 +1,170 @@
+"""Планировщик докладов на `JobQueue` PTB.
+
+Расписание (`meetbot.timeline`) загружается одним запросом в кучу по
+времени. В `JobQueue` всегда стоит ровно одна задача — на ближайший
+переход; сработав, она выполняет все наступившие переходы и ставит себя
+на следующий. БД между переходами не опрашивается.
+
+Правка доклада перепланирует только его: записи доклада в куче
+помечаются устаревшими (версия доклада растёт) и пропускаются при
+извлечении, а новые переходы добавляются с новой версией.
+
+Переход, который не удалось применить (например, упала БД), возвращается
+в кучу и повторяется с растущей задержкой, пока не пройдёт или не устареет.
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+from datetime import datetime, timedelta
+from typing import Optional
+
+from django.utils import timezone
+from telegram.ext import Application, ContextTypes, Job, JobQueue
+
+from meetbot.timeline import TalkTransition, apply_transition, load_timeline, talk_timeline
+
+from .db import run_db
+
+logger = logging.getLogger(__name__)
+
+JOB_NAME = 'talk-timeline'
+
+# APScheduler может разбудить задачу чуть раньше срока
+DUE_TOLERANCE = timedelta(seconds=1)
+
+# задержка повтора упавшего перехода: удваивается с каждой попыткой до потолка
+RETRY_DELAY = timedelta(seconds=5)
+MAX_RETRY_DELAY = timedelta(minutes=5)
+
+
+class TalkScheduler:
+    def __init__(self):
+        self._heap: list[tuple[datetime, int, int, TalkTransition]] = []
+        self._versions: dict[int, int] = {}
+        self._attempts: dict[TalkTransition, int] = {}
+        self._sequence = itertools.count()
+        self._job_queue: Optional[JobQueue] = None
+        self._job: Optional[Job] = None
+        self._job_at: Optional[datetime] = None
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def start(self, application: Application) -> None:
+        if application.job_queue is None:
+            logger.warning('JobQueue is not available, talks will not be advanced automatically')
+            return
+        self._job_queue = application.job_queue
+        self._lock = asyncio.Lock()
+        await self.refresh()
+
+    async def stop(self, application: Optional[Application] = None) -> None:
+        # `post_stop` идёт после `Application.stop()`: JobQueue уже остановлена вместе с задачей
+        self._job = None
+        self._job_at = None
+        self._heap.clear()
+        self._versions.clear()
+        self._attempts.clear()
+        self._job_queue = None
+
+    async def refresh(self, talk_id: Optional[int] = None) -> None:
+        """Перечитывает переходы доклада или, без `talk_id`, всё расписание."""
+        if self._job_queue is None:
+            return
+        now = timezone.now()
+        if talk_id is None:
+            transitions = await run_db(load_timeline, now)
+        else:
+            transitions = await run_db(talk_timeline, talk_id, now)
+        async with self._lock:
+            if self._job_queue is None:
+                return
+            if talk_id is None:
+                self._heap.clear()
+                self._versions.clear()
+                self._attempts.clear()
+            else:
+                self._versions[talk_id] = self._versions.get(talk_id, 0) + 1
+            for transition in transitions:
+                self._push(transition)
+            self._arm()
+
+    async def on_talks_changed(self, application: Application, talk_ids: list[int]) -> None:
+        """Обработчик outbox: один доклад перепланируется отдельно, несколько — общей загрузкой."""
+        await self.refresh(talk_ids[0] if len(talk_ids) == 1 else None)
+
+    async def on_events_changed(self, application: Application, event_ids: list[int]) -> None:
+        await self.refresh()
+
+    @property
+    def next_transition(self) -> Optional[TalkTransition]:
+        self._drop_stale()
+        return self._heap[0][3] if self._heap else None
+
+    def _push(self, transition: TalkTransition) -> None:
+        version = self._versions.get(transition.talk_id, 0)
+        heapq.heappush(self._heap, (transition.at, next(self._sequence), version, transition))
+
+    def _drop_stale(self) -> None:
+        while self._heap and self._heap[0][2] != self._versions.get(self._heap[0][3].talk_id, 0):
+            heapq.heappop(self._heap)
+
+    def _next_at(self) -> Optional[datetime]:
+        self._drop_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def _arm(self) -> None:
+        """Ставит единственную задачу на ближайший переход."""
+        at = self._next_at()
+        if at is None:
+            self._cancel_job()
+            return
+        if self._job is not None and self._job_at == at:
+            return
+        self._cancel_job()
+        self._job = self._job_queue.run_once(self._fire, when=at, name=JOB_NAME)
+        self._job_at = at
+
+    def _cancel_job(self) -> None:
+        if self._job is not None:
+            self._job.schedule_removal()
+        self._job = None
+        self._job_at = None
+
+    def _pop_due(self) -> list[tuple[int, TalkTransition]]:
+        """Наступившие переходы вместе с версией доклада, с которой они были запланированы."""
+        due_before = timezone.now() + DUE_TOLERANCE
+        due = []
+        while (at := self._next_at()) is not None and at <= due_before:
+            _, _, version, transition = heapq.heappop(self._heap)
+            due.append((version, transition))
+        return due
+
+    def _retry_later(self, version: int, transition: TalkTransition) -> None:
+        """Возвращает упавший переход в кучу; с прежней версией он устареет, если доклад поправят."""
+        attempt = self._attempts.get(transition, 0) + 1
+        self._attempts[transition] = attempt
+        delay = min(RETRY_DELAY * 2 ** (attempt - 1), MAX_RETRY_DELAY)
+        logger.warning('Talk transition %s will be retried in %s (attempt %s)', transition, delay, attempt)
+        heapq.heappush(self._heap, (timezone.now() + delay, next(self._sequence), version, transition))
+
+    async def _fire(self, context: ContextTypes.DEFAULT_TYPE) -> None:
+        async with self._lock:
+            self._job = None
+            self._job_at = None
+            due = self._pop_due()
+        failed = []
+        for version, transition in due:
+            try:
+                applied = await run_db(apply_transition, transition)
+            except Exception:
+                failed.append((version, transition))
+                logger.exception('Talk transition %s failed', transition)
+                continue
+            self._attempts.pop(transition, None)
+            logger.info('Talk %s: %s %s', transition.talk_id, transition.kind, 'done' if applied else 'skipped')
+        async with self._lock:
+            if self._job_queue is None:
+                return
+            for version, transition in failed:
+                self._retry_later(version, transition)
+            self._arm()
@@ -0,0 +1,68 @@
+"""Прогрев бота после старта.
+
+Всё, что читает БД или открывает соединения, но не нужно для ответа на
+первый апдейт, выполняется здесь в фоне: `post_init` сразу возвращается, и
+бот начинает polling (или принимать вебхуки), пока прогрев идёт. Хуки
+выполняются по очереди в порядке передачи — outbox стоит после планировщика,
+чтобы правки расписания не применились раньше загрузки всего расписания.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+from telegram.ext import Application
+
+from meetbot.program import current_talk_cache, program_cache
+
+from .db import run_db
+
+logger = logging.getLogger(__name__)
+
+TASK_NAME = 'warmup'
+
+WarmupHook = Callable[[Application], Awaitable[Any]]
+
+
+async def warm_program_caches(application: Application) -> None:
+    """Программа и текущий доклад — первое, что смотрят участники после /start."""
+    await run_db(program_cache.load)
+    await run_db(current_talk_cache.load)
+
+
+async def wait_for_warmup() -> None:
+    """Дождаться прогрева, запущенного в этом event loop (для тестов и замеров)."""
+    tasks = [task for task in asyncio.all_tasks() if task.get_name() == TASK_NAME]
+    if tasks:
+        await asyncio.wait(tasks)
+
+
+class Warmup:
+    def __init__(self, *hooks: WarmupHook):
+        self.hooks = hooks
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self, application: Application) -> None:
+        self._task = asyncio.create_task(self._run(application), name=TASK_NAME)
+
+    async def stop(self, application: Optional[Application] = None) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self, application: Application) -> None:
+        started = time.perf_counter()
+        for hook in self.hooks:
+            try:
+                await hook(application)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # упавший шаг не отменяет остальные, бот при этом продолжает отвечать
+                logger.exception('Warm-up step %s failed', getattr(hook, '__qualname__', hook))
+        logger.info('Bot warmed up in %.2f s', time.perf_counter() - started)
@@ -0,0 +1,89 @@
+import logging
+from typing import Optional
+
+from django.conf import settings
+from telegram import Update
+from telegram.ext import Application
+
+from .runner import build_application
+
+logger = logging.getLogger(__name__)
+
+_application: Optional[Application] = None
+
+
+def get_application() -> Optional[Application]:
+    """Запущенное в этом процессе приложение бота или None."""
+    return _application
+
+
+async def start_webhook_application(application: Optional[Application] = None) -> Application:
+    """Поднимает бота внутри веб-процесса и регистрирует вебхук в Telegram."""
+    global _application
+    if _application is not None:
+        return _application
+
+    if application is None:
+        if not settings.TELEGRAM_BOT_TOKEN:
+            raise RuntimeError('TELEGRAM_BOT_TOKEN не задан в переменных окружения')
+        application = build_application(settings.TELEGRAM_BOT_TOKEN)
+
+    await application.initialize()
+    if application.post_init:
+        await application.post_init(application)
+    await application.start()
+
+    if settings.TELEGRAM_WEBHOOK_URL:
+        await application.bot.set_webhook(
+            url=settings.TELEGRAM_WEBHOOK_URL,
+            secret_token=settings.TELEGRAM_WEBHOOK_SECRET or None,
+            allowed_updates=Update.ALL_TYPES,
+        )
+        logger.info('Telegram webhook set to %s', settings.TELEGRAM_WEBHOOK_URL)
+
+    _application = application
+    return application
+
+
+async def stop_webhook_application() -> None:
+    global _application
+    application, _application = _application, None
+    if application is None:
+        return
+
+    await application.stop()
+    if application.post_stop:
+        await application.post_stop(application)
+    await application.shutdown()
+    if application.post_shutdown:
+        await application.post_shutdown(application)
+
+
+class WebhookLifespan:
+    """ASGI-обёртка: запускает и останавливает бота вместе с сервером.
+
+    Django сам не обрабатывает lifespan-события, поэтому они перехватываются
+    здесь, а HTTP-запросы уходят в обычное Django-приложение.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'lifespan':
+            return await self.app(scope, receive, send)
+
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                try:
+                    await start_webhook_application()
+                except Exception as exc:
+                    logger.exception('Failed to start Telegram bot')
+                    await send({'type': 'lifespan.startup.failed', 'message': str(exc)})
+                    return
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await stop_webhook_application()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
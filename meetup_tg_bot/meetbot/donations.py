@@ -0,0 +1,137 @@
+"""Донаты: запись в БД и применение статусов платежей YooKassa."""
+import asyncio
+import logging
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal
+from typing import Iterable, Iterator, Optional
+
+from asgiref.sync import sync_to_async
+from django.db.models import Case, CharField, F, Q, Value, When
+
+from .models import Donation, DonationStatus, Event
+from .yookassa import Payment, YooKassaClient, YooKassaError
+
+logger = logging.getLogger(__name__)
+
+# YooKassa не возвращает платёж из финального статуса, поэтому обновляем только эти
+OPEN_STATUSES = (DonationStatus.PENDING, DonationStatus.WAITING_FOR_CAPTURE)
+
+PROVIDER_STATUSES = {
+    'pending': DonationStatus.PENDING,
+    'waiting_for_capture': DonationStatus.WAITING_FOR_CAPTURE,
+    'succeeded': DonationStatus.SUCCEEDED,
+    'canceled': DonationStatus.CANCELED,
+}
+
+
+def create_donation(event_id: int, participant_id: Optional[int], amount: Decimal) -> Donation:
+    event_name = Event.objects.filter(pk=event_id).values_list('name', flat=True).first() or 'Python Meetup'
+    return Donation.objects.create(
+        event_id=event_id,
+        participant_id=participant_id,
+        amount=amount,
+        idempotence_key=uuid.uuid4().hex,
+        description=f'Донат на {event_name}',
+    )
+
+
+def attach_payment(donation_id: int, payment: Payment) -> None:
+    Donation.objects.filter(pk=donation_id).update(
+        yookassa_payment_id=payment.id,
+        confirmation_url=payment.confirmation_url,
+        status=PROVIDER_STATUSES.get(payment.status, DonationStatus.PENDING),
+    )
+
+
+def apply_payment_statuses(payments: Iterable[Payment]) -> int:
+    """Переносит статусы платежей в донаты одним UPDATE; возвращает число изменённых."""
+    statuses = {
+        payment.id: PROVIDER_STATUSES[payment.status]
+        for payment in payments
+        if payment.status in PROVIDER_STATUSES
+    }
+    if not statuses:
+        return 0
+    whens = [When(yookassa_payment_id=payment_id, then=Value(status)) for payment_id, status in statuses.items()]
+    return Donation.objects.filter(yookassa_payment_id__in=statuses, status__in=OPEN_STATUSES).update(
+        status=Case(*whens, default=F('status'), output_field=CharField())
+    )
+
+
+def stale_donation_chunks(created_before: datetime, chunk_size: int) -> Iterator[list[tuple[int, str]]]:
+    """Незавершённые платежи старше `created_before` пачками `(id, payment_id)`.
+
+    Пачки читаются по ключу `(created_at, id)`, поэтому в памяти одна пачка,
+    а каждый запрос идёт по индексу `donation_status_created_idx`.
+    """
+    stale = (
+        Donation.objects.filter(status__in=OPEN_STATUSES, created_at__lt=created_before)
+        .exclude(yookassa_payment_id='')
+        .order_by('created_at', 'id')
+    )
+    cursor = None
+    while True:
+        chunk = stale
+        if cursor is not None:
+            created_at, pk = cursor
+            chunk = chunk.filter(Q(created_at__gt=created_at) | Q(created_at=created_at, pk__gt=pk))
+        rows = list(chunk.values_list('pk', 'yookassa_payment_id', 'created_at')[:chunk_size])
+        if not rows:
+            return
+        yield [(pk, payment_id) for pk, payment_id, _ in rows]
+        cursor = (rows[-1][2], rows[-1][0])
+
+
+def fail_unissued_donations(created_before: datetime) -> int:
+    """Донаты, для которых платёж так и не создали, помечаются неуспешными."""
+    return Donation.objects.filter(
+        status__in=OPEN_STATUSES,
+        created_at__lt=created_before,
+        yookassa_payment_id='',
+    ).update(status=DonationStatus.FAILED)
+
+
+@dataclass
+class ReconcileStats:
+    checked: int = 0
+    updated: int = 0
+    failed: int = 0
+    unissued: int = 0
+
+
+async def reconcile_donations(
+    client: YooKassaClient,
+    created_before: datetime,
+    chunk_size: int = 500,
+    concurrency: int = 10,
+) -> ReconcileStats:
+    """Сверяет зависшие донаты с YooKassa.
+
+    Не больше `concurrency` запросов к API одновременно; статусы пачки
+    применяются одним UPDATE.
+    """
+    stats = ReconcileStats()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch(payment_id: str) -> Optional[Payment]:
+        async with semaphore:
+            try:
+                return await client.get_payment(payment_id)
+            except YooKassaError as exc:
+                logger.warning('Cannot fetch payment %s: %s', payment_id, exc)
+                stats.failed += 1
+                return None
+
+    chunks = stale_donation_chunks(created_before, chunk_size)
+    next_chunk = sync_to_async(lambda: next(chunks, None))
+    while (chunk := await next_chunk()) is not None:
+        payments = await asyncio.gather(*(fetch(payment_id) for _, payment_id in chunk))
+        stats.checked += len(chunk)
+        stats.updated += await sync_to_async(apply_payment_statuses)(
+            [payment for payment in payments if payment is not None and payment.status != 'pending']
+        )
+    stats.unissued = await sync_to_async(fail_unissued_donations)(created_before)
+    return stats
+
@@ -0,0 +1,80 @@
+"""Поддельный API YooKassa для тестов и локального запуска.
+
+`FakeYooKassa` — транспорт httpx: подставляется в `YooKassaClient` вместо
+сети, хранит платежи в памяти и, как настоящий API, отдаёт тот же платёж
+на повторный запрос с тем же `Idempotence-Key`.
+"""
+import asyncio
+import json
+import uuid
+from typing import Optional
+
+import httpx
+
+
+class FakeYooKassa(httpx.AsyncBaseTransport):
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.payments: dict[str, dict] = {}
+        self.requests: list[httpx.Request] = []
+        self.failures: list[int] = []
+        self._by_key: dict[str, str] = {}
+
+    def fail_next(self, *status_codes: int) -> None:
+        """Следующие запросы получат эти коды (0 — обрыв соединения)."""
+        self.failures.extend(status_codes)
+
+    def set_status(self, payment_id: str, status: str) -> dict:
+        payment = self.payments[payment_id]
+        payment['status'] = status
+        payment['paid'] = status in ('succeeded', 'waiting_for_capture')
+        return payment
+
+    def notification(self, payment_id: str) -> dict:
+        """Тело уведомления, которое YooKassa шлёт на вебхук."""
+        payment = self.payments[payment_id]
+        return {'type': 'notification', 'event': f'payment.{payment["status"]}', 'object': payment}
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.failures:
+            status_code = self.failures.pop(0)
+            if not status_code:
+                raise httpx.ConnectError('connection refused', request=request)
+            return httpx.Response(status_code, json={'type': 'error', 'code': 'internal_server_error'})
+
+        path = request.url.path.rstrip('/').split('/')
+        if request.method == 'POST' and path[-1] == 'payments':
+            return self._create(request)
+        if request.method == 'GET' and path[-2] == 'payments':
+            payment = self.payments.get(path[-1])
+            if payment is None:
+                return httpx.Response(404, json={'type': 'error', 'code': 'not_found'})
+            return httpx.Response(200, json=payment)
+        return httpx.Response(404, json={'type': 'error', 'code': 'not_found'})
+
+    def _create(self, request: httpx.Request) -> httpx.Response:
+        key: Optional[str] = request.headers.get('Idempotence-Key')
+        if not key:
+            return httpx.Response(400, json={'type': 'error', 'code': 'invalid_request'})
+        if key in self._by_key:
+            return httpx.Response(200, json=self.payments[self._by_key[key]])
+
+        body = json.loads(request.content)
+        payment_id = str(uuid.uuid4())
+        self.payments[payment_id] = {
+            'id': payment_id,
+            'status': 'pending',
+            'paid': False,
+            'amount': body['amount'],
+            'description': body.get('description', ''),
+            'metadata': body.get('metadata', {}),
+            'confirmation': {
+                'type': 'redirect',
+                'confirmation_url': f'https://yoomoney.example/checkout/{payment_id}',
+            },
+        }
+        self._by_key[key] = payment_id
+        return httpx.Response(200, json=self.payments[payment_id])
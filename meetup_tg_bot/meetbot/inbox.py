@@ -0,0 +1,244 @@
+"""Входящие вопросы спикера: keyset-пагинация и счётчики по докладам.
+
+Страницы листаются курсором `(asked_at, id)`, а не OFFSET, поэтому стоимость
+страницы не растёт с числом вопросов и новые вопросы не сдвигают выдачу.
+Счётчики `TalkQuestionCounter` меняются вместе со статусами вопросов:
+массовые операции обновляют их явно, одиночные сохранения — через сигналы.
+"""
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Iterable, Optional
+
+from django.db import transaction
+from django.db.models import Count, F, Q
+
+from .models import OutboxTopic, Question, QuestionStatus, Talk, TalkQuestionCounter
+from .outbox import publish
+
+UNREAD_STATUSES = (QuestionStatus.PENDING, QuestionStatus.SENT_TO_SPEAKER)
+
+Cursor = tuple[datetime, int]
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+
+def counter_field(status: str) -> Optional[str]:
+    if status in UNREAD_STATUSES:
+        return 'unread_count'
+    if status == QuestionStatus.ANSWERED:
+        return 'answered_count'
+    return None
+
+
+def apply_counter_deltas(deltas: dict[int, Counter]) -> None:
+    """Прибавляет к счётчикам докладов `{talk_id: Counter(field=delta)}`."""
+    deltas = {talk_id: delta for talk_id, delta in deltas.items() if any(delta.values())}
+    if not deltas:
+        return
+    TalkQuestionCounter.objects.bulk_create(
+        [TalkQuestionCounter(talk_id=talk_id) for talk_id in deltas],
+        ignore_conflicts=True,
+    )
+    for talk_id, delta in deltas.items():
+        TalkQuestionCounter.objects.filter(talk_id=talk_id).update(
+            **{field: F(field) + value for field, value in delta.items() if value}
+        )
+
+
+def count_new_questions(questions: Iterable[Question]) -> None:
+    deltas = defaultdict(Counter)
+    for question in questions:
+        field = counter_field(question.status)
+        if field:
+            deltas[question.talk_id][field] += 1
+    apply_counter_deltas(deltas)
+
+
+def set_question_status(
+    question_ids: list[int],
+    status: str,
+    talk_id: Optional[int] = None,
+    **fields,
+) -> int:
+    """Меняет статус вопросов одним UPDATE и поправляет счётчики.
+
+    `talk_id` ограничивает изменение вопросами одного доклада.
+    """
+    questions = Question.objects.select_for_update().filter(pk__in=question_ids)
+    if talk_id is not None:
+        questions = questions.filter(talk_id=talk_id)
+    with transaction.atomic():
+        rows = list(questions.exclude(status=status).values_list('pk', 'talk_id', 'status'))
+        if not rows:
+            return 0
+        Question.objects.filter(pk__in=[pk for pk, _, _ in rows]).update(status=status, **fields)
+
+        deltas = defaultdict(Counter)
+        new_field = counter_field(status)
+        for _, question_talk_id, old_status in rows:
+            old_field = counter_field(old_status)
+            if old_field != new_field:
+                if old_field:
+                    deltas[question_talk_id][old_field] -= 1
+                if new_field:
+                    deltas[question_talk_id][new_field] += 1
+        apply_counter_deltas(deltas)
+        if status == QuestionStatus.ANSWERED:
+            publish(OutboxTopic.QUESTION_ANSWERED, [pk for pk, _, _ in rows])
+    return len(rows)
+
+
+def rebuild_counters(talk_ids: Optional[Iterable[int]] = None) -> None:
+    """Пересчитывает счётчики с нуля (после ручных правок в БД)."""
+    talks = Talk.objects.all()
+    if talk_ids is not None:
+        talks = talks.filter(pk__in=list(talk_ids))
+    with transaction.atomic():
+        unread = Q(questions__status__in=UNREAD_STATUSES)
+        answered = Q(questions__status=QuestionStatus.ANSWERED)
+        counters = [
+            TalkQuestionCounter(talk_id=talk_id, unread_count=unread_count, answered_count=answered_count)
+            for talk_id, unread_count, answered_count in talks.annotate(
+                unread_count=Count('questions', filter=unread),
+                answered_count=Count('questions', filter=answered),
+            ).values_list('pk', 'unread_count', 'answered_count')
+        ]
+        TalkQuestionCounter.objects.bulk_create(
+            counters,
+            update_conflicts=True,
+            unique_fields=['talk'],
+            update_fields=['unread_count', 'answered_count'],
+        )
+
+
+def encode_cursor(cursor: Cursor) -> str:
+    asked_at, pk = cursor
+    micros = (asked_at - EPOCH) // MICROSECOND
+    return f'{_base36(micros)}.{_base36(pk)}'
+
+
+def decode_cursor(value: str) -> Optional[Cursor]:
+    if not value:
+        return None
+    micros, pk = value.split('.')
+    asked_at = EPOCH + int(micros, 36) * MICROSECOND
+    return asked_at, int(pk, 36)
+
+
+def _base36(number: int) -> str:
+    digits = '0123456789abcdefghijklmnopqrstuvwxyz'
+    result = ''
+    while True:
+        number, remainder = divmod(number, 36)
+        result = digits[remainder] + result
+        if not number:
+            return result
+
+
+@dataclass(frozen=True)
+class InboxQuestion:
+    question_id: int
+    text: str
+    status: str
+
+
+@dataclass(frozen=True)
+class InboxPage:
+    talk_id: int
+    talk_title: str
+    unread_count: int
+    answered_count: int
+    questions: list[InboxQuestion]
+    next_cursor: Optional[str]
+
+
+def speaker_talks(participant_id: int, is_organizer: bool = False) -> list[tuple[int, str, int, int]]:
+    """Доклады спикера (или все доклады для организатора) со счётчиками."""
+    talks = Talk.objects.filter(event__is_active=True)
+    if not is_organizer:
+        talks = talks.filter(speaker_id=participant_id)
+    return [
+        (talk_id, title, unread or 0, answered or 0)
+        for talk_id, title, unread, answered in talks.order_by('order', 'start_at').values_list(
+            'pk', 'title', 'question_counter__unread_count', 'question_counter__answered_count'
+        )
+    ]
+
+
+def _managed_talks(participant_id: int, is_organizer: bool):
+    talks = Talk.objects.all()
+    if not is_organizer:
+        talks = talks.filter(speaker_id=participant_id)
+    return talks
+
+
+def can_manage_talk(talk_id: int, participant_id: int, is_organizer: bool = False) -> bool:
+    return _managed_talks(participant_id, is_organizer).filter(pk=talk_id).exists()
+
+
+def inbox_page(
+    talk_id: int,
+    participant_id: int,
+    cursor: Optional[Cursor] = None,
+    limit: int = 5,
+    is_organizer: bool = False,
+) -> Optional[InboxPage]:
+    """Страница неотвеченных вопросов доклада; None, если доклад чужой."""
+    talk = _managed_talks(participant_id, is_organizer).filter(pk=talk_id).values_list(
+        'title', 'question_counter__unread_count', 'question_counter__answered_count'
+    ).first()
+    if talk is None:
+        return None
+    title, unread_count, answered_count = talk
+
+    questions = Question.objects.filter(talk_id=talk_id, status__in=UNREAD_STATUSES)
+    if cursor is not None:
+        asked_at, pk = cursor
+        questions = questions.filter(Q(asked_at__lt=asked_at) | Q(asked_at=asked_at, pk__lt=pk))
+    rows = list(
+        questions.order_by('-asked_at', '-id').values_list('pk', 'text', 'status', 'asked_at')[: limit + 1]
+    )
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor((rows[-1][3], rows[-1][0]))
+
+    return InboxPage(
+        talk_id=talk_id,
+        talk_title=title,
+        unread_count=unread_count or 0,
+        answered_count=answered_count or 0,
+        questions=[InboxQuestion(pk, text, status) for pk, text, status, _ in rows],
+        next_cursor=next_cursor,
+    )
+
+
+@dataclass(frozen=True)
+class AnsweredQuestion:
+    question_id: int
+    author_tg_id: int
+    text: str
+    answer_text: str
+    talk_title: str
+    attendee_message_id: Optional[int]
+
+
+def answered_questions(question_ids: list[int]) -> list[AnsweredQuestion]:
+    """Отвеченные вопросы с авторами из Telegram одним запросом."""
+    rows = (
+        Question.objects.filter(
+            pk__in=question_ids, status=QuestionStatus.ANSWERED, author__tg_id__isnull=False
+        )
+        .order_by('pk')
+        .values_list('pk', 'author__tg_id', 'text', 'answer_text', 'talk__title', 'attendee_message_id')
+    )
+    return [AnsweredQuestion(*row) for row in rows]
+
+
+def answer_notice(question: AnsweredQuestion) -> str:
+    text = f'💬 Спикер доклада «{question.talk_title}» ответил на ваш вопрос:\n«{question.text}»'
+    if question.answer_text:
+        text += f'\n\n{question.answer_text}'
+    return text
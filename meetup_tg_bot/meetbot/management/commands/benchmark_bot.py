@@ -0,0 +1,87 @@
+import asyncio
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from meetbot.bot.benchmark import run_benchmark, seed_benchmark_event
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный прогон бота на поддельном Telegram: пропускная способность, '
+        'перцентили задержки обработчиков и запросы к БД на апдейт'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000, help='синтетических участников (по умолчанию 1000)')
+        parser.add_argument('--questions', type=int, default=1, help='вопросов спикеру от каждого участника')
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=settings.BOT_CONCURRENT_UPDATES,
+            help='апдейтов в обработке одновременно (по умолчанию BOT_CONCURRENT_UPDATES)',
+        )
+        parser.add_argument(
+            '--api-latency',
+            type=float,
+            default=0.0,
+            help='задержка ответа поддельного Bot API, мс — например, 50 для сети до Telegram',
+        )
+        parser.add_argument('--keepdb', action='store_true', help='не удалять временную базу после прогона')
+        parser.add_argument('--json', action='store_true', help='вывести результат в JSON для сравнения прогонов')
+        parser.add_argument(
+            '--max-p95',
+            type=float,
+            help='завершиться с ошибкой, если p95 задержки больше стольких мс (для CI)',
+        )
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 or options['concurrency'] < 1:
+            raise CommandError('--users и --concurrency должны быть положительными')
+
+        # сценарий пишет участников и вопросы, поэтому идёт на отдельной временной базе
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False, keepdb=options['keepdb']
+        )
+        try:
+            seed_benchmark_event()
+            connection.close()
+            result = asyncio.run(
+                run_benchmark(
+                    users=options['users'],
+                    concurrency=options['concurrency'],
+                    questions=options['questions'],
+                    api_latency=options['api_latency'] / 1000,
+                )
+            )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
+
+        report = result.as_dict()
+        if options['json']:
+            self.stdout.write(json.dumps(report, ensure_ascii=False, indent=2))
+        else:
+            self._print_report(report)
+        if options['max_p95'] is not None and report['latency_ms']['p95'] > options['max_p95']:
+            raise CommandError(f'p95 {report["latency_ms"]["p95"]} мс больше порога {options["max_p95"]} мс')
+
+    def _print_report(self, report):
+        latency = report['latency_ms']
+        self.stdout.write(
+            f'Участников: {report["users"]}, апдейтов: {report["updates"]} за {report["duration_s"]} с '
+            f'— {report["throughput_per_s"]} апдейтов/с'
+        )
+        self.stdout.write(
+            f'Задержка обработчиков, мс: p50 {latency["p50"]}, p95 {latency["p95"]}, '
+            f'p99 {latency["p99"]}, max {latency["max"]}'
+        )
+        for label, p95 in report['latency_p95_ms_by_step'].items():
+            self.stdout.write(f'  {label}: p95 {p95} мс')
+        self.stdout.write(
+            f'Запросов к БД на апдейт: {report["db_queries_per_update"]} (всего {report["db_queries"]}), '
+            f'вызовов Bot API на апдейт: {report["api_calls_per_update"]}'
+        )
+        if report['errors']:
+            self.stdout.write(self.style.ERROR(f'Ошибок в обработчиках: {report["errors"]}'))
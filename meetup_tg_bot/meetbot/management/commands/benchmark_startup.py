@@ -0,0 +1,54 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from meetbot.bot.startup_benchmark import ENTRY_POINTS, benchmark_startup
+
+
+class Command(BaseCommand):
+    help = (
+        'Холодный старт бота на поддельном Telegram: время от запуска процесса до polling '
+        'и до ответа на первый апдейт, для manage.py runbot и python -m meetbot.bot'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5, help='запусков каждого варианта (по умолчанию 5)')
+        parser.add_argument(
+            '--entry-point',
+            action='append',
+            choices=sorted(ENTRY_POINTS),
+            help='какие варианты запуска сравнивать (по умолчанию оба)',
+        )
+        parser.add_argument('--json', action='store_true', help='вывести результат в JSON для сравнения прогонов')
+
+    def handle(self, *args, **options):
+        if options['runs'] < 1:
+            raise CommandError('--runs должно быть положительным')
+
+        # бот записывает участника из /start, поэтому запускается на временной базе
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        database = connection.settings_dict['NAME']
+        connection.close()
+        reports = []
+        try:
+            for entry_point in options['entry_point'] or sorted(ENTRY_POINTS, reverse=True):
+                try:
+                    result = benchmark_startup(entry_point, options['runs'], database)
+                except RuntimeError as exc:
+                    raise CommandError(f'{entry_point}: {exc}') from exc
+                reports.append(result.as_dict())
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        if options['json']:
+            self.stdout.write(json.dumps(reports, ensure_ascii=False, indent=2))
+            return
+        for report in reports:
+            polling, reply = report['polling_ms'], report['first_reply_ms']
+            self.stdout.write(
+                f'python {" ".join(ENTRY_POINTS[report["entry_point"]])} ({report["runs"]} запусков): '
+                f'polling через {polling["median"]} мс, ответ на /start через {reply["median"]} мс '
+                f'(от {reply["min"]} до {reply["max"]} мс)'
+            )
+
@@ -0,0 +1,69 @@
+import json
+
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management.base import BaseCommand, CommandError
+
+from meetbot.web_benchmark import benchmark_mode
+from meetuptg_bot.server import APPLICATIONS, available_cpus, worker_count
+
+
+def default_paths() -> list[str]:
+    paths = ['/health/', '/metrics/']
+    try:
+        paths.append(staticfiles_storage.url('admin/css/base.css'))
+    except ValueError:
+        # collectstatic ещё не запускали — статику не меряем
+        pass
+    return paths
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнение WSGI и ASGI профилей веб-сервиса: настоящий gunicorn под конкурентными '
+        'GET-запросами к health, metrics и статике'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000, help='запросов на режим (по умолчанию 2000)')
+        parser.add_argument('--concurrency', type=int, default=100, help='запросов одновременно (по умолчанию 100)')
+        parser.add_argument(
+            '--mode',
+            action='append',
+            choices=sorted(APPLICATIONS),
+            help='какие режимы сравнивать (по умолчанию оба)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            help='воркеров gunicorn в каждом режиме (по умолчанию — как подберёт gunicorn.conf.py)',
+        )
+        parser.add_argument('--path', action='append', help='адрес для нагрузки; можно повторять')
+        parser.add_argument('--json', action='store_true', help='вывести результат в JSON для сравнения прогонов')
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1 or options['concurrency'] < 1:
+            raise CommandError('--requests и --concurrency должны быть положительными')
+
+        paths = options['path'] or default_paths()
+        reports = []
+        for mode in options['mode'] or sorted(APPLICATIONS, reverse=True):
+            workers = options['workers'] or worker_count(mode, available_cpus())
+            try:
+                result = benchmark_mode(mode, workers, paths, options['requests'], options['concurrency'])
+            except RuntimeError as exc:
+                raise CommandError(f'{mode}: {exc}') from exc
+            reports.append(result.as_dict())
+
+        if options['json']:
+            self.stdout.write(json.dumps({'paths': paths, 'results': reports}, ensure_ascii=False, indent=2))
+            return
+        self.stdout.write(f'Адреса: {", ".join(paths)}; одновременно {options["concurrency"]} запросов')
+        for report in reports:
+            latency = report['latency_ms']
+            self.stdout.write(
+                f'{report["mode"].upper()} ({report["workers"]} воркеров): {report["throughput_per_s"]} запросов/с, '
+                f'задержка, мс: p50 {latency["p50"]}, p95 {latency["p95"]}, p99 {latency["p99"]}, '
+                f'max {latency["max"]}'
+            )
+            if report['errors']:
+                self.stdout.write(self.style.ERROR(f'  ошибок: {report["errors"]}'))
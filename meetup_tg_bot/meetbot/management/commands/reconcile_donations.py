@@ -0,0 +1,38 @@
+import asyncio
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from meetbot.donations import reconcile_donations
+from meetbot.yookassa import YooKassaClient
+
+
+class Command(BaseCommand):
+    help = 'Сверяет с YooKassa донаты, зависшие в статусах «Ожидает»/«Ожидает подтверждения»'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than',
+            type=int,
+            default=30,
+            help='сколько минут платёж должен висеть, чтобы его проверить (по умолчанию 30)',
+        )
+        parser.add_argument('--chunk-size', type=int, default=500, help='донатов в одной пачке')
+        parser.add_argument('--concurrency', type=int, default=10, help='одновременных запросов к YooKassa')
+
+    def handle(self, *args, **options):
+        created_before = timezone.now() - timedelta(minutes=options['older_than'])
+        stats = asyncio.run(self._reconcile(created_before, options['chunk_size'], options['concurrency']))
+        self.stdout.write(
+            f'Проверено: {stats.checked}, обновлено: {stats.updated}, '
+            f'ошибок API: {stats.failed}, без платежа: {stats.unissued}'
+        )
+
+    async def _reconcile(self, created_before, chunk_size, concurrency):
+        client = YooKassaClient()
+        await client.open()
+        try:
+            return await reconcile_donations(client, created_before, chunk_size, concurrency)
+        finally:
+            await client.aclose()
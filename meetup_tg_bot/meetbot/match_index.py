@@ -0,0 +1,186 @@
+"""Матрица близости анкет одного мероприятия (см. `meetbot.matching`).
+
+Модуль вынесен отдельно ради numpy: он импортируется при первой сборке
+индекса, а не на старте бота и веб-воркеров.
+"""
+import math
+import threading
+from collections import Counter, defaultdict
+from typing import Iterable, Optional
+
+import numpy as np
+
+from .matching import ProfileCard, profile_terms
+
+
+class MatchIndex:
+    """Индекс кандидатов одного мероприятия.
+
+    Каждой анкете отведён слот — ряд и столбец матрицы `_scores`; пустые
+    слоты заполнены -1. Изменение одной анкеты пересчитывает только её ряд
+    и столбец через инвертированный индекс `_postings` (термин → анкеты с
+    этим термином), а отсортированные ряды кандидатов сбрасываются лишь у
+    тех анкет, чья близость к изменённой поменялась.
+
+    IDF нового вектора берётся по текущим частотам терминов; веса остальных
+    анкет при этом не пересчитываются и слегка устаревают до следующей
+    полной сборки индекса.
+    """
+
+    INITIAL_CAPACITY = 64
+
+    def __init__(self, event_id: int, cards: Iterable[ProfileCard], pairs: Iterable[tuple[int, int]]):
+        self.event_id = event_id
+        self._lock = threading.Lock()
+        self._cards: dict[int, ProfileCard] = {}
+        self._by_participant: dict[int, int] = {}
+        self._slots: dict[int, int] = {}
+        self._free_slots: list[int] = []
+        self._terms: dict[int, Counter] = {}
+        self._vectors: dict[int, dict[str, float]] = {}
+        self._postings: dict[str, dict[int, float]] = defaultdict(dict)
+        self._document_frequency: Counter = Counter()
+        self._seen: dict[int, set[int]] = defaultdict(set)
+        self._ranked: dict[int, list[int]] = {}
+        for source_id, target_id in pairs:
+            self._remember_pair(source_id, target_id)
+        self._build(list(cards))
+
+    def _build(self, cards: list[ProfileCard]) -> None:
+        capacity = max(self.INITIAL_CAPACITY, len(cards))
+        self._slot_ids = np.full(capacity, -1, dtype=np.int64)
+        self._free_slots = list(range(capacity - 1, len(cards) - 1, -1))
+        for card in cards:
+            self._terms[card.profile_id] = profile_terms(card)
+            self._document_frequency.update(self._terms[card.profile_id].keys())
+        for slot, card in enumerate(cards):
+            self._place(card, slot)
+
+        # полная матрица — одним умножением
+        vocabulary = {term: column for column, term in enumerate(self._document_frequency)}
+        vectors = np.zeros((len(cards), len(vocabulary)), dtype=np.float32)
+        for slot, card in enumerate(cards):
+            for term, weight in self._vectors[card.profile_id].items():
+                vectors[slot, vocabulary[term]] = weight
+        self._scores = np.full((capacity, capacity), -1.0, dtype=np.float32)
+        self._scores[: len(cards), : len(cards)] = vectors @ vectors.T
+        np.fill_diagonal(self._scores, -1.0)
+
+    def _weigh(self, terms: Counter) -> dict[str, float]:
+        count = len(self._terms)
+        vector = {
+            term: weight * math.log(1 + count / self._document_frequency[term])
+            for term, weight in terms.items()
+        }
+        norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+        return {term: weight / norm for term, weight in vector.items()} if norm else {}
+
+    def _place(self, card: ProfileCard, slot: int) -> None:
+        profile_id = card.profile_id
+        self._cards[profile_id] = card
+        self._by_participant[card.participant_id] = profile_id
+        self._slots[profile_id] = slot
+        self._slot_ids[slot] = profile_id
+        self._vectors[profile_id] = self._weigh(self._terms[profile_id])
+        for term, weight in self._vectors[profile_id].items():
+            self._postings[term][profile_id] = weight
+
+    def _unplace(self, profile_id: int) -> None:
+        for term in self._vectors.pop(profile_id):
+            postings = self._postings[term]
+            del postings[profile_id]
+            if not postings:
+                del self._postings[term]
+        for term in self._terms.pop(profile_id):
+            self._document_frequency[term] -= 1
+            if self._document_frequency[term] <= 0:
+                del self._document_frequency[term]
+        card = self._cards.pop(profile_id)
+        if self._by_participant.get(card.participant_id) == profile_id:
+            del self._by_participant[card.participant_id]
+
+    def _allocate_slot(self) -> int:
+        if not self._free_slots:
+            capacity = len(self._slot_ids)
+            slot_ids = np.full(capacity * 2, -1, dtype=np.int64)
+            slot_ids[:capacity] = self._slot_ids
+            scores = np.full((capacity * 2, capacity * 2), -1.0, dtype=np.float32)
+            scores[:capacity, :capacity] = self._scores
+            self._slot_ids, self._scores = slot_ids, scores
+            self._free_slots = list(range(capacity * 2 - 1, capacity - 1, -1))
+        return self._free_slots.pop()
+
+    def _score_slot(self, profile_id: int) -> np.ndarray:
+        """Близость анкеты ко всем слотам через инвертированный индекс."""
+        scores = np.where(self._slot_ids >= 0, 0.0, -1.0).astype(np.float32)
+        for term, weight in self._vectors[profile_id].items():
+            postings = self._postings[term]
+            slots = np.fromiter((self._slots[other] for other in postings), dtype=np.int64, count=len(postings))
+            weights = np.fromiter(postings.values(), dtype=np.float32, count=len(postings))
+            np.add.at(scores, slots, weight * weights)
+        scores[self._slots[profile_id]] = -1.0
+        return scores
+
+    def _set_scores(self, slot: int, scores: np.ndarray) -> None:
+        changed = np.flatnonzero(self._scores[slot] != scores).tolist()
+        self._scores[slot, :] = scores
+        self._scores[:, slot] = scores
+        self._ranked.pop(slot, None)
+        for other in changed:
+            self._ranked.pop(other, None)
+
+    def upsert(self, card: ProfileCard) -> None:
+        """Добавляет или обновляет анкету, пересчитывая только её ряд."""
+        with self._lock:
+            slot = self._slots.get(card.profile_id)
+            if slot is None:
+                slot = self._allocate_slot()
+            else:
+                self._unplace(card.profile_id)
+            self._terms[card.profile_id] = profile_terms(card)
+            self._document_frequency.update(self._terms[card.profile_id].keys())
+            self._place(card, slot)
+            self._set_scores(slot, self._score_slot(card.profile_id))
+
+    def remove(self, profile_id: int) -> None:
+        """Убирает анкету (деактивирована, удалена или перенесена)."""
+        with self._lock:
+            slot = self._slots.pop(profile_id, None)
+            if slot is None:
+                return
+            self._unplace(profile_id)
+            self._slot_ids[slot] = -1
+            self._set_scores(slot, np.full(len(self._slot_ids), -1.0, dtype=np.float32))
+            self._free_slots.append(slot)
+
+    def _ranking(self, slot: int) -> list[int]:
+        ranking = self._ranked.get(slot)
+        if ranking is None:
+            # при равной близости — кто раньше заполнил анкету
+            order = np.lexsort((self._slot_ids, -self._scores[slot]))
+            ranking = [profile_id for profile_id in self._slot_ids[order].tolist() if profile_id >= 0]
+            self._ranked[slot] = ranking
+        return ranking
+
+    def profile_of(self, participant_id: int) -> Optional[int]:
+        return self._by_participant.get(participant_id)
+
+    def suggest(self, profile_id: int) -> Optional[ProfileCard]:
+        """Самый близкий собеседник, с которым ещё не было пары.
+
+        Пара сразу считается выданной, чтобы параллельный запрос не получил её же.
+        """
+        with self._lock:
+            slot = self._slots.get(profile_id)
+            if slot is None:
+                return None
+            seen = self._seen[profile_id]
+            for candidate_id in self._ranking(slot):
+                if candidate_id != profile_id and candidate_id not in seen:
+                    self._remember_pair(profile_id, candidate_id)
+                    return self._cards[candidate_id]
+        return None
+
+    def _remember_pair(self, source_id: int, target_id: int) -> None:
+        self._seen[source_id].add(target_id)
+        self._seen[target_id].add(source_id)
@@ -0,0 +1,187 @@
+"""Подбор собеседников для нетворкинга.
+
+Анкета превращается в разреженный вектор терминов (стек, интересы, роль,
+цели) с весами TF-IDF. Для мероприятия один раз считается матрица косинусной
+близости всех активных анкет, и «следующий собеседник» — это первый
+кандидат из заранее отсортированного ряда, с которым ещё не было пары в
+`NetworkingMatch`. Обращения к БД при подборе нет, только запись выданной пары.
+
+Изменения анкет приходят из сигналов (и через NOTIFY `NETWORKING_CHANNEL`
+из других процессов) и применяются к индексу точечно.
+"""
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Optional
+
+from django.db import transaction
+
+from .models import NetworkingMatch, NetworkingProfile
+from .pubsub import notify
+
+if TYPE_CHECKING:
+    from .match_index import MatchIndex
+
+NETWORKING_CHANNEL = 'meetbot_networking'
+
+FIELD_WEIGHTS = {
+    'stack': 2.0,
+    'interests': 1.0,
+    'role': 0.5,
+    'goals': 0.5,
+}
+TOKEN_RE = re.compile(r'[\w#+]+(?:\.[\w#+]+)*')
+MIN_TOKEN_LENGTH = 2
+STOP_WORDS = frozenset(
+    'и в во на с со по для про или а но как что это к от до из за у о об the and for of to in with'.split()
+)
+
+_CARD_FIELDS = (
+    'id',
+    'participant_id',
+    'participant__first_name',
+    'participant__last_name',
+    'participant__tg_username',
+    'role',
+    'company',
+    'stack',
+    'interests',
+    'goals',
+    'contact',
+)
+
+
+@dataclass(frozen=True)
+class ProfileCard:
+    profile_id: int
+    participant_id: int
+    name: str
+    role: str
+    company: str
+    stack: str
+    interests: str
+    goals: str
+    contact: str
+
+    @classmethod
+    def from_row(cls, row: tuple) -> 'ProfileCard':
+        profile_id, participant_id, first_name, last_name, username, *fields = row
+        name = f'{first_name} {last_name}'.strip() or (f'@{username}' if username else 'Участник')
+        return cls(profile_id, participant_id, name, *fields)
+
+
+@dataclass(frozen=True)
+class MatchSuggestion:
+    has_profile: bool
+    card: Optional[ProfileCard] = None
+
+
+def tokenize(text: str) -> list[str]:
+    return [
+        token
+        for token in (match.group().strip('.') for match in TOKEN_RE.finditer(text.lower()))
+        if len(token) >= MIN_TOKEN_LENGTH and token not in STOP_WORDS
+    ]
+
+
+def profile_terms(card: ProfileCard) -> Counter:
+    """Термины анкеты с весами полей (до IDF)."""
+    terms = Counter()
+    for field, weight in FIELD_WEIGHTS.items():
+        for token in tokenize(getattr(card, field)):
+            terms[token] += weight
+    return terms
+
+
+def build_match_index(event_id: int) -> 'MatchIndex':
+    """Загружает анкеты и выданные пары мероприятия двумя запросами."""
+    from .match_index import MatchIndex
+
+    cards = [
+        ProfileCard.from_row(row)
+        for row in NetworkingProfile.objects.filter(event_id=event_id, is_active=True)
+        .order_by('created_at', 'id')
+        .values_list(*_CARD_FIELDS)
+    ]
+    pairs = NetworkingMatch.objects.filter(event_id=event_id).values_list('source_profile_id', 'target_profile_id')
+    return MatchIndex(event_id, cards, pairs)
+
+
+class MatchIndexCache:
+    """Индексы мероприятий в памяти процесса; сборка вне блокировки."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._indexes: dict[int, 'MatchIndex'] = {}
+        self._generation = 0
+
+    def load(self, event_id: int) -> 'MatchIndex':
+        index = self._indexes.get(event_id)
+        if index is not None:
+            return index
+        generation = self._generation
+        index = build_match_index(event_id)
+        with self._lock:
+            if generation == self._generation:
+                index = self._indexes.setdefault(event_id, index)
+        return index
+
+    def refresh_profile(self, profile_id: int) -> None:
+        """Переносит изменение одной анкеты в загруженные индексы."""
+        with self._lock:
+            # индекс, который сейчас собирается, мог прочитать старую анкету
+            self._generation += 1
+            indexes = list(self._indexes.values())
+        if not indexes:
+            return
+        row = (
+            NetworkingProfile.objects.filter(pk=profile_id, is_active=True)
+            .values_list('event_id', *_CARD_FIELDS)
+            .first()
+        )
+        for index in indexes:
+            if row is not None and row[0] == index.event_id:
+                index.upsert(ProfileCard.from_row(row[1:]))
+            else:
+                index.remove(profile_id)
+
+    def on_profile_changed(self, payload: Optional[str]) -> None:
+        """Обработчик NOTIFY: payload — id изменённой анкеты."""
+        if payload:
+            self.refresh_profile(int(payload))
+        else:
+            self.invalidate()
+
+    def invalidate(self, event_id: Optional[int] = None) -> None:
+        with self._lock:
+            self._generation += 1
+            if event_id is None:
+                self._indexes.clear()
+            else:
+                self._indexes.pop(event_id, None)
+
+
+match_indexes = MatchIndexCache()
+
+
+def schedule_profile_refresh(profile_id: int) -> None:
+    """Обновляет индексы после коммита здесь и в других процессах."""
+    transaction.on_commit(lambda: match_indexes.refresh_profile(profile_id))
+    notify(NETWORKING_CHANNEL, str(profile_id))
+
+
+def suggest_match(event_id: int, participant_id: int) -> MatchSuggestion:
+    """Следующий собеседник для участника; выданная пара сразу записывается."""
+    index = match_indexes.load(event_id)
+    profile_id = index.profile_of(participant_id)
+    if profile_id is None:
+        return MatchSuggestion(has_profile=False)
+    card = index.suggest(profile_id)
+    if card is None:
+        return MatchSuggestion(has_profile=True)
+    NetworkingMatch.objects.bulk_create(
+        [NetworkingMatch(event_id=event_id, source_profile_id=profile_id, target_profile_id=card.profile_id)],
+        ignore_conflicts=True,
+    )
+    return MatchSuggestion(has_profile=True, card=card)
@@ -0,0 +1,87 @@
+"""Метрики Prometheus: определения, запросы к БД и выдача метрик наружу.
+
+Все метрики объявлены здесь: модуль импортируется под одним именем и из
+бота, и из веба, поэтому ни одна не регистрируется дважды.
+
+Каждый SQL-запрос процесса попадает в `meetbot_db_queries_total` и
+`meetbot_db_query_duration_seconds` с меткой `source` — именем обработчика
+бота, из которого он сделан (`run_db` переносит контекст в поток пула), или
+`other` для веба и фоновых задач. Обработчики и Bot API измеряет
+`meetbot.bot.metrics`.
+
+Под gunicorn с несколькими воркерами у каждого процесса свои счётчики;
+если задан `PROMETHEUS_MULTIPROC_DIR`, `render_metrics` собирает их со всех
+воркеров. Коллекторы, которые считают значения на момент опроса (очередь
+апдейтов бота), регистрируются через `register_live_collector` и добавляются
+к метрикам этого процесса.
+"""
+import os
+import time
+from contextvars import ContextVar
+from typing import Any
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest
+from prometheus_client import multiprocess
+
+# кто выполняет запросы к БД: имя обработчика бота или `other`
+metrics_source: ContextVar[str] = ContextVar('metrics_source', default='other')
+
+DB_QUERIES = Counter('meetbot_db_queries_total', 'SQL-запросы', ['source'])
+DB_QUERY_DURATION = Histogram(
+    'meetbot_db_query_duration_seconds',
+    'Время SQL-запроса',
+    ['source'],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+
+HANDLER_DURATION = Histogram(
+    'meetbot_handler_duration_seconds',
+    'Время обработчика апдейта',
+    ['handler'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+HANDLER_ERRORS = Counter('meetbot_handler_errors_total', 'Исключения в обработчиках', ['handler', 'error'])
+TELEGRAM_API_DURATION = Histogram(
+    'meetbot_telegram_api_duration_seconds',
+    'Время вызова Bot API',
+    ['method'],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+TELEGRAM_API_ERRORS = Counter('meetbot_telegram_api_errors_total', 'Ошибки Bot API', ['method', 'error'])
+
+_live_collectors: list[Any] = []
+
+
+def register_live_collector(collector: Any) -> None:
+    """Коллектор текущего процесса: в общий реестр и в выдачу при сборе со всех воркеров."""
+    REGISTRY.register(collector)
+    _live_collectors.append(collector)
+
+
+def observe_query(execute, sql, params, many, context):
+    """`execute_wrapper` соединения: считает запрос и его время."""
+    source = metrics_source.get()
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        DB_QUERIES.labels(source).inc()
+        DB_QUERY_DURATION.labels(source).observe(time.perf_counter() - started)
+
+
+def instrument_connection(sender, connection, **kwargs) -> None:
+    """Получатель `connection_created`: ставит `observe_query` на новое соединение."""
+    # объект соединения в потоке переживает переподключения, обёртку ставим один раз
+    if observe_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(observe_query)
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """Текст метрик в формате Prometheus и его content type."""
+    registry = REGISTRY
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        for collector in _live_collectors:
+            registry.register(collector)
+    return generate_latest(registry), CONTENT_TYPE_LATEST
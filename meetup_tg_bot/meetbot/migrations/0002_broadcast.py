@@ -0,0 +1,33 @@
+# Generated by Django 4.2.26 on 2026-10-16 22:41
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meetbot', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Broadcast',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subscription_type', models.CharField(choices=[('event', 'Обновления мероприятия'), ('future', 'Будущие мероприятия')], default='event', max_length=16, verbose_name='Кому отправлять')),
+                ('text', models.TextField(verbose_name='Текст рассылки')),
+                ('status', models.CharField(choices=[('pending', 'Ожидает отправки'), ('running', 'Отправляется'), ('done', 'Завершена'), ('cancelled', 'Отменена')], default='pending', max_length=16, verbose_name='Статус')),
+                ('last_participant_id', models.BigIntegerField(default=0, help_text='курсор для продолжения рассылки после перезапуска бота', verbose_name='Последний обработанный участник')),
+                ('sent_count', models.PositiveIntegerField(default=0, verbose_name='Доставлено')),
+                ('failed_count', models.PositiveIntegerField(default=0, verbose_name='Не доставлено')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='broadcasts', to='meetbot.event', verbose_name='Мероприятие')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
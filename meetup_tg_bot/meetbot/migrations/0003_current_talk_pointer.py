@@ -0,0 +1,43 @@
+# Generated by Django 4.2.26 on 2026-10-16 22:47
+
+from django.db import migrations, models
+
+
+def sync_current_talks(apps, schema_editor):
+    """Приводит Talk.is_current в соответствие с Event.current_talk."""
+    Event = apps.get_model('meetbot', 'Event')
+    Talk = apps.get_model('meetbot', 'Talk')
+
+    for event in Event.objects.all():
+        current_talk_id = event.current_talk_id
+        if current_talk_id is None:
+            current_talk_id = (
+                Talk.objects.filter(event=event, is_current=True)
+                .order_by('order', 'start_at')
+                .values_list('id', flat=True)
+                .first()
+            )
+            if current_talk_id is not None:
+                Event.objects.filter(pk=event.pk).update(current_talk_id=current_talk_id)
+        Talk.objects.filter(event=event, is_current=True).exclude(pk=current_talk_id).update(is_current=False)
+        if current_talk_id is not None:
+            Talk.objects.filter(pk=current_talk_id).update(is_current=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meetbot', '0002_broadcast'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['start_at'], name='event_active_start_idx'),
+        ),
+        migrations.RunPython(sync_current_talks, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='talk',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_current', True)), fields=('event',), name='talk_one_current_per_event'),
+        ),
+    ]
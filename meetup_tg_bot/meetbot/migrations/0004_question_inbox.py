@@ -0,0 +1,41 @@
+# Generated by Django 4.2.26 on 2026-10-16 22:51
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_counters(apps, schema_editor):
+    Talk = apps.get_model('meetbot', 'Talk')
+    TalkQuestionCounter = apps.get_model('meetbot', 'TalkQuestionCounter')
+
+    talks = Talk.objects.annotate(
+        unread_count=models.Count('questions', filter=models.Q(questions__status__in=['pending', 'sent'])),
+        answered_count=models.Count('questions', filter=models.Q(questions__status='answered')),
+    ).values_list('pk', 'unread_count', 'answered_count')
+    TalkQuestionCounter.objects.bulk_create(
+        TalkQuestionCounter(talk_id=talk_id, unread_count=unread_count, answered_count=answered_count)
+        for talk_id, unread_count, answered_count in talks.iterator()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meetbot', '0003_current_talk_pointer'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TalkQuestionCounter',
+            fields=[
+                ('talk', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='question_counter', serialize=False, to='meetbot.talk', verbose_name='Доклад')),
+                ('unread_count', models.IntegerField(default=0, verbose_name='Без ответа')),
+                ('answered_count', models.IntegerField(default=0, verbose_name='Отвечено')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['talk', 'status', '-asked_at', '-id'], name='question_talk_status_asked_idx'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.26 on 2026-10-16 22:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meetbot', '0004_question_inbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BotState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('user', 'Данные пользователя'), ('chat', 'Данные чата'), ('bot', 'Данные бота'), ('conversation', 'Состояние диалога')], max_length=16, verbose_name='Тип')),
+                ('key', models.CharField(help_text='id пользователя или чата; для диалогов — имя обработчика и ключ диалога', max_length=255, verbose_name='Ключ')),
+                ('data', models.JSONField(default=dict, verbose_name='Данные')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='botstate',
+            constraint=models.UniqueConstraint(fields=('kind', 'key'), name='botstate_kind_key_uniq'),
+        ),
+    ]
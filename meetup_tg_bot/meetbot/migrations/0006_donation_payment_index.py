@@ -0,0 +1,18 @@
+# Generated by Django 4.2.26 on 2026-10-16 22:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meetbot', '0005_bot_state'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='donation',
+            name='yookassa_payment_id',
+            field=models.CharField(blank=True, db_index=True, help_text='payment.id из ответа YooKassa', max_length=64, verbose_name='ID платежа YooKassa'),
+        ),
+    ]
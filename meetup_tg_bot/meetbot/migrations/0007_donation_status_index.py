@@ -0,0 +1,17 @@
+# Generated by Django 4.2.26 on 2026-10-16 23:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meetbot', '0006_donation_payment_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='donation',
+            index=models.Index(fields=['status', 'created_at', 'id'], name='donation_status_created_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.26 on 2026-10-16 23:02
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meetbot', '0007_donation_status_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventStats',
+            fields=[
+                ('event', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='meetbot.event', verbose_name='Мероприятие')),
+                ('question_counts', models.JSONField(default=dict, verbose_name='Вопросы по статусам')),
+                ('donation_totals', models.JSONField(default=list, help_text='[{status, currency, count, amount}]', verbose_name='Донаты')),
+                ('match_counts', models.JSONField(default=dict, verbose_name='Знакомства по статусам')),
+                ('refreshed_at', models.DateTimeField(verbose_name='Пересчитано')),
+            ],
+            options={
+                'verbose_name': 'Статистика мероприятия',
+                'verbose_name_plural': 'Статистика мероприятий',
+            },
+        ),
+    ]
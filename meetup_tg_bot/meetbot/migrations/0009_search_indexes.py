@@ -0,0 +1,46 @@
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.operations import TrigramExtension
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models.functions import Upper
+
+# Индексы только для Postgres, поэтому их нет в Meta моделей: на SQLite
+# миграция ничего не делает, а поиск в админке идёт через icontains.
+PARTICIPANT_TRIGRAM_FIELDS = ('first_name', 'last_name', 'tg_username')
+
+
+def search_indexes(apps):
+    Participant = apps.get_model('meetbot', 'Participant')
+    Question = apps.get_model('meetbot', 'Question')
+    for field in PARTICIPANT_TRIGRAM_FIELDS:
+        yield Participant, GinIndex(
+            OpClass(Upper(field), name='gin_trgm_ops'),
+            name=f'participant_{field}_trgm',
+        )
+    yield Question, GinIndex(SearchVector('text', config='russian'), name='question_text_fts')
+
+
+def create_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for model, index in search_indexes(apps):
+        schema_editor.add_index(model, index)
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for model, index in search_indexes(apps):
+        schema_editor.remove_index(model, index)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meetbot', '0008_event_stats'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
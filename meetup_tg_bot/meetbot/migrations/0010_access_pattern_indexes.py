@@ -0,0 +1,25 @@
+# Generated by Django 4.2.26 on 2026-10-16 23:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meetbot', '0009_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='networkingprofile',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['event', 'created_at', 'id'], name='profile_event_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='subscription',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['subscription_type', 'event', 'participant'], name='subscription_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='talk',
+            index=models.Index(fields=['event', 'order', 'start_at'], name='talk_event_order_idx'),
+        ),
+    ]
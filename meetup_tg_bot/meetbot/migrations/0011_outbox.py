@@ -0,0 +1,27 @@
+# Generated by Django 4.2.26 on 2026-10-16 23:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meetbot', '0010_access_pattern_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxMessage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('topic', models.CharField(choices=[('talk_changed', 'Изменён доклад'), ('event_changed', 'Изменено мероприятие'), ('event_published', 'Опубликовано мероприятие'), ('question_answered', 'Отвечен вопрос')], max_length=32, verbose_name='Тема')),
+                ('object_id', models.BigIntegerField(verbose_name='ID объекта')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Сообщение для бота',
+                'verbose_name_plural': 'Сообщения для бота',
+                'ordering': ['id'],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.26 on 2026-10-16 23:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meetbot', '0011_outbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='broadcast',
+            name='claimed_by',
+            field=models.CharField(blank=True, help_text='процесс бота, который сейчас отправляет рассылку', max_length=128, verbose_name='Отправляет'),
+        ),
+        migrations.AddField(
+            model_name='broadcast',
+            name='lease_until',
+            field=models.DateTimeField(blank=True, help_text='пока срок не истёк, рассылку не возьмёт другой процесс', null=True, verbose_name='Захвачена до'),
+        ),
+    ]
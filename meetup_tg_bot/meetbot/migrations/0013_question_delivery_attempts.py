@@ -0,0 +1,18 @@
+# Generated by Django 4.2.26 on 2026-10-17 00:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meetbot', '0012_broadcast_lease'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='delivery_attempts',
+            field=models.PositiveSmallIntegerField(default=0, help_text='Бот повторяет доставку, пока вопрос в статусе «Получен» и попыток меньше QUESTION_MAX_DELIVERY_ATTEMPTS', verbose_name='Неудачных попыток доставки спикеру'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.26 on 2026-10-17 00:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meetbot', '0013_question_delivery_attempts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outboxmessage',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='Неудачных попыток'),
+        ),
+        migrations.AddField(
+            model_name='outboxmessage',
+            name='failed_at',
+            field=models.DateTimeField(blank=True, help_text='Обработчик падал OUTBOX_MAX_ATTEMPTS раз подряд; бот больше не берёт сообщение', null=True, verbose_name='Отложено'),
+        ),
+    ]
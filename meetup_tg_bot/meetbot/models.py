@@ -63,6 +63,15 @@ class Event(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['start_at'],
+                name='event_active_start_idx',
+                condition=models.Q(is_active=True),
+            ),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -109,6 +118,18 @@ class Talk(models.Model):
 
     class Meta:
         ordering = ['event_id', 'order', 'start_at']
+        indexes = [
+            # программа мероприятия и входящие спикера: talks WHERE event_id = ... ORDER BY order, start_at
+            models.Index(fields=['event', 'order', 'start_at'], name='talk_event_order_idx'),
+        ]
+        constraints = [
+            # зеркало Event.current_talk: не больше одного текущего доклада
+            models.UniqueConstraint(
+                fields=['event'],
+                condition=models.Q(is_current=True),
+                name='talk_one_current_per_event',
+            ),
+        ]
 
     def __str__(self):
         return f'{self.event}: {self.title}'
@@ -158,14 +179,44 @@ class Question(models.Model):
         null=True,
         blank=True,
     )
+    delivery_attempts = models.PositiveSmallIntegerField(
+        'Неудачных попыток доставки спикеру',
+        default=0,
+        help_text='Бот повторяет доставку, пока вопрос в статусе «Получен» и попыток меньше '
+        'QUESTION_MAX_DELIVERY_ATTEMPTS',
+    )
 
     class Meta:
         ordering = ['-asked_at']
+        indexes = [
+            # входящие спикера: keyset-пагинация по (asked_at, id) внутри доклада и статуса
+            models.Index(
+                fields=['talk', 'status', '-asked_at', '-id'],
+                name='question_talk_status_asked_idx',
+            ),
+        ]
 
     def __str__(self):
         return f'{self.talk}: {self.text[:50]}'
 
 
+class TalkQuestionCounter(models.Model):
+    """Счётчики вопросов доклада, чтобы не считать COUNT(*) на каждой странице."""
+
+    talk = models.OneToOneField(
+        Talk,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='question_counter',
+        verbose_name='Доклад',
+    )
+    unread_count = models.IntegerField('Без ответа', default=0)
+    answered_count = models.IntegerField('Отвечено', default=0)
+
+    def __str__(self):
+        return f'{self.talk}: {self.unread_count}/{self.answered_count}'
+
+
 class NetworkingProfile(models.Model):
     """Анкета участника."""
 
@@ -198,6 +249,14 @@ class NetworkingProfile(models.Model):
     class Meta:
         unique_together = ('participant', 'event')
         ordering = ['-created_at']
+        indexes = [
+            # загрузка анкет для знакомств: активные анкеты мероприятия по порядку создания
+            models.Index(
+                fields=['event', 'created_at', 'id'],
+                name='profile_event_active_idx',
+                condition=models.Q(is_active=True),
+            ),
+        ]
 
     def __str__(self):
         return f'{self.participant} ({self.role})'
@@ -285,6 +344,7 @@ class Donation(models.Model):
         'ID платежа YooKassa',
         max_length=64,
         blank=True,
+        db_index=True,
         help_text='payment.id из ответа YooKassa',
     )
     idempotence_key = models.CharField(
@@ -303,6 +363,10 @@ class Donation(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # сверка зависших платежей: status IN (...) AND created_at < ...
+            models.Index(fields=['status', 'created_at', 'id'], name='donation_status_created_idx'),
+        ]
 
     def __str__(self):
         return f'{self.amount} {self.currency} ({self.status})'
@@ -342,6 +406,159 @@ class Subscription(models.Model):
     class Meta:
         unique_together = ('participant', 'event', 'subscription_type')
         ordering = ['-created_at']
+        indexes = [
+            # получатели рассылки: активные подписки типа (и мероприятия) по участнику;
+            # у подписки на будущие мероприятия event пустой, поэтому тип идёт первым
+            models.Index(
+                fields=['subscription_type', 'event', 'participant'],
+                name='subscription_active_idx',
+                condition=models.Q(is_active=True),
+            ),
+        ]
 
     def __str__(self):
         return f'{self.participant} -> {self.subscription_type}'
+
+
+class BroadcastStatus(models.TextChoices):
+    PENDING = 'pending', 'Ожидает отправки'
+    RUNNING = 'running', 'Отправляется'
+    DONE = 'done', 'Завершена'
+    CANCELLED = 'cancelled', 'Отменена'
+
+
+class Broadcast(models.Model):
+    """Рассылка анонса подписчикам с сохранением прогресса доставки."""
+
+    event = models.ForeignKey(
+        Event,
+        on_delete=models.CASCADE,
+        related_name='broadcasts',
+        verbose_name='Мероприятие',
+    )
+    subscription_type = models.CharField(
+        'Кому отправлять',
+        max_length=16,
+        choices=SubscriptionType.choices,
+        default=SubscriptionType.EVENT,
+    )
+    text = models.TextField('Текст рассылки')
+    status = models.CharField(
+        'Статус',
+        max_length=16,
+        choices=BroadcastStatus.choices,
+        default=BroadcastStatus.PENDING,
+    )
+    last_participant_id = models.BigIntegerField(
+        'Последний обработанный участник',
+        default=0,
+        help_text='курсор для продолжения рассылки после перезапуска бота',
+    )
+    sent_count = models.PositiveIntegerField('Доставлено', default=0)
+    failed_count = models.PositiveIntegerField('Не доставлено', default=0)
+    claimed_by = models.CharField(
+        'Отправляет',
+        max_length=128,
+        blank=True,
+        help_text='процесс бота, который сейчас отправляет рассылку',
+    )
+    lease_until = models.DateTimeField(
+        'Захвачена до',
+        null=True,
+        blank=True,
+        help_text='пока срок не истёк, рассылку не возьмёт другой процесс',
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f'{self.event}: {self.text[:50]}'
+
+
+class BotStateKind(models.TextChoices):
+    USER = 'user', 'Данные пользователя'
+    CHAT = 'chat', 'Данные чата'
+    BOT = 'bot', 'Данные бота'
+    CONVERSATION = 'conversation', 'Состояние диалога'
+
+
+class BotState(models.Model):
+    """Сохранённое состояние бота (user_data, chat_data, диалоги) между перезапусками."""
+
+    kind = models.CharField('Тип', max_length=16, choices=BotStateKind.choices)
+    key = models.CharField(
+        'Ключ',
+        max_length=255,
+        help_text='id пользователя или чата; для диалогов — имя обработчика и ключ диалога',
+    )
+    data = models.JSONField('Данные', default=dict)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'key'], name='botstate_kind_key_uniq'),
+        ]
+
+    def __str__(self):
+        return f'{self.get_kind_display()}: {self.key}'
+
+
+class EventStats(models.Model):
+    """Сводка по мероприятию для админки, пересчитывается периодически."""
+
+    event = models.OneToOneField(
+        Event,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Мероприятие',
+    )
+    question_counts = models.JSONField('Вопросы по статусам', default=dict)
+    donation_totals = models.JSONField(
+        'Донаты',
+        default=list,
+        help_text='[{status, currency, count, amount}]',
+    )
+    match_counts = models.JSONField('Знакомства по статусам', default=dict)
+    refreshed_at = models.DateTimeField('Пересчитано')
+
+    class Meta:
+        verbose_name = 'Статистика мероприятия'
+        verbose_name_plural = 'Статистика мероприятий'
+
+    def __str__(self):
+        return str(self.event)
+
+
+class OutboxTopic(models.TextChoices):
+    TALK_CHANGED = 'talk_changed', 'Изменён доклад'
+    EVENT_CHANGED = 'event_changed', 'Изменено мероприятие'
+    EVENT_PUBLISHED = 'event_published', 'Опубликовано мероприятие'
+    QUESTION_ANSWERED = 'question_answered', 'Отвечен вопрос'
+
+
+class OutboxMessage(models.Model):
+    """Изменение для процесса бота, записанное в одной транзакции с самой правкой."""
+
+    topic = models.CharField('Тема', max_length=32, choices=OutboxTopic.choices)
+    object_id = models.BigIntegerField('ID объекта')
+    created_at = models.DateTimeField(auto_now_add=True)
+    attempts = models.PositiveSmallIntegerField('Неудачных попыток', default=0)
+    failed_at = models.DateTimeField(
+        'Отложено',
+        null=True,
+        blank=True,
+        help_text='Обработчик падал OUTBOX_MAX_ATTEMPTS раз подряд; бот больше не берёт сообщение',
+    )
+
+    class Meta:
+        ordering = ['id']
+        verbose_name = 'Сообщение для бота'
+        verbose_name_plural = 'Сообщения для бота'
+
+    def __str__(self):
+        return f'{self.get_topic_display()}: {self.object_id}'
@@ -0,0 +1,72 @@
+"""Transactional outbox: правки из админки, о которых должен узнать бот.
+
+Сигналы моделей пишут `OutboxMessage` в той же транзакции, что и саму
+правку (админка сохраняет объект атомарно), поэтому сообщение появляется
+ровно тогда, когда правка закоммичена, и не теряется, если бот в этот момент
+не запущен. Вместе со строкой отправляется NOTIFY `OUTBOX_CHANNEL`: Postgres
+доставит его после коммита и склеит повторы внутри одной транзакции.
+
+Бот (`meetbot.bot.outbox`) читает сообщения по первичному ключу пачками и
+удаляет обработанные, так что таблица остаётся короткой и её чтение не
+превращается в сканирование. Сообщение, на котором обработчик падает
+`OUTBOX_MAX_ATTEMPTS` раз, помечается `failed_at` и больше не читается —
+его видно в админке, где его можно вернуть в очередь.
+"""
+from dataclasses import dataclass
+from typing import Iterable
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import OutboxMessage
+from .pubsub import notify
+
+OUTBOX_CHANNEL = 'meetbot_outbox'
+
+
+@dataclass(frozen=True)
+class PendingMessage:
+    message_id: int
+    topic: str
+    object_id: int
+
+
+def publish(topic: str, object_ids: Iterable[int]) -> None:
+    """Кладёт сообщения в outbox текущей транзакции и будит бота."""
+    messages = [OutboxMessage(topic=topic, object_id=object_id) for object_id in object_ids]
+    if not messages:
+        return
+    OutboxMessage.objects.bulk_create(messages)
+    notify(OUTBOX_CHANNEL)
+
+
+def pending_messages(limit: int) -> list[PendingMessage]:
+    """Самые старые необработанные сообщения, кроме отложенных."""
+    rows = (
+        OutboxMessage.objects.filter(failed_at__isnull=True)
+        .order_by('pk')
+        .values_list('pk', 'topic', 'object_id')[:limit]
+    )
+    return [PendingMessage(*row) for row in rows]
+
+
+def acknowledge(message_ids: list[int]) -> int:
+    return OutboxMessage.objects.filter(pk__in=message_ids).delete()[0]
+
+
+def record_failure(message_ids: list[int], max_attempts: int) -> int:
+    """Считает падение обработчика; возвращает, сколько сообщений отложено насовсем."""
+    with transaction.atomic():
+        OutboxMessage.objects.filter(pk__in=message_ids).update(attempts=F('attempts') + 1)
+        return OutboxMessage.objects.filter(
+            pk__in=message_ids, attempts__gte=max_attempts, failed_at__isnull=True
+        ).update(failed_at=timezone.now())
+
+
+def retry_failed(message_ids: Iterable[int]) -> int:
+    """Возвращает отложенные сообщения в очередь и будит бота."""
+    count = OutboxMessage.objects.filter(pk__in=message_ids).update(attempts=0, failed_at=None)
+    if count:
+        notify(OUTBOX_CHANNEL)
+    return count
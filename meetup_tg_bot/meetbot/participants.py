@@ -0,0 +1,163 @@
+"""Пакетный upsert участников по `tg_id`.
+
+Строка участника пишется только при новом пользователе или изменении
+ника/имени/фамилии; неизменённые строки не трогаются вовсе.
+"""
+from dataclasses import dataclass
+from typing import Iterable
+
+from django.db import connection
+from django.utils import timezone
+
+from .models import Participant
+
+PARTICIPANT_CHANNEL = 'meetbot_participant'
+
+_IDENTITY_FIELDS = (
+    'id',
+    'tg_id',
+    'tg_username',
+    'first_name',
+    'last_name',
+    'is_speaker',
+    'is_organizer',
+    'wants_notifications',
+)
+
+
+@dataclass(frozen=True)
+class TelegramProfile:
+    tg_id: int
+    tg_username: str = ''
+    first_name: str = ''
+    last_name: str = ''
+
+    @classmethod
+    def from_user(cls, user) -> 'TelegramProfile':
+        return cls(
+            tg_id=user.id,
+            tg_username=(user.username or '')[:64],
+            first_name=(user.first_name or '')[:64],
+            last_name=(user.last_name or '')[:64],
+        )
+
+
+@dataclass(frozen=True)
+class ParticipantIdentity:
+    participant_id: int
+    profile: TelegramProfile
+    is_speaker: bool
+    is_organizer: bool
+    wants_notifications: bool
+
+    @property
+    def tg_id(self) -> int:
+        return self.profile.tg_id
+
+
+def _identity(row: tuple) -> ParticipantIdentity:
+    participant_id, tg_id, username, first_name, last_name, is_speaker, is_organizer, wants = row
+    return ParticipantIdentity(
+        participant_id=participant_id,
+        profile=TelegramProfile(tg_id, username, first_name, last_name),
+        is_speaker=is_speaker,
+        is_organizer=is_organizer,
+        wants_notifications=wants,
+    )
+
+
+def _upsert_postgres(profiles: list[TelegramProfile]) -> list[tuple]:
+    table = connection.ops.quote_name(Participant._meta.db_table)
+    now = timezone.now()
+    defaults = [
+        Participant._meta.get_field(name).default
+        for name in ('is_organizer', 'is_speaker', 'wants_notifications')
+    ]
+    rows = ', '.join(['(%s, %s, %s, %s, %s, %s, %s, %s, %s)'] * len(profiles))
+    params = []
+    for profile in profiles:
+        params += [
+            profile.tg_id,
+            profile.tg_username,
+            profile.first_name,
+            profile.last_name,
+            *defaults,
+            now,
+            now,
+        ]
+    sql = f'''
+        INSERT INTO {table} AS p (
+            tg_id, tg_username, first_name, last_name,
+            is_organizer, is_speaker, wants_notifications, created_at, updated_at
+        )
+        VALUES {rows}
+        ON CONFLICT (tg_id) DO UPDATE SET
+            tg_username = EXCLUDED.tg_username,
+            first_name = EXCLUDED.first_name,
+            last_name = EXCLUDED.last_name,
+            updated_at = EXCLUDED.updated_at
+        WHERE (p.tg_username, p.first_name, p.last_name)
+            IS DISTINCT FROM (EXCLUDED.tg_username, EXCLUDED.first_name, EXCLUDED.last_name)
+        RETURNING {', '.join(_IDENTITY_FIELDS)}
+    '''
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+
+    # неизменённые строки RETURNING не отдаёт — дочитываем их
+    returned = {row[1] for row in rows}
+    missing = [profile.tg_id for profile in profiles if profile.tg_id not in returned]
+    if missing:
+        rows += Participant.objects.filter(tg_id__in=missing).values_list(*_IDENTITY_FIELDS)
+    return rows
+
+
+def _upsert_generic(profiles: list[TelegramProfile]) -> list[tuple]:
+    by_tg_id = {profile.tg_id: profile for profile in profiles}
+    existing = {
+        participant.tg_id: participant
+        for participant in Participant.objects.filter(tg_id__in=by_tg_id)
+    }
+    Participant.objects.bulk_create(
+        [
+            Participant(
+                tg_id=profile.tg_id,
+                tg_username=profile.tg_username,
+                first_name=profile.first_name,
+                last_name=profile.last_name,
+            )
+            for tg_id, profile in by_tg_id.items()
+            if tg_id not in existing
+        ],
+        ignore_conflicts=True,
+    )
+    changed = []
+    for tg_id, participant in existing.items():
+        profile = by_tg_id[tg_id]
+        stored = TelegramProfile(
+            participant.tg_id,
+            participant.tg_username,
+            participant.first_name,
+            participant.last_name,
+        )
+        if stored != profile:
+            participant.tg_username = profile.tg_username
+            participant.first_name = profile.first_name
+            participant.last_name = profile.last_name
+            participant.updated_at = timezone.now()
+            changed.append(participant)
+    if changed:
+        Participant.objects.bulk_update(changed, ['tg_username', 'first_name', 'last_name', 'updated_at'])
+    return list(Participant.objects.filter(tg_id__in=by_tg_id).values_list(*_IDENTITY_FIELDS))
+
+
+def upsert_participants(profiles: Iterable[TelegramProfile]) -> dict[int, ParticipantIdentity]:
+    """Создаёт или обновляет участников одним запросом (на Postgres)."""
+    profiles = list({profile.tg_id: profile for profile in profiles}.values())
+    if not profiles:
+        return {}
+    if connection.vendor == 'postgresql':
+        rows = _upsert_postgres(profiles)
+    else:
+        rows = _upsert_generic(profiles)
+    return {row[1]: _identity(row) for row in rows}
@@ -0,0 +1,209 @@
+"""Программа активного мероприятия и текущий доклад с кешем в памяти процесса.
+
+Программа меняется редко, а смотрят её постоянно, поэтому текст собирается
+один раз и хранится до сигнала об изменении `Event`, `Talk`, `Place` или
+докладчика. Между процессами сброс кеша передаётся через NOTIFY
+(`PROGRAM_CHANNEL`).
+
+Текущий доклад определяется указателем `Event.current_talk`; флаг
+`Talk.is_current` — его зеркало, и оба меняются только через
+`switch_current_talk`.
+"""
+import threading
+from dataclasses import dataclass
+from typing import Callable, Generic, Optional, TypeVar
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Broadcast, Event, SubscriptionType, Talk, TalkStatus
+from .pubsub import notify
+
+T = TypeVar('T')
+
+PROGRAM_CHANNEL = 'meetbot_program'
+
+NO_PROGRAM_TEXT = 'Программа пока не опубликована. Загляните чуть позже!'
+
+
+@dataclass(frozen=True)
+class CurrentTalk:
+    talk_id: int
+    title: str
+    speaker_id: Optional[int]
+    speaker_tg_id: Optional[int]
+    speaker_name: str
+
+
+@dataclass(frozen=True)
+class CurrentTalkState:
+    event_id: Optional[int]
+    talk: Optional[CurrentTalk]
+
+
+@dataclass(frozen=True)
+class ProgramSnapshot:
+    event_id: Optional[int]
+    text: str
+
+
+def _format_time(value) -> str:
+    return timezone.localtime(value).strftime('%H:%M')
+
+
+def build_program() -> ProgramSnapshot:
+    """Собирает программу активного мероприятия двумя запросами."""
+    event = (
+        Event.objects.filter(is_active=True)
+        .select_related('place')
+        .order_by('start_at')
+        .first()
+    )
+    if event is None:
+        return ProgramSnapshot(event_id=None, text=NO_PROGRAM_TEXT)
+
+    talks = list(
+        event.talks.exclude(status=TalkStatus.CANCELLED)
+        .select_related('speaker')
+        .order_by('order', 'start_at')
+    )
+
+    lines = [f'📅 {event.name}', timezone.localtime(event.start_at).strftime('%d.%m.%Y')]
+    if event.place:
+        lines[-1] += f' · {event.place.name}'
+        if event.place.address:
+            lines[-1] += f', {event.place.address}'
+    lines.append('')
+
+    for talk in talks:
+        marker = '▶️ ' if talk.pk == event.current_talk_id else ''
+        line = f'{marker}{_format_time(talk.start_at)}–{_format_time(talk.end_at)} {talk.title}'
+        if talk.speaker:
+            line += f' — {talk.speaker}'
+        if talk.room:
+            line += f' ({talk.room})'
+        lines.append(line)
+    if not talks:
+        lines.append('Доклады скоро появятся.')
+
+    return ProgramSnapshot(event_id=event.pk, text='\n'.join(lines))
+
+
+def fetch_current_talk() -> CurrentTalkState:
+    """Активное мероприятие → текущий доклад → докладчик одним запросом."""
+    event = (
+        Event.objects.filter(is_active=True)
+        .select_related('current_talk__speaker')
+        .order_by('start_at')
+        .only(
+            'id',
+            'current_talk__id',
+            'current_talk__title',
+            'current_talk__speaker__id',
+            'current_talk__speaker__tg_id',
+            'current_talk__speaker__first_name',
+            'current_talk__speaker__last_name',
+            'current_talk__speaker__tg_username',
+        )
+        .first()
+    )
+    if event is None:
+        return CurrentTalkState(event_id=None, talk=None)
+    talk = event.current_talk
+    if talk is None:
+        return CurrentTalkState(event_id=event.pk, talk=None)
+    speaker = talk.speaker
+    return CurrentTalkState(
+        event_id=event.pk,
+        talk=CurrentTalk(
+            talk_id=talk.pk,
+            title=talk.title,
+            speaker_id=speaker.pk if speaker else None,
+            speaker_tg_id=speaker.tg_id if speaker else None,
+            speaker_name=str(speaker) if speaker else '',
+        ),
+    )
+
+
+class SnapshotCache(Generic[T]):
+    """Read-through кеш одного значения с защитой от гонки сборки и сброса.
+
+    Если кеш сбросили, пока значение собиралось, собранный вариант
+    возвращается вызывающему, но не сохраняется.
+    """
+
+    def __init__(self, loader: Callable[[], T]):
+        self._loader = loader
+        self._lock = threading.Lock()
+        self._snapshot: Optional[T] = None
+        self._generation = 0
+
+    def cached(self) -> Optional[T]:
+        return self._snapshot
+
+    def load(self) -> T:
+        """Возвращает значение из кеша или собирает его из БД."""
+        snapshot = self._snapshot
+        if snapshot is not None:
+            return snapshot
+        generation = self._generation
+        snapshot = self._loader()
+        with self._lock:
+            if generation == self._generation:
+                self._snapshot = snapshot
+        return snapshot
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._snapshot = None
+
+
+program_cache: SnapshotCache[ProgramSnapshot] = SnapshotCache(build_program)
+current_talk_cache: SnapshotCache[CurrentTalkState] = SnapshotCache(fetch_current_talk)
+
+
+def invalidate_caches(payload: Optional[str] = None) -> None:
+    program_cache.invalidate()
+    current_talk_cache.invalidate()
+
+
+def schedule_invalidation() -> None:
+    """Сбрасывает кеши после коммита здесь и в других процессах."""
+    transaction.on_commit(invalidate_caches)
+    notify(PROGRAM_CHANNEL)
+
+
+def switch_current_talk(event_id: int, talk_id: Optional[int]) -> None:
+    """Атомарно делает доклад текущим (или снимает текущий при `talk_id=None`).
+
+    `ValueError`, если доклад не относится к мероприятию: тогда ничего не меняется.
+    """
+    with transaction.atomic():
+        # блокировка мероприятия выстраивает параллельные переключения в очередь
+        Event.objects.select_for_update().filter(pk=event_id).first()
+        Talk.objects.filter(event_id=event_id, is_current=True).exclude(pk=talk_id).update(is_current=False)
+        if talk_id is not None and not Talk.objects.filter(pk=talk_id, event_id=event_id).update(is_current=True):
+            raise ValueError(f'Talk {talk_id} does not belong to event {event_id}')
+        Event.objects.filter(pk=event_id).update(current_talk_id=talk_id)
+        schedule_invalidation()
+
+
+def announcement_text(event: Event) -> str:
+    lines = [f'📣 Новое мероприятие: {event.name}', timezone.localtime(event.start_at).strftime('%d.%m.%Y %H:%M')]
+    if event.place:
+        lines[-1] += f' · {event.place.name}'
+    lines.append('Программа — в меню бота.')
+    return '\n'.join(lines)
+
+
+def announce_events(event_ids: list[int]) -> int:
+    """Рассылка подписчикам будущих мероприятий об опубликованных мероприятиях."""
+    events = Event.objects.filter(
+        pk__in=event_ids, is_published=True, announcements_enabled=True
+    ).select_related('place')
+    broadcasts = Broadcast.objects.bulk_create(
+        Broadcast(event=event, subscription_type=SubscriptionType.FUTURE, text=announcement_text(event))
+        for event in events
+    )
+    return len(broadcasts)
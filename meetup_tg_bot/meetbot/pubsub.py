@@ -0,0 +1,117 @@
+"""Оповещения между процессами через Postgres LISTEN/NOTIFY.
+
+Веб-процесс (админка) вызывает `notify`, процесс бота слушает каналы через
+`PgListener`. Для других СУБД оба механизма ничего не делают.
+"""
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Any, Callable, Optional
+
+import psycopg2
+from django.db import connection
+from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+
+logger = logging.getLogger(__name__)
+
+RECONNECT_DELAY = 5.0
+
+
+def notify(channel: str, payload: str = '') -> None:
+    """Отправляет NOTIFY; внутри транзакции Postgres доставит его после коммита."""
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_notify(%s, %s)', [channel, payload])
+
+
+class PgListener:
+    """Держит отдельное соединение с LISTEN и вызывает обработчики в event loop.
+
+    Сокет соединения регистрируется в loop через `add_reader`, так что
+    уведомления приходят без опроса. После переподключения каждый обработчик
+    вызывается с `payload=None` — за время обрыва уведомления могли потеряться.
+    """
+
+    def __init__(self):
+        self._handlers: dict[str, list[Callable[[Optional[str]], Any]]] = defaultdict(list)
+        self._conn = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._reconnect_task: Optional[asyncio.Task] = None
+
+    def subscribe(self, channel: str, handler: Callable[[Optional[str]], Any]) -> None:
+        self._handlers[channel].append(handler)
+
+    @property
+    def is_listening(self) -> bool:
+        return self._conn is not None
+
+    async def start(self, application: Any = None) -> None:
+        if connection.vendor != 'postgresql' or not self._handlers:
+            return
+        self._loop = asyncio.get_running_loop()
+        try:
+            await self._connect()
+        except Exception:
+            logger.warning('Cannot open LISTEN connection, retrying in background')
+            self._reconnect_task = self._loop.create_task(self._reconnect())
+
+    async def stop(self, application: Any = None) -> None:
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+            self._reconnect_task = None
+        self._disconnect()
+
+    async def _connect(self) -> None:
+        self._conn = await self._loop.run_in_executor(None, self._open_connection)
+        self._loop.add_reader(self._conn.fileno(), self._on_readable)
+        logger.info('Listening to %s', ', '.join(self._handlers))
+
+    def _open_connection(self):
+        conn = psycopg2.connect(**connection.get_connection_params())
+        conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+        with conn.cursor() as cursor:
+            for channel in self._handlers:
+                cursor.execute(f'LISTEN "{channel}"')
+        return conn
+
+    def _disconnect(self) -> None:
+        if self._conn is None:
+            return
+        try:
+            self._loop.remove_reader(self._conn.fileno())
+        except ValueError:
+            pass
+        self._conn.close()
+        self._conn = None
+
+    def _on_readable(self) -> None:
+        try:
+            self._conn.poll()
+        except Exception:
+            logger.exception('LISTEN connection lost')
+            self._disconnect()
+            self._reconnect_task = self._loop.create_task(self._reconnect())
+            return
+        while self._conn.notifies:
+            notification = self._conn.notifies.pop(0)
+            self._dispatch(notification.channel, notification.payload)
+
+    def _dispatch(self, channel: str, payload: Optional[str]) -> None:
+        for handler in self._handlers.get(channel, ()):
+            try:
+                handler(payload)
+            except Exception:
+                logger.exception('Notification handler for %s failed', channel)
+
+    async def _reconnect(self) -> None:
+        while True:
+            await asyncio.sleep(RECONNECT_DELAY)
+            try:
+                await self._connect()
+            except Exception:
+                logger.warning('Cannot reconnect LISTEN connection, retrying')
+                continue
+            for channel in self._handlers:
+                self._dispatch(channel, None)
+            return
@@ -0,0 +1,66 @@
+"""Поиск в админке по индексам Postgres.
+
+`icontains` в Postgres превращается в `UPPER(col::text) LIKE UPPER('%q%')`,
+поэтому триграммные GIN-индексы на имена и ники построены по `UPPER(col)` с
+`gin_trgm_ops` — такой LIKE идёт по индексу, а не сканирует таблицу. Текст
+вопросов ищется полнотекстово по индексу на `to_tsvector`. Участники из
+связанных таблиц находятся подзапросом `fk IN (SELECT id ...)`, а не OR через
+JOIN: так каждое условие остаётся на своём индексе.
+
+На других базах (SQLite в тестах) вместо полнотекстового поиска используется
+`icontains` по словам запроса.
+"""
+from django.contrib.postgres.search import SearchQuery, SearchVector
+from django.db import connection
+from django.db.models import Q, QuerySet
+
+from .models import Participant
+
+SEARCH_CONFIG = 'russian'
+
+# tg_id — BIGINT, длиннее число в него не поместится
+MAX_TG_ID_DIGITS = 18
+
+
+def uses_search_indexes() -> bool:
+    return connection.vendor == 'postgresql'
+
+
+def words_filter(search_term: str, fields: tuple[str, ...]) -> Q:
+    """Каждое слово запроса должно найтись хотя бы в одном из полей."""
+    condition = Q()
+    for word in search_term.split():
+        word_condition = Q()
+        for field in fields:
+            word_condition |= Q(**{f'{field}__icontains': word})
+        condition &= word_condition
+    return condition
+
+
+def participant_filter(search_term: str) -> Q:
+    """Слова ищутся в имени, фамилии и нике (`@` можно не убирать), число — ещё и как tg_id."""
+    condition = Q()
+    for word in search_term.split():
+        username = word.lstrip('@') or word
+        word_condition = (
+            Q(first_name__icontains=word)
+            | Q(last_name__icontains=word)
+            | Q(tg_username__icontains=username)
+        )
+        if word.isdigit() and len(word) <= MAX_TG_ID_DIGITS:
+            word_condition |= Q(tg_id=int(word))
+        condition &= word_condition
+    return condition
+
+
+def matching_participants(search_term: str) -> QuerySet:
+    return Participant.objects.filter(participant_filter(search_term)).values('pk')
+
+
+def fulltext_vector(field: str) -> SearchVector:
+    """Выражение должно совпадать с индексом `question_text_fts` из миграции 0009."""
+    return SearchVector(field, config=SEARCH_CONFIG)
+
+
+def fulltext_query(search_term: str) -> SearchQuery:
+    return SearchQuery(search_term, config=SEARCH_CONFIG, search_type='websearch')
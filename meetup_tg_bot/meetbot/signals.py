@@ -0,0 +1,113 @@
+from collections import Counter, defaultdict
+
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .inbox import apply_counter_deltas, counter_field
+from .matching import schedule_profile_refresh
+from .models import (
+    Event,
+    NetworkingProfile,
+    OutboxTopic,
+    Participant,
+    Place,
+    Question,
+    QuestionStatus,
+    Talk,
+    TalkQuestionCounter,
+)
+from .outbox import publish
+from .participants import PARTICIPANT_CHANNEL
+from .program import schedule_invalidation
+from .pubsub import notify
+
+
+@receiver(post_save, sender=Event)
+@receiver(post_delete, sender=Event)
+@receiver(post_save, sender=Talk)
+@receiver(post_delete, sender=Talk)
+@receiver(post_save, sender=Place)
+@receiver(post_delete, sender=Place)
+def invalidate_program(sender, **kwargs):
+    schedule_invalidation()
+
+
+@receiver(post_save, sender=Talk)
+@receiver(post_delete, sender=Talk)
+def talk_changed(sender, instance, **kwargs):
+    publish(OutboxTopic.TALK_CHANGED, [instance.pk])
+
+
+@receiver(pre_save, sender=Event)
+def remember_event_publication(sender, instance, **kwargs):
+    instance._was_published = False
+    if instance.pk and not kwargs.get('raw'):
+        instance._was_published = Event.objects.filter(pk=instance.pk, is_published=True).exists()
+
+
+@receiver(post_save, sender=Event)
+def event_saved(sender, instance, **kwargs):
+    publish(OutboxTopic.EVENT_CHANGED, [instance.pk])
+    if instance.is_published and not instance._was_published and not kwargs.get('raw'):
+        publish(OutboxTopic.EVENT_PUBLISHED, [instance.pk])
+
+
+@receiver(post_delete, sender=Event)
+def event_deleted(sender, instance, **kwargs):
+    publish(OutboxTopic.EVENT_CHANGED, [instance.pk])
+
+
+@receiver(post_save, sender=Participant)
+@receiver(post_delete, sender=Participant)
+def participant_changed(sender, instance, **kwargs):
+    notify(PARTICIPANT_CHANNEL, str(instance.tg_id))
+    if instance.is_speaker:
+        schedule_invalidation()
+
+
+@receiver(pre_save, sender=Question)
+def remember_question_status(sender, instance, **kwargs):
+    instance._previous_status = None
+    instance._previous_talk_id = None
+    if instance.pk and not kwargs.get('raw'):
+        instance._previous_status, instance._previous_talk_id = (
+            Question.objects.filter(pk=instance.pk).values_list('status', 'talk_id').first() or (None, None)
+        )
+
+
+@receiver(post_save, sender=Question)
+def update_question_counters(sender, instance, created, **kwargs):
+    old_field = None if created else counter_field(instance._previous_status)
+    old_talk_id = instance.talk_id if created else instance._previous_talk_id
+    new_field = counter_field(instance.status)
+    if old_field == new_field and old_talk_id == instance.talk_id:
+        return
+    # при переносе вопроса в другой доклад старый счётчик уменьшается, новый растёт
+    deltas = defaultdict(Counter)
+    if old_field:
+        deltas[old_talk_id][old_field] -= 1
+    if new_field:
+        deltas[instance.talk_id][new_field] += 1
+    apply_counter_deltas(deltas)
+
+
+@receiver(post_save, sender=Question)
+def question_answered(sender, instance, created, **kwargs):
+    if instance.status == QuestionStatus.ANSWERED and instance._previous_status != QuestionStatus.ANSWERED:
+        publish(OutboxTopic.QUESTION_ANSWERED, [instance.pk])
+
+
+@receiver(post_delete, sender=Question)
+def discount_deleted_question(sender, instance, **kwargs):
+    field = counter_field(instance.status)
+    if field:
+        # без создания строки: при удалении доклада счётчик удаляется каскадом
+        TalkQuestionCounter.objects.filter(talk_id=instance.talk_id).update(**{field: F(field) - 1})
+
+
+@receiver(post_save, sender=NetworkingProfile)
+@receiver(post_delete, sender=NetworkingProfile)
+def networking_profile_changed(sender, instance, **kwargs):
+    schedule_profile_refresh(instance.pk)
+
@@ -0,0 +1,76 @@
+"""Сводная статистика мероприятий.
+
+Агрегаты по вопросам, донатам и знакомствам считаются тремя GROUP BY сразу
+для набора мероприятий и складываются в `EventStats` — по строке на
+мероприятие. Админка читает готовую строку, а не агрегирует на каждый
+показ страницы.
+"""
+from collections import defaultdict
+from typing import Iterable, Optional
+
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from .models import Donation, Event, EventStats, NetworkingMatch, NetworkingMatchStatus, Question
+
+
+def refresh_event_stats(event_ids: Optional[Iterable[int]] = None) -> int:
+    """Пересчитывает статистику мероприятий (по умолчанию — активных)."""
+    if event_ids is None:
+        event_ids = Event.objects.filter(is_active=True).values_list('pk', flat=True)
+    event_ids = list(event_ids)
+    if not event_ids:
+        return 0
+
+    questions = defaultdict(dict)
+    for event_id, status, count in (
+        Question.objects.filter(talk__event_id__in=event_ids)
+        .values_list('talk__event_id', 'status')
+        .annotate(count=Count('id'))
+        .order_by()
+    ):
+        questions[event_id][status] = count
+
+    donations = defaultdict(list)
+    for event_id, status, currency, count, amount in (
+        Donation.objects.filter(event_id__in=event_ids)
+        .values_list('event_id', 'status', 'currency')
+        .annotate(count=Count('id'), amount=Sum('amount'))
+        .order_by('event_id', 'status', 'currency')
+    ):
+        donations[event_id].append(
+            {'status': status, 'currency': currency, 'count': count, 'amount': f'{amount:.2f}'}
+        )
+
+    matches = defaultdict(dict)
+    for event_id, status, count in (
+        NetworkingMatch.objects.filter(event_id__in=event_ids)
+        .values_list('event_id', 'status')
+        .annotate(count=Count('id'))
+        .order_by()
+    ):
+        matches[event_id][status] = count
+
+    now = timezone.now()
+    EventStats.objects.bulk_create(
+        [
+            EventStats(
+                event_id=event_id,
+                question_counts=questions[event_id],
+                donation_totals=donations[event_id],
+                match_counts=matches[event_id],
+                refreshed_at=now,
+            )
+            for event_id in event_ids
+        ],
+        update_conflicts=True,
+        unique_fields=['event'],
+        update_fields=['question_counts', 'donation_totals', 'match_counts', 'refreshed_at'],
+    )
+    return len(event_ids)
+
+
+def acceptance_rate(match_counts: dict) -> Optional[float]:
+    """Доля принятых среди всех предложенных знакомств."""
+    total = sum(match_counts.values())
+    return match_counts.get(NetworkingMatchStatus.ACCEPTED, 0) / total if total else None
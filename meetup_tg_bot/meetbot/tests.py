@@ -1,3 +1,1825 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import runpy
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from typing import Optional
+
+import httpx
+import numpy as np
+from asgiref.sync import async_to_sync
+from prometheus_client import REGISTRY
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.db import DatabaseError, connection, transaction
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from telegram import Bot, Update
+from telegram.ext import Application, BaseUpdateProcessor
+
+from meetbot.admin import EventAdminForm
+from meetbot.bot.benchmark import FIRST_USER_ID, percentile, run_benchmark, seed_benchmark_event, user_script
+from meetbot.bot.broadcast import BroadcastEngine, RateLimiter, claim_next_broadcast, fetch_recipients
+from meetbot.bot.db import run_db, shutdown_db_executor
+from meetbot.bot.fake_telegram import FakeBotApi, FakeTelegramSender
+from meetbot.bot.handlers import CALLBACK_PROGRAM, CALLBACK_QUESTION
+from meetbot.bot.identity import ParticipantDirectory, participant_directory
+from meetbot.bot.metrics import instrumented
+from meetbot.bot.outbox import OutboxConsumer
+from meetbot.bot.persistence import DjangoPersistence, load_state, save_states
+from meetbot.bot.processor import ChatOrderedUpdateProcessor
+from meetbot.bot.questions import QuestionDraft, QuestionIntake, SavedQuestion, format_digests, question_intake
+from meetbot.bot.runner import build_application, run_bot
+from meetbot.bot.startup_benchmark import measure_startup
+from meetbot.bot.timeline import TalkScheduler
+from meetbot.bot.warmup import wait_for_warmup
+from meetbot.bot.webhook import start_webhook_application, stop_webhook_application
+from meetbot.donations import stale_donation_chunks
+from meetbot.fake_yookassa import FakeYooKassa
+from meetbot.inbox import decode_cursor, encode_cursor, inbox_page, rebuild_counters, set_question_status
+from meetbot.match_index import MatchIndex
+from meetbot.matching import build_match_index, match_indexes, suggest_match
+from meetbot.metrics import render_metrics
+from meetbot.models import (
+    Broadcast,
+    BroadcastStatus,
+    BotState,
+    BotStateKind,
+    Donation,
+    DonationStatus,
+    Event,
+    EventStats,
+    NetworkingMatch,
+    NetworkingProfile,
+    OutboxMessage,
+    OutboxTopic,
+    Participant,
+    Place,
+    Question,
+    QuestionStatus,
+    Subscription,
+    SubscriptionType,
+    Talk,
+    TalkQuestionCounter,
+    TalkStatus,
+)
+from meetbot.outbox import publish, retry_failed
+from meetbot.participants import TelegramProfile, upsert_participants
+from meetbot.program import (
+    announce_events,
+    build_program,
+    current_talk_cache,
+    fetch_current_talk,
+    invalidate_caches,
+    program_cache,
+    switch_current_talk,
+)
+from meetbot.pubsub import PgListener
+from meetbot.stats import acceptance_rate, refresh_event_stats
+from meetbot.timeline import END, REMINDER, START, TalkTransition, apply_transition, load_timeline, talk_transitions
+from meetbot.web_benchmark import run_load
+from meetbot.yookassa import YooKassaClient, YooKassaError
+from meetuptg_bot.server import ASGI, WSGI, worker_count
+
+WEBHOOK_PATH = '/telegram/webhook/'
+
+# админка в тестах рендерится без collectstatic и манифеста
+without_static_manifest = override_settings(
+    STORAGES={
+        'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+        'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    }
+)
+
+
+async def wait_for_calls(api: FakeBotApi, method: str, count: int = 1) -> list:
+    for _ in range(100):
+        calls = api.calls_to(method)
+        if len(calls) >= count:
+            return calls
+        await asyncio.sleep(0.01)
+    raise AssertionError(f'{method} was called {len(api.calls_to(method))} times, expected {count}')
+
+
+@asynccontextmanager
+async def webhook_bot():
+    api = FakeBotApi()
+    await start_webhook_application(build_application('123:TEST', request=api))
+    # SQLite в тестах не переносит чтение прогрева параллельно с записью обработчиков
+    await wait_for_warmup()
+    try:
+        yield api
+    finally:
+        await stop_webhook_application()
+
+
+@override_settings(TELEGRAM_WEBHOOK_SECRET='secret', TELEGRAM_WEBHOOK_URL='')
+class WebhookTests(TransactionTestCase):
+    sender = FakeTelegramSender(secret_token='secret')
+
+    def setUp(self):
+        # база очищается между тестами, а кеши процесса — нет
+        participant_directory.forget()
+        invalidate_caches()
+
+    @override_settings(TELEGRAM_BOT_MODE='webhook', TELEGRAM_BOT_TOKEN='123:TEST')
+    def test_polling_process_exits_cleanly_in_webhook_mode(self):
+        # ненулевой код перезапускал бы сервис bot в docker-compose по кругу
+        with mock.patch('meetbot.bot.runner.build_application') as build:
+            run_bot()
+
+        build.assert_not_called()
+
+    async def test_start_command_is_answered(self):
+        async with webhook_bot() as api:
+            response = await self.sender.send(self.async_client, WEBHOOK_PATH, self.sender.message(42, '/start'))
+
+            self.assertEqual(response.status_code, 200)
+            calls = await wait_for_calls(api, 'sendMessage')
+            self.assertEqual(calls[0]['chat_id'], 42)
+
+    async def test_menu_callback_is_answered(self):
+        async with webhook_bot() as api:
+            await self.sender.send(self.async_client, WEBHOOK_PATH, self.sender.callback(42, CALLBACK_PROGRAM))
+
+            await wait_for_calls(api, 'answerCallbackQuery')
+            await wait_for_calls(api, 'editMessageText')
+
+    async def test_question_is_delivered_to_current_speaker(self):
+        now = timezone.now()
+        speaker = await Participant.objects.acreate(tg_id=500, first_name='Гвидо', is_speaker=True)
+        event = await Event.objects.acreate(name='Meetup', start_at=now, end_at=now, is_active=True)
+        talk = await Talk.objects.acreate(
+            event=event, title='Asyncio', speaker=speaker, start_at=now, end_at=now + timedelta(hours=1)
+        )
+        await run_db(switch_current_talk, event.pk, talk.pk)
+
+        with mock.patch.object(question_intake, 'flush_interval', 0):
+            async with webhook_bot() as api:
+                await self.sender.send(self.async_client, WEBHOOK_PATH, self.sender.callback(42, CALLBACK_QUESTION))
+                await wait_for_calls(api, 'editMessageText')
+                await self.sender.send(self.async_client, WEBHOOK_PATH, self.sender.message(42, 'Что с GIL?'))
+
+                calls = await wait_for_calls(api, 'sendMessage', count=2)
+
+        self.assertIn(500, [call['chat_id'] for call in calls])
+        question = await Question.objects.aget()
+        self.assertEqual(question.status, QuestionStatus.SENT_TO_SPEAKER)
+        self.assertEqual(question.text, 'Что с GIL?')
+
+    async def test_slow_payment_does_not_block_chat(self):
+        now = timezone.now()
+        await Event.objects.acreate(name='Meetup', start_at=now, end_at=now, is_active=True)
+        fake = FakeYooKassa(latency=0.3)
+        client = YooKassaClient(transport=fake, retry_delay=0)
+
+        with mock.patch('meetbot.bot.donations.yookassa_client', client):
+            async with webhook_bot() as api:
+                await self.sender.send(self.async_client, WEBHOOK_PATH, self.sender.callback(42, 'donate:300'))
+                await wait_for_calls(api, 'editMessageText')
+                await self.sender.send(self.async_client, WEBHOOK_PATH, self.sender.message(42, '/start'))
+
+                await wait_for_calls(api, 'sendMessage')
+                self.assertEqual(len(api.calls_to('editMessageText')), 1)
+                calls = await wait_for_calls(api, 'editMessageText', count=2)
+            await client.aclose()
+
+        self.assertIn('💳 Оплатить', json.dumps(calls[1]['reply_markup'], ensure_ascii=False))
+        donation = await Donation.objects.aget()
+        self.assertEqual(donation.yookassa_payment_id, next(iter(fake.payments)))
+
+    async def test_answer_given_while_bot_was_down_reaches_author(self):
+        now = timezone.now()
+        author = await Participant.objects.acreate(tg_id=42, first_name='Гость')
+        event = await Event.objects.acreate(name='Meetup', start_at=now, end_at=now, is_active=True)
+        talk = await Talk.objects.acreate(event=event, title='Asyncio', start_at=now, end_at=now)
+        question = await Question.objects.acreate(talk=talk, author=author, text='Что с GIL?')
+        question.status = QuestionStatus.ANSWERED
+        question.answer_text = 'GIL скоро уберут'
+        await question.asave()
+
+        async with webhook_bot() as api:
+            calls = await wait_for_calls(api, 'sendMessage')
+
+        self.assertEqual(calls[0]['chat_id'], 42)
+        self.assertIn('GIL скоро уберут', calls[0]['text'])
+
+    async def test_wrong_secret_is_rejected(self):
+        sender = FakeTelegramSender(secret_token='wrong')
+
+        async with webhook_bot():
+            response = await sender.send(self.async_client, WEBHOOK_PATH, sender.message(42, '/start'))
+
+        self.assertEqual(response.status_code, 403)
+
+    async def test_malformed_update_is_rejected(self):
+        async with webhook_bot():
+            payloads = [
+                [],
+                'x',
+                {},
+                {'message': {}},
+                {'update_id': 1, 'message': 'x'},
+                {'update_id': 1, 'message': {'chat': 1}},
+            ]
+            for payload in payloads:
+                with self.subTest(payload=payload):
+                    response = await self.sender.send(self.async_client, WEBHOOK_PATH, payload)
+
+                    self.assertEqual(response.status_code, 400)
+
+
+class YooKassaClientTests(SimpleTestCase):
+    async def test_retries_reuse_idempotence_key(self):
+        fake = FakeYooKassa()
+        fake.fail_next(503, 0)
+        client = YooKassaClient(transport=fake, retry_delay=0)
+
+        with self.assertLogs('meetbot.yookassa', 'WARNING'):
+            payment = await client.create_payment(Decimal('300'), 'RUB', 'Донат', idempotence_key='key-1')
+        again = await client.create_payment(Decimal('300'), 'RUB', 'Донат', idempotence_key='key-1')
+        await client.aclose()
+
+        self.assertEqual(payment.id, again.id)
+        self.assertEqual(len(fake.payments), 1)
+        self.assertEqual({request.headers['Idempotence-Key'] for request in fake.requests}, {'key-1'})
+
+    async def test_gives_up_after_retries(self):
+        fake = FakeYooKassa()
+        fake.fail_next(500, 500, 500)
+        client = YooKassaClient(transport=fake, retries=2, retry_delay=0)
+
+        with self.assertRaises(YooKassaError), self.assertLogs('meetbot.yookassa', 'WARNING'):
+            await client.get_payment('missing')
+        await client.aclose()
+
+
+    def test_call_outside_open_loop_closes_its_client(self):
+        fake = FakeYooKassa()
+        client = YooKassaClient(transport=fake, retry_delay=0)
+        payment = async_to_sync(client.create_payment)(Decimal('300'), 'RUB', 'Донат', idempotence_key='key-1')
+
+        opened = []
+        new_client = client._new_client
+
+        with mock.patch.object(client, '_new_client', lambda: opened.append(new_client()) or opened[-1]):
+            # как вебхук под WSGI: каждый вызов в своём цикле событий
+            for _ in range(3):
+                async_to_sync(client.get_payment)(payment.id)
+
+        self.assertEqual(len(opened), 3)
+        self.assertTrue(all(http.is_closed for http in opened))
+        self.assertIsNone(client._client)
+
+    async def test_open_client_is_shared_between_calls(self):
+        fake = FakeYooKassa()
+        client = YooKassaClient(transport=fake, retry_delay=0)
+        await client.open()
+        shared = client._client
+
+        payment = await client.create_payment(Decimal('300'), 'RUB', 'Донат', idempotence_key='key-1')
+        await client.get_payment(payment.id)
+
+        self.assertIs(client._client, shared)
+        self.assertFalse(shared.is_closed)
+        await client.aclose()
+        self.assertTrue(shared.is_closed)
+
+
+class YooKassaWebhookTests(TestCase):
+    async def test_notification_updates_open_donations_only(self):
+        fake = FakeYooKassa()
+        client = YooKassaClient(transport=fake, retry_delay=0)
+        now = timezone.now()
+        event = await Event.objects.acreate(name='Meetup', start_at=now, end_at=now)
+        paid = await client.create_payment(Decimal('300'), 'RUB', 'Донат', idempotence_key='paid')
+        refunded = await client.create_payment(Decimal('100'), 'RUB', 'Донат', idempotence_key='done')
+        await Donation.objects.acreate(event=event, amount=300, yookassa_payment_id=paid.id)
+        await Donation.objects.acreate(
+            event=event, amount=100, yookassa_payment_id=refunded.id, status=DonationStatus.SUCCEEDED
+        )
+        fake.set_status(paid.id, 'succeeded')
+        fake.set_status(refunded.id, 'canceled')
+
+        with mock.patch('meetbot.views.yookassa_client', client):
+            for payment_id in (paid.id, refunded.id):
+                response = await self.async_client.post(
+                    '/yookassa/webhook/', fake.notification(payment_id), content_type='application/json'
+                )
+                self.assertEqual(response.status_code, 200)
+        await client.aclose()
+
+        statuses = {donation.yookassa_payment_id: donation.status async for donation in Donation.objects.all()}
+        self.assertEqual(statuses, {paid.id: DonationStatus.SUCCEEDED, refunded.id: DonationStatus.SUCCEEDED})
+
+
+class ReconcileDonationsTests(TransactionTestCase):
+    def test_stale_donations_are_reconciled_in_chunks(self):
+        fake = FakeYooKassa()
+        client = YooKassaClient(transport=fake, retry_delay=0)
+        now = timezone.now()
+        event = Event.objects.create(name='Meetup', start_at=now, end_at=now)
+        expected = {}
+        for number, status in enumerate(['succeeded', 'canceled', 'pending', 'succeeded', 'waiting_for_capture']):
+            payment = async_to_sync(client.create_payment)(Decimal(100), 'RUB', 'Донат', idempotence_key=str(number))
+            fake.set_status(payment.id, status)
+            Donation.objects.create(event=event, amount=100, yookassa_payment_id=payment.id)
+            expected[payment.id] = status
+        Donation.objects.update(created_at=now - timedelta(hours=1))
+        fresh = async_to_sync(client.create_payment)(Decimal(100), 'RUB', 'Донат', idempotence_key='fresh')
+        fake.set_status(fresh.id, 'succeeded')
+        Donation.objects.create(event=event, amount=100, yookassa_payment_id=fresh.id)
+        Donation.objects.create(event=event, amount=100, created_at=now)
+        Donation.objects.filter(yookassa_payment_id='').update(created_at=now - timedelta(hours=1))
+        expected[fresh.id] = 'pending'
+        expected[''] = DonationStatus.FAILED
+
+        out = StringIO()
+        with mock.patch(
+            'meetbot.management.commands.reconcile_donations.YooKassaClient',
+            return_value=YooKassaClient(transport=fake),
+        ):
+            call_command('reconcile_donations', chunk_size=2, concurrency=2, stdout=out)
+
+        self.assertEqual(dict(Donation.objects.values_list('yookassa_payment_id', 'status')), expected)
+        self.assertIn('Проверено: 5, обновлено: 4', out.getvalue())
+
+
+@without_static_manifest
+class EventStatsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        cls.admin = User.objects.create_superuser('admin', password='admin')
+        cls.event = Event.objects.create(name='Meetup', start_at=now, end_at=now, is_active=True)
+        talk = Talk.objects.create(event=cls.event, title='Asyncio', start_at=now, end_at=now)
+        Question.objects.bulk_create(
+            Question(talk=talk, text='?', status=status)
+            for status in [QuestionStatus.PENDING, QuestionStatus.ANSWERED, QuestionStatus.ANSWERED]
+        )
+        Donation.objects.bulk_create(
+            Donation(event=cls.event, amount=amount, status=status)
+            for amount, status in [(300, DonationStatus.SUCCEEDED), (200, DonationStatus.SUCCEEDED), (100, 'failed')]
+        )
+        profiles = [
+            NetworkingProfile.objects.create(
+                participant=Participant.objects.create(tg_id=tg_id), event=cls.event, contact='@me'
+            )
+            for tg_id in range(3)
+        ]
+        NetworkingMatch.objects.create(
+            event=cls.event, source_profile=profiles[0], target_profile=profiles[1], status='accepted'
+        )
+        NetworkingMatch.objects.create(event=cls.event, source_profile=profiles[0], target_profile=profiles[2])
+
+    def test_refresh_aggregates_with_fixed_query_count(self):
+        with self.assertNumQueries(5):
+            refresh_event_stats()
+
+        stats = EventStats.objects.get(event=self.event)
+        self.assertEqual(stats.question_counts, {'pending': 1, 'answered': 2})
+        self.assertIn({'status': 'succeeded', 'currency': 'RUB', 'count': 2, 'amount': '500.00'}, stats.donation_totals)
+        self.assertEqual(acceptance_rate(stats.match_counts), 0.5)
+
+    def test_dashboard_does_not_aggregate(self):
+        refresh_event_stats()
+        self.client.force_login(self.admin)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/admin/meetbot/eventstats/')
+
+        self.assertContains(response, '500.00 RUB')
+        self.assertFalse(any('GROUP BY' in query['sql'] for query in queries.captured_queries))
+
+
+@without_static_manifest
+class AdminQueryCountTests(TestCase):
+    """Число запросов страниц админки не должно расти с числом строк."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', password='admin')
+
+    @staticmethod
+    def seed(number: int) -> None:
+        now = timezone.now()
+        place = Place.objects.create(name=f'Место {number}')
+        event = Event.objects.create(name=f'Meetup {number}', place=place, start_at=now, end_at=now)
+        speaker = Participant.objects.create(tg_id=number * 10, first_name='Спикер', is_speaker=True)
+        guest = Participant.objects.create(tg_id=number * 10 + 1, first_name='Гость')
+        talk = Talk.objects.create(event=event, title='Доклад', speaker=speaker, start_at=now, end_at=now)
+        Question.objects.create(talk=talk, author=guest, text='Вопрос')
+        profiles = [
+            NetworkingProfile.objects.create(participant=participant, event=event, contact='@me')
+            for participant in (speaker, guest)
+        ]
+        NetworkingMatch.objects.create(event=event, source_profile=profiles[0], target_profile=profiles[1])
+        Donation.objects.create(event=event, participant=guest, amount=100)
+        Subscription.objects.create(event=event, participant=guest)
+        Broadcast.objects.create(event=event, text='Анонс')
+        BotState.objects.create(kind=BotStateKind.USER, key=str(guest.tg_id))
+        refresh_event_stats([event.pk])
+
+    def page_queries(self) -> dict[str, int]:
+        request = RequestFactory().get('/')
+        request.user = self.admin
+        counts = {}
+        for model, model_admin in admin.site._registry.items():
+            if model._meta.app_label != 'meetbot':
+                continue
+            urls = [reverse(f'admin:meetbot_{model._meta.model_name}_changelist')]
+            if model_admin.has_add_permission(request):
+                urls.append(reverse(f'admin:meetbot_{model._meta.model_name}_add'))
+            for url in urls:
+                # кеш ContentType прогревается первым запросом и сбивает подсчёт
+                ContentType.objects.clear_cache()
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, 200, url)
+                counts[url] = len(queries)
+        return counts
+
+    def test_query_count_does_not_depend_on_rows(self):
+        self.client.force_login(self.admin)
+        self.seed(1)
+        few = self.page_queries()
+        for number in range(2, 6):
+            self.seed(number)
+
+        self.assertEqual(self.page_queries(), few)
+
+
+class AdminSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        event = Event.objects.create(name='Meetup', start_at=now, end_at=now)
+        cls.guido = Participant.objects.create(tg_id=1991, tg_username='guido', first_name='Гвидо')
+        cls.other = Participant.objects.create(tg_id=2, tg_username='anna', first_name='Анна')
+        talk = Talk.objects.create(event=event, title='Asyncio', speaker=cls.other, start_at=now, end_at=now)
+        cls.by_guido = Question.objects.create(talk=talk, author=cls.guido, text='Когда уберут GIL?')
+        cls.about_gil = Question.objects.create(talk=talk, author=cls.other, text='Что будет с GIL дальше?')
+        Question.objects.create(talk=talk, author=cls.other, text='Где слайды?')
+
+    def search(self, model, term: str) -> list:
+        model_admin = admin.site._registry[model]
+        queryset, may_have_duplicates = model_admin.get_search_results(None, model.objects.all(), term)
+        self.assertFalse(may_have_duplicates)
+        return sorted(queryset.values_list('pk', flat=True))
+
+    def test_participant_by_username_name_and_tg_id(self):
+        self.assertEqual(self.search(Participant, '@guido'), [self.guido.pk])
+        self.assertEqual(self.search(Participant, 'Гвидо'), [self.guido.pk])
+        self.assertEqual(self.search(Participant, '1991'), [self.guido.pk])
+
+    def test_question_by_text_or_author(self):
+        self.assertEqual(self.search(Question, 'GIL'), [self.by_guido.pk, self.about_gil.pk])
+        self.assertEqual(self.search(Question, 'guido'), [self.by_guido.pk])
+        self.assertEqual(self.search(Question, 'GIL дальше'), [self.about_gil.pk])
+
+    def test_related_participants_use_subquery(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.search(Question, 'guido')
+        self.assertNotIn('JOIN', queries.captured_queries[0]['sql'])
+
+    def test_postgres_uses_fulltext_query(self):
+        model_admin = admin.site._registry[Question]
+        with mock.patch('meetbot.admin.uses_search_indexes', return_value=True):
+            queryset, _ = model_admin.get_search_results(None, Question.objects.all(), 'GIL')
+        sql = str(queryset.query)
+        self.assertIn('to_tsvector', sql)
+        self.assertIn('websearch_to_tsquery', sql)
+
+
+class IndexUsageTests(TestCase):
+    """Основные запросы бота идут по индексам, а не полным сканом таблицы.
+
+    Проверяется SQL, который реально выполняют функции бота. На Postgres
+    последовательный скан выключается: на маленькой тестовой базе он дешевле
+    индекса, а проверяем мы, что индекс подходит запросу.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        cls.event = Event.objects.create(name='Meetup', start_at=now, end_at=now, is_active=True)
+        Event.objects.bulk_create(
+            Event(name=f'Прошлый {number}', start_at=now - timedelta(days=number), end_at=now)
+            for number in range(1, 20)
+        )
+        participants = Participant.objects.bulk_create(
+            Participant(tg_id=number, first_name=f'Гость {number}') for number in range(1, 50)
+        )
+        cls.talk = Talk.objects.create(event=cls.event, title='Доклад', start_at=now, end_at=now)
+        Question.objects.bulk_create(
+            Question(talk=cls.talk, author=participant, text='Вопрос') for participant in participants
+        )
+        Subscription.objects.bulk_create(
+            Subscription(participant=participant, event=cls.event) for participant in participants
+        )
+        NetworkingProfile.objects.bulk_create(
+            NetworkingProfile(participant=participant, event=cls.event, contact='@me')
+            for participant in participants
+        )
+        Donation.objects.bulk_create(
+            Donation(event=cls.event, participant=participant, amount=100, idempotence_key=str(participant.pk))
+            for participant in participants
+        )
+        cls.broadcast = Broadcast.objects.create(event=cls.event, text='Анонс', status=BroadcastStatus.RUNNING)
+
+    def queries(self, func, *args) -> list[str]:
+        with CaptureQueriesContext(connection) as queries:
+            result = func(*args)
+            if hasattr(result, '__next__'):
+                list(result)
+        return [query['sql'] for query in queries.captured_queries]
+
+    def plan(self, sql: str) -> str:
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute('SET LOCAL enable_seqscan = off')
+                cursor.execute(f'EXPLAIN {sql}')
+                return '\n'.join(row[0] for row in cursor.fetchall())
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return '\n'.join(row[-1] for row in cursor.fetchall())
+
+    def assertUsesIndex(self, queries: list[str], table: str, index: Optional[str] = None) -> None:
+        """Запросы к `table` не сканируют её целиком (и идут по `index`, если он указан)."""
+        table_queries = [sql for sql in queries if f'FROM "{table}"' in sql]
+        self.assertTrue(table_queries, f'no query on {table}')
+        for sql in table_queries:
+            plan = self.plan(sql)
+            if index:
+                self.assertIn(index, plan, sql)
+            full_scans = [
+                line for line in plan.splitlines()
+                if 'Seq Scan' in line or (line.lstrip('-> ').startswith('SCAN ') and 'INDEX' not in line)
+            ]
+            self.assertEqual(full_scans, [], sql)
+
+    def test_program(self):
+        queries = self.queries(build_program)
+        self.assertUsesIndex(queries, 'meetbot_event', 'event_active_start_idx')
+        self.assertUsesIndex(queries, 'meetbot_talk', 'talk_event_order_idx')
+
+    def test_current_talk_and_stats(self):
+        self.assertUsesIndex(self.queries(fetch_current_talk), 'meetbot_event', 'event_active_start_idx')
+        self.assertUsesIndex(self.queries(refresh_event_stats), 'meetbot_event', 'event_active_start_idx')
+
+    def test_speaker_inbox(self):
+        queries = self.queries(inbox_page, self.talk.pk, 0, None, 5, True)
+        self.assertUsesIndex(queries, 'meetbot_question', 'question_talk_status_asked_idx')
+
+    def test_broadcast_recipients(self):
+        # подписки проверяются либо по уникальному индексу на участника,
+        # либо по subscription_active_idx — выбор за планировщиком
+        self.assertUsesIndex(self.queries(fetch_recipients, self.broadcast, 0, 100), 'meetbot_subscription')
+
+    def test_networking_profiles(self):
+        queries = self.queries(build_match_index, self.event.pk)
+        self.assertUsesIndex(queries, 'meetbot_networkingprofile', 'profile_event_active_idx')
+
+    def test_stale_donations(self):
+        queries = self.queries(stale_donation_chunks, timezone.now(), 10)
+        self.assertUsesIndex(queries, 'meetbot_donation', 'donation_status_created_idx')
+
+
+class BenchmarkTests(TransactionTestCase):
+    def test_synthetic_users_go_through_full_scenario(self):
+        seed_benchmark_event()
+
+        result = asyncio.run(run_benchmark(users=5, concurrency=4, questions=2))
+
+        self.assertEqual(result.errors, 0)
+        self.assertEqual(result.updates, 5 * len(user_script(questions=2)))
+        self.assertEqual(len(result.all_latencies), result.updates)
+        self.assertEqual(Question.objects.count(), 10)
+        self.assertEqual(Participant.objects.filter(tg_id__gte=FIRST_USER_ID).count(), 5)
+        self.assertGreater(result.queries, 0)
+        report = result.as_dict()
+        self.assertLessEqual(report['latency_ms']['p50'], report['latency_ms']['p99'])
+
+    def test_application_is_shut_down_when_scenario_fails(self):
+        seed_benchmark_event()
+
+        with mock.patch('telegram.ext.Application.process_update', side_effect=RuntimeError('boom')), mock.patch(
+            'telegram.ext.Application.shutdown', autospec=True, side_effect=Application.shutdown
+        ) as shutdown, self.assertRaisesMessage(RuntimeError, 'boom'):
+            asyncio.run(run_benchmark(users=2, concurrency=2))
+
+        shutdown.assert_awaited_once()
+
+    def test_percentile(self):
+        self.assertEqual(percentile([], 95), 0.0)
+        self.assertEqual(percentile([3, 1, 2, 4], 50), 2)
+        self.assertEqual(percentile(list(range(1, 101)), 99), 99)
+
+
+def sample(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+@override_settings(TELEGRAM_WEBHOOK_SECRET='secret', TELEGRAM_WEBHOOK_URL='')
+class MetricsTests(TransactionTestCase):
+    sender = FakeTelegramSender(secret_token='secret')
+
+    def setUp(self):
+        participant_directory.forget()
+        invalidate_caches()
+
+    async def test_handlers_db_and_bot_api_are_measured(self):
+        before = (
+            sample('meetbot_handler_duration_seconds_count', handler='start'),
+            sample('meetbot_db_queries_total', source='track_participant'),
+            sample('meetbot_telegram_api_duration_seconds_count', method='sendMessage'),
+        )
+        async with webhook_bot() as api:
+            await self.sender.send(self.async_client, WEBHOOK_PATH, self.sender.message(77, '/start'))
+            await wait_for_calls(api, 'sendMessage')
+
+        after = (
+            sample('meetbot_handler_duration_seconds_count', handler='start'),
+            sample('meetbot_db_queries_total', source='track_participant'),
+            sample('meetbot_telegram_api_duration_seconds_count', method='sendMessage'),
+        )
+        self.assertEqual(after[0], before[0] + 1)
+        self.assertGreater(after[1], before[1])
+        self.assertEqual(after[2], before[2] + 1)
+
+    def test_handler_errors_are_counted(self):
+        async def broken(update, context):
+            raise ValueError('boom')
+
+        before = sample('meetbot_handler_errors_total', handler='broken', error='ValueError')
+        with self.assertRaises(ValueError):
+            asyncio.run(instrumented(broken)(None, None))
+        self.assertEqual(sample('meetbot_handler_errors_total', handler='broken', error='ValueError'), before + 1)
+
+    def test_multiprocess_metrics_keep_update_queue(self):
+        application = build_application('123:TEST', request=FakeBotApi())
+
+        with tempfile.TemporaryDirectory() as directory, mock.patch.dict(
+            'os.environ', PROMETHEUS_MULTIPROC_DIR=directory
+        ):
+            content, _ = render_metrics()
+
+        self.assertIn(b'meetbot_update_queue_depth', content)
+        self.assertIn(b'meetbot_updates_in_flight', content)
+        del application
+
+    @override_settings(METRICS_TOKEN='token')
+    def test_metrics_endpoint(self):
+        self.assertEqual(self.client.get('/metrics/').status_code, 403)
+
+        response = self.client.get('/metrics/', headers={'Authorization': 'Bearer token'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'meetbot_db_queries_total', response.content)
+
+
+class ChatOrderedUpdateProcessorTests(SimpleTestCase):
+    sender = FakeTelegramSender()
+
+    def _update(self, chat_id: int) -> Update:
+        return Update.de_json(self.sender.message(chat_id, 'text'), None)
+
+    async def _run(self, processor, chat_id, log, delay):
+        async def handler():
+            log.append(('start', chat_id))
+            await asyncio.sleep(delay)
+            log.append(('end', chat_id))
+
+        await processor.process_update(self._update(chat_id), handler())
+
+    async def test_same_chat_is_sequential(self):
+        processor = ChatOrderedUpdateProcessor(8)
+        log = []
+
+        await asyncio.gather(
+            self._run(processor, 1, log, 0.02),
+            self._run(processor, 1, log, 0),
+        )
+
+        self.assertEqual(log, [('start', 1), ('end', 1), ('start', 1), ('end', 1)])
+        self.assertEqual(processor.active_chats, 0)
+
+    async def test_different_chats_run_in_parallel(self):
+        processor = ChatOrderedUpdateProcessor(8)
+        log = []
+
+        await asyncio.gather(
+            self._run(processor, 1, log, 0.02),
+            self._run(processor, 2, log, 0),
+        )
+
+        self.assertEqual(log[:2], [('start', 1), ('start', 2)])
+        self.assertEqual((processor.in_flight, processor.waiting), (0, 0))
+
+    async def test_concurrency_is_limited(self):
+        self.assertIs(ChatOrderedUpdateProcessor.process_update, BaseUpdateProcessor.process_update)
+        processor = ChatOrderedUpdateProcessor(1)
+        self.assertEqual(processor.max_concurrent_updates, 1)
+        log = []
+
+        await asyncio.gather(
+            self._run(processor, 1, log, 0.02),
+            self._run(processor, 2, log, 0),
+        )
+
+        self.assertEqual(log, [('start', 1), ('end', 1), ('start', 2), ('end', 2)])
+        self.assertEqual(processor.active_chats, 0)
+
+    async def test_busy_chat_does_not_hold_all_slots(self):
+        processor = ChatOrderedUpdateProcessor(4)
+        log = []
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+
+        busy = [asyncio.ensure_future(self._run(processor, 1, log, 0.05)) for _ in range(8)]
+        await asyncio.sleep(0)
+        await self._run(processor, 2, log, 0)
+        other_done = loop.time() - started
+        await asyncio.gather(*busy)
+
+        # ожидающие апдейты чата 1 не занимают слоты: чат 2 не ждёт всю их очередь
+        self.assertLess(other_done, 0.1)
+        self.assertEqual((processor.in_flight, processor.waiting, processor.active_chats), (0, 0, 0))
+
+
+class ScriptedBotApi(FakeBotApi):
+    """`FakeBotApi`, который отвечает ошибками Telegram заданным чатам."""
+
+    def __init__(self, blocked: tuple[int, ...] = (), flood_once: tuple[int, ...] = ()):
+        super().__init__()
+        self.blocked = set(blocked)
+        self.flood_once = set(flood_once)
+
+    async def do_request(self, url, method, request_data=None, **kwargs):
+        chat_id = request_data.parameters.get('chat_id') if request_data else None
+        if url.endswith('/sendMessage') and chat_id in self.blocked:
+            self.calls.append(('sendMessage', request_data.parameters))
+            return 403, json.dumps({'ok': False, 'description': 'Forbidden: bot was blocked by the user'}).encode()
+        if url.endswith('/sendMessage') and chat_id in self.flood_once:
+            self.flood_once.discard(chat_id)
+            self.calls.append(('sendMessage', request_data.parameters))
+            payload = {'ok': False, 'description': 'Too Many Requests', 'parameters': {'retry_after': 1}}
+            return 429, json.dumps(payload).encode()
+        return await super().do_request(url, method, request_data, **kwargs)
+
+
+class RateLimiterTests(SimpleTestCase):
+    async def test_global_rate_is_capped(self):
+        limiter = RateLimiter(rate=20)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+
+        for chat_id in range(11):
+            await limiter.acquire(chat_id)
+
+        # 11 слотов по 1/20 с: последний не раньше чем через 0,5 с
+        self.assertGreaterEqual(loop.time() - started, 0.45)
+
+    async def test_one_message_per_chat_interval(self):
+        limiter = RateLimiter(rate=1000, per_chat_interval=0.3)
+        loop = asyncio.get_running_loop()
+
+        await limiter.acquire(1)
+        started = loop.time()
+        await limiter.acquire(2)
+        self.assertLess(loop.time() - started, 0.1)
+        await limiter.acquire(1)
+        self.assertGreaterEqual(loop.time() - started, 0.25)
+
+    async def test_pause_delays_all_chats(self):
+        limiter = RateLimiter(rate=1000)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+
+        limiter.pause(0.3)
+        await limiter.acquire(1)
+
+        self.assertGreaterEqual(loop.time() - started, 0.25)
+
+
+class BroadcastEngineTests(TransactionTestCase):
+    def setUp(self):
+        now = timezone.now()
+        self.event = Event.objects.create(name='Meetup', start_at=now, end_at=now, is_active=True)
+        self.participants = [
+            Participant.objects.create(tg_id=1000 + number, first_name=f'Гость {number}') for number in range(4)
+        ]
+        Subscription.objects.bulk_create(
+            Subscription(participant=participant, event=self.event) for participant in self.participants
+        )
+
+    def engine(self) -> BroadcastEngine:
+        return BroadcastEngine(rate=1000, workers=2, chunk_size=2, poll_interval=0.05, lease_seconds=30)
+
+    async def deliver(self, api: FakeBotApi) -> tuple[BroadcastEngine, Broadcast]:
+        engine = self.engine()
+        engine._bot = Bot('123:TEST', request=api)
+        broadcast = await run_db(claim_next_broadcast, engine.owner, engine.lease)
+        await engine.deliver(broadcast)
+        return engine, await Broadcast.objects.aget(pk=broadcast.pk)
+
+    def recipients(self, api: FakeBotApi) -> list[int]:
+        return sorted(call['chat_id'] for call in api.calls_to('sendMessage'))
+
+    async def test_blocked_recipient_is_dropped(self):
+        await Broadcast.objects.acreate(event=self.event, text='Анонс')
+        api = ScriptedBotApi(blocked=(1001,))
+
+        _, broadcast = await self.deliver(api)
+
+        self.assertEqual(broadcast.status, BroadcastStatus.DONE)
+        self.assertEqual((broadcast.sent_count, broadcast.failed_count), (3, 1))
+        # в заблокировавший бота чат повторно не пишем
+        self.assertEqual(self.recipients(api), [1000, 1001, 1002, 1003])
+        self.assertEqual(broadcast.claimed_by, '')
+
+    async def test_retry_after_pauses_and_resends(self):
+        await Broadcast.objects.acreate(event=self.event, text='Анонс')
+        api = ScriptedBotApi(flood_once=(1000,))
+        started = time.monotonic()
+
+        _, broadcast = await self.deliver(api)
+
+        self.assertGreaterEqual(time.monotonic() - started, 0.9)
+        self.assertEqual((broadcast.sent_count, broadcast.failed_count), (4, 0))
+        self.assertEqual(self.recipients(api), [1000, 1000, 1001, 1002, 1003])
+
+    async def test_resumes_after_checkpoint(self):
+        await Broadcast.objects.acreate(
+            event=self.event,
+            text='Анонс',
+            status=BroadcastStatus.RUNNING,
+            last_participant_id=self.participants[1].pk,
+            sent_count=2,
+        )
+        api = FakeBotApi()
+
+        _, broadcast = await self.deliver(api)
+
+        self.assertEqual(self.recipients(api), [1002, 1003])
+        self.assertEqual(broadcast.sent_count, 4)
+
+    def test_leased_broadcast_is_not_claimed_twice(self):
+        Broadcast.objects.create(event=self.event, text='Анонс')
+        lease = timedelta(seconds=30)
+
+        self.assertIsNotNone(claim_next_broadcast('first', lease))
+        self.assertIsNone(claim_next_broadcast('second', lease))
+
+        Broadcast.objects.update(lease_until=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(claim_next_broadcast('second', lease).claimed_by, 'second')
+
+    def test_disabled_announcements_are_not_claimed(self):
+        Event.objects.filter(pk=self.event.pk).update(announcements_enabled=False)
+        Broadcast.objects.create(event=self.event, text='Анонс', status=BroadcastStatus.RUNNING)
+
+        self.assertIsNone(claim_next_broadcast('first', timedelta(seconds=30)))
+
+    async def test_engine_idles_when_broadcast_is_stopped_before_sending(self):
+        broadcast = await Broadcast.objects.acreate(event=self.event, text='Анонс')
+        engine = self.engine()
+        engine._bot = Bot('123:TEST', request=FakeBotApi())
+        claimed = await run_db(claim_next_broadcast, engine.owner, engine.lease)
+        await Event.objects.filter(pk=self.event.pk).aupdate(announcements_enabled=False)
+
+        self.assertFalse(await engine.deliver(claimed))
+        refreshed = await Broadcast.objects.aget(pk=broadcast.pk)
+        self.assertEqual((refreshed.status, refreshed.sent_count), (BroadcastStatus.RUNNING, 0))
+        # захват отпущен: после включения анонсов рассылку сможет взять любой процесс
+        self.assertIsNone(refreshed.lease_until)
+
+
+class RunDbTests(SimpleTestCase):
+    async def test_runs_in_db_pool_thread(self):
+        thread_name = await run_db(lambda: threading.current_thread().name)
+
+        self.assertTrue(thread_name.startswith('bot-db'))
+
+    async def test_pool_keeps_connections_under_asgi(self):
+        # потоки пула создаются заново и подхватывают настройки
+        await shutdown_db_executor()
+        try:
+            with mock.patch.dict(connection.settings_dict, CONN_MAX_AGE=0), override_settings(BOT_DB_CONN_MAX_AGE=300):
+                max_age = await run_db(lambda: connection.settings_dict['CONN_MAX_AGE'])
+        finally:
+            await shutdown_db_executor()
+
+        self.assertEqual(max_age, 300)
+
+
+class PersistenceTests(TransactionTestCase):
+    async def test_updates_of_one_pass_are_written_together(self):
+        persistence = DjangoPersistence(update_interval=60)
+
+        with mock.patch('meetbot.bot.persistence.save_states', wraps=save_states) as save:
+            await asyncio.gather(
+                persistence.update_user_data(1, {'step': 'question'}),
+                persistence.update_user_data(2, {'step': 'donation'}),
+                persistence.update_chat_data(1, {'lang': 'ru'}),
+                persistence.update_conversation('donate', (1, 1), 'amount'),
+                persistence.drop_user_data(3),
+            )
+
+        self.assertEqual(save.call_count, 1)
+        self.assertEqual(await BotState.objects.acount(), 4)
+        self.assertEqual(await persistence.get_conversations('donate'), {(1, 1): 'amount'})
+
+    async def test_user_data_is_loaded_lazily_once(self):
+        await BotState.objects.acreate(kind=BotStateKind.USER, key='1', data={'step': 'question'})
+        persistence = DjangoPersistence(update_interval=60)
+        self.assertEqual(await persistence.get_user_data(), {})
+
+        user_data = {}
+        await persistence.refresh_user_data(1, user_data)
+        with mock.patch('meetbot.bot.persistence.load_state', side_effect=AssertionError):
+            await persistence.refresh_user_data(1, user_data)
+
+        self.assertEqual(user_data, {'step': 'question'})
+
+    async def test_untouched_data_is_not_written(self):
+        await BotState.objects.acreate(kind=BotStateKind.USER, key='1', data={'step': 'question'})
+        persistence = DjangoPersistence(update_interval=60)
+        self.assertFalse(persistence.store_data.bot_data)
+        stored, empty = {}, {}
+        await persistence.refresh_user_data(1, stored)
+        await persistence.refresh_user_data(2, empty)
+
+        with mock.patch('meetbot.bot.persistence.save_states', wraps=save_states) as save:
+            await persistence.update_user_data(1, stored)
+            await persistence.update_user_data(2, empty)
+            self.assertEqual(save.call_count, 0)
+
+            stored['step'] = 'donation'
+            await persistence.update_user_data(1, stored)
+            await persistence.update_user_data(1, stored)
+
+        self.assertEqual(save.call_count, 1)
+        self.assertEqual(await run_db(load_state, BotStateKind.USER, '1'), {'step': 'donation'})
+
+    def test_deletes_are_grouped_by_kind(self):
+        BotState.objects.bulk_create(
+            BotState(kind=kind, key=str(key)) for kind in (BotStateKind.USER, BotStateKind.CHAT) for key in range(3)
+        )
+
+        with CaptureQueriesContext(connection) as queries:
+            save_states({}, {(BotStateKind.USER, '0'), (BotStateKind.USER, '1'), (BotStateKind.CHAT, '2')})
+
+        deletes = [query['sql'] for query in queries.captured_queries if query['sql'].startswith('DELETE')]
+        self.assertEqual(len(deletes), 2)
+        self.assertNotIn(' OR ', ' '.join(deletes))
+        self.assertEqual(BotState.objects.count(), 3)
+
+
+class ProgramTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        speaker = Participant.objects.create(tg_id=1, first_name='Гвидо', is_speaker=True)
+        cls.event = Event.objects.create(name='Python Meetup', start_at=now, end_at=now, is_active=True)
+        cls.talk = Talk.objects.create(
+            event=cls.event,
+            title='Asyncio',
+            speaker=speaker,
+            start_at=now,
+            end_at=now + timedelta(minutes=30),
+        )
+        cls.next_talk = Talk.objects.create(
+            event=cls.event,
+            title='Django',
+            start_at=now + timedelta(minutes=30),
+            end_at=now + timedelta(minutes=60),
+            order=1,
+        )
+        switch_current_talk(cls.event.pk, cls.talk.pk)
+
+    def setUp(self):
+        invalidate_caches()
+
+    def test_program_is_served_from_cache(self):
+        with self.assertNumQueries(2):
+            snapshot = program_cache.load()
+        with self.assertNumQueries(0):
+            self.assertIs(program_cache.load(), snapshot)
+
+        self.assertIn('▶️ ', snapshot.text)
+        self.assertIn('Asyncio — Гвидо', snapshot.text)
+
+    def test_current_talk_is_resolved_in_one_query(self):
+        with self.assertNumQueries(1):
+            state = current_talk_cache.load()
+        with self.assertNumQueries(0):
+            current_talk_cache.load()
+
+        self.assertEqual(state.talk.talk_id, self.talk.pk)
+        self.assertEqual(state.talk.speaker_tg_id, 1)
+
+    def test_switch_keeps_pointer_and_flag_consistent(self):
+        current_talk_cache.load()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            switch_current_talk(self.event.pk, self.next_talk.pk)
+
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.current_talk_id, self.next_talk.pk)
+        self.assertEqual(
+            list(Talk.objects.filter(is_current=True).values_list('pk', flat=True)),
+            [self.next_talk.pk],
+        )
+        self.assertEqual(current_talk_cache.load().talk.talk_id, self.next_talk.pk)
+
+    def test_switch_rejects_talk_of_another_event(self):
+        now = timezone.now()
+        other = Event.objects.create(name='Другой митап', start_at=now, end_at=now)
+        foreign = Talk.objects.create(event=other, title='Чужой', start_at=now, end_at=now)
+
+        with self.assertRaises(ValueError):
+            switch_current_talk(self.event.pk, foreign.pk)
+
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.current_talk_id, self.talk.pk)
+        self.assertTrue(Talk.objects.get(pk=self.talk.pk).is_current)
+        self.assertFalse(Talk.objects.get(pk=foreign.pk).is_current)
+
+    def test_admin_rejects_talk_of_another_event(self):
+        now = timezone.now()
+        other = Event.objects.create(name='Другой митап', start_at=now, end_at=now)
+        foreign = Talk.objects.create(event=other, title='Чужой', start_at=now, end_at=now)
+
+        form = EventAdminForm({'current_talk': foreign.pk}, instance=self.event)
+        self.assertFalse(form.is_valid())
+        self.assertIn('current_talk', form.errors)
+
+        form = EventAdminForm({'current_talk': self.next_talk.pk}, instance=self.event)
+        form.is_valid()
+        self.assertNotIn('current_talk', form.errors)
+
+    def test_talk_change_invalidates_cache(self):
+        program_cache.load()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.talk.title = 'Typing'
+            self.talk.save()
+
+        self.assertIsNone(program_cache.cached())
+        self.assertIn('Typing', program_cache.load().text)
+
+
+class ParticipantUpsertTests(TransactionTestCase):
+    def test_upsert_creates_and_updates_changed_names(self):
+        upsert_participants([TelegramProfile(1, 'guido'), TelegramProfile(2, 'barry')])
+        identities = upsert_participants([TelegramProfile(1, 'guido', 'Гвидо'), TelegramProfile(2, 'barry')])
+
+        self.assertEqual(Participant.objects.count(), 2)
+        self.assertEqual(Participant.objects.get(tg_id=1).first_name, 'Гвидо')
+        self.assertEqual(identities[1].participant_id, Participant.objects.get(tg_id=1).pk)
+
+    async def test_directory_serves_known_users_from_cache(self):
+        directory = ParticipantDirectory(capacity=10, batch_window=0)
+        user = Update.de_json(FakeTelegramSender().message(7, 'hi'), None).effective_user
+
+        first = await directory.resolve(user)
+        with mock.patch('meetbot.bot.identity.run_db', side_effect=AssertionError('DB hit')):
+            second = await directory.resolve(user)
+
+        self.assertIs(first, second)
+        self.assertTrue(await Participant.objects.filter(tg_id=7).aexists())
+
+
+class QuestionDigestTests(SimpleTestCase):
+    def test_single_question_is_sent_as_is(self):
+        digests = format_digests('Asyncio', [SavedQuestion(1, 'Что с GIL?')])
+
+        self.assertEqual(len(digests), 1)
+        self.assertEqual(digests[0][1], [1])
+
+    def test_many_questions_are_grouped_and_split_by_length(self):
+        questions = [SavedQuestion(pk, 'x' * 500) for pk in range(20)]
+
+        digests = format_digests('Asyncio', questions)
+
+        self.assertGreater(len(digests), 1)
+        self.assertTrue(all(len(text) <= 4096 for text, _ in digests))
+        self.assertEqual([pk for _, ids in digests for pk in ids], list(range(20)))
+
+
+class QuestionRedeliveryTests(TransactionTestCase):
+    def setUp(self):
+        now = timezone.now()
+        speaker = Participant.objects.create(tg_id=500, first_name='Гвидо', is_speaker=True)
+        event = Event.objects.create(name='Meetup', start_at=now, end_at=now, is_active=True)
+        self.talk = Talk.objects.create(event=event, title='Asyncio', speaker=speaker, start_at=now, end_at=now)
+        self.api = ScriptedBotApi(blocked=(500,))
+        self.intake = QuestionIntake(flush_interval=0)
+        self.intake._bot = Bot('123:TEST', request=self.api)
+
+    async def test_failed_question_is_redelivered(self):
+        self.intake.submit(QuestionDraft(talk_id=self.talk.pk, author_id=None, text='Что с GIL?'))
+        await self.intake.flush()
+
+        question = await Question.objects.aget()
+        self.assertEqual((question.status, question.delivery_attempts), (QuestionStatus.PENDING, 1))
+
+        self.api.blocked.clear()
+        await self.intake.redeliver()
+
+        await question.arefresh_from_db()
+        self.assertEqual(question.status, QuestionStatus.SENT_TO_SPEAKER)
+        self.assertIsNotNone(question.speaker_message_id)
+
+    async def test_question_waits_for_speaker_assignment(self):
+        speaker = await Participant.objects.aget(tg_id=500)
+        await Talk.objects.filter(pk=self.talk.pk).aupdate(speaker=None)
+        self.api.blocked.clear()
+        self.intake.submit(QuestionDraft(talk_id=self.talk.pk, author_id=None, text='Что с GIL?'))
+        await self.intake.flush()
+        await self.intake.redeliver()
+
+        self.assertEqual(self.api.calls_to('sendMessage'), [])
+
+        await Talk.objects.filter(pk=self.talk.pk).aupdate(speaker=speaker)
+        await self.intake.redeliver()
+
+        question = await Question.objects.aget()
+        self.assertEqual(question.status, QuestionStatus.SENT_TO_SPEAKER)
+        self.assertEqual(self.api.calls_to('sendMessage')[0]['chat_id'], 500)
+
+    @override_settings(QUESTION_MAX_DELIVERY_ATTEMPTS=2)
+    async def test_redelivery_stops_after_max_attempts(self):
+        await Question.objects.acreate(talk=self.talk, text='Что с GIL?', delivery_attempts=1)
+
+        await self.intake.redeliver()
+        await self.intake.redeliver()
+
+        question = await Question.objects.aget()
+        self.assertEqual((question.status, question.delivery_attempts), (QuestionStatus.PENDING, 2))
+        self.assertEqual(len(self.api.calls_to('sendMessage')), 1)
+
+
+class SpeakerInboxTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        cls.speaker = Participant.objects.create(tg_id=1, first_name='Гвидо', is_speaker=True)
+        event = Event.objects.create(name='Python Meetup', start_at=now, end_at=now, is_active=True)
+        cls.talk = Talk.objects.create(
+            event=event,
+            title='Asyncio',
+            speaker=cls.speaker,
+            start_at=now,
+            end_at=now + timedelta(minutes=30),
+        )
+        # половина вопросов с одинаковым временем — курсору нужен id
+        Question.objects.bulk_create(
+            Question(talk=cls.talk, text=f'Вопрос {number}', asked_at=now - timedelta(seconds=number // 2))
+            for number in range(12)
+        )
+        rebuild_counters()
+
+    def test_cursor_round_trip(self):
+        asked_at = timezone.now()
+
+        self.assertEqual(decode_cursor(encode_cursor((asked_at, 42))), (asked_at, 42))
+        self.assertIsNone(decode_cursor(''))
+
+    def test_pages_cover_questions_without_gaps(self):
+        seen, cursor = [], None
+        while True:
+            page = inbox_page(self.talk.pk, self.speaker.pk, cursor=cursor, limit=5)
+            seen += [question.question_id for question in page.questions]
+            if page.next_cursor is None:
+                break
+            cursor = decode_cursor(page.next_cursor)
+
+        expected = Question.objects.filter(talk=self.talk).order_by('-asked_at', '-id')
+        self.assertEqual(seen, list(expected.values_list('pk', flat=True)))
+
+    def test_page_does_not_count_questions(self):
+        with self.assertNumQueries(2):
+            page = inbox_page(self.talk.pk, self.speaker.pk)
+
+        self.assertEqual(page.unread_count, 12)
+
+    def test_other_speakers_cannot_read_inbox(self):
+        stranger = Participant.objects.create(tg_id=2, is_speaker=True)
+
+        self.assertIsNone(inbox_page(self.talk.pk, stranger.pk))
+
+    def test_counters_follow_status_changes(self):
+        question_ids = list(Question.objects.values_list('pk', flat=True)[:3])
+
+        set_question_status(question_ids, QuestionStatus.ANSWERED, talk_id=self.talk.pk)
+        question = Question.objects.get(pk=question_ids[0])
+        question.status = QuestionStatus.REJECTED
+        question.save()
+        Question.objects.create(talk=self.talk, text='Ещё вопрос')
+
+        counter = TalkQuestionCounter.objects.get(talk=self.talk)
+        self.assertEqual((counter.unread_count, counter.answered_count), (10, 2))
+
+    def test_counters_follow_question_to_another_talk(self):
+        now = timezone.now()
+        other = Talk.objects.create(event=self.talk.event, title='GIL', start_at=now, end_at=now)
+        question = Question.objects.filter(talk=self.talk).first()
+
+        question.talk = other
+        question.save()
+
+        counters = dict(TalkQuestionCounter.objects.values_list('talk_id', 'unread_count'))
+        self.assertEqual(counters, {self.talk.pk: 11, other.pk: 1})
+
+
+class MatchingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        cls.event = Event.objects.create(name='Python Meetup', start_at=now, end_at=now, is_active=True)
+        profiles = {
+            'me': ('Python, Django, PostgreSQL', 'асинхронность'),
+            'twin': ('Django, PostgreSQL', 'асинхронность, высокие нагрузки'),
+            'close': ('Python, FastAPI', 'ML'),
+            'far': ('Go, Kubernetes', 'DevOps'),
+        }
+        cls.profiles = {}
+        for tg_id, (key, (stack, interests)) in enumerate(profiles.items(), start=1):
+            participant = Participant.objects.create(tg_id=tg_id, first_name=key)
+            cls.profiles[key] = NetworkingProfile.objects.create(
+                participant=participant,
+                event=cls.event,
+                stack=stack,
+                interests=interests,
+                contact=f'@{key}',
+            )
+
+    def setUp(self):
+        match_indexes.invalidate()
+
+    def suggest(self, key):
+        suggestion = suggest_match(self.event.pk, self.profiles[key].participant_id)
+        return suggestion.card.name if suggestion.card else None
+
+    def test_candidates_are_ranked_by_similarity_without_repeats(self):
+        self.assertEqual(
+            [self.suggest('me') for _ in range(4)],
+            ['twin', 'close', 'far', None],
+        )
+        self.assertEqual(NetworkingMatch.objects.filter(event=self.event).count(), 3)
+
+    def test_existing_matches_are_excluded_both_ways(self):
+        NetworkingMatch.objects.create(
+            event=self.event,
+            source_profile=self.profiles['twin'],
+            target_profile=self.profiles['me'],
+        )
+
+        self.assertEqual(self.suggest('me'), 'close')
+
+    def test_suggestion_is_served_from_index(self):
+        index = match_indexes.load(self.event.pk)
+
+        with self.assertNumQueries(0):
+            card = index.suggest(self.profiles['far'].pk)
+
+        self.assertIsNotNone(card)
+
+    def test_participant_without_profile(self):
+        stranger = Participant.objects.create(tg_id=100)
+
+        self.assertFalse(suggest_match(self.event.pk, stranger.pk).has_profile)
+
+    def test_profile_changes_update_loaded_index_in_place(self):
+        index = match_indexes.load(self.event.pk)
+        far = self.profiles['far']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            far.stack = 'Python, Django, PostgreSQL'
+            far.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            NetworkingProfile.objects.filter(pk=self.profiles['twin'].pk).update(is_active=False)
+            match_indexes.refresh_profile(self.profiles['twin'].pk)
+
+        self.assertIs(match_indexes.load(self.event.pk), index)
+        self.assertEqual([self.suggest('me') for _ in range(3)], ['far', 'close', None])
+
+    def test_new_profile_grows_index(self):
+        with mock.patch.object(MatchIndex, 'INITIAL_CAPACITY', 4):
+            index = match_indexes.load(self.event.pk)
+            participant = Participant.objects.create(tg_id=50, first_name='new')
+            with self.captureOnCommitCallbacks(execute=True):
+                NetworkingProfile.objects.create(
+                    participant=participant,
+                    event=self.event,
+                    stack='Python, Django, PostgreSQL',
+                    interests='асинхронность',
+                    contact='@new',
+                )
+
+        self.assertEqual(self.suggest('me'), 'new')
+        self.assertIs(match_indexes.load(self.event.pk), index)
+
+    def test_unchanged_profile_keeps_scores(self):
+        index = match_indexes.load(self.event.pk)
+        before = index._scores.copy()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.profiles['close'].save()
+
+        np.testing.assert_allclose(index._scores, before, atol=1e-6)
+
+
+
+@override_settings(TALK_REMINDER_LEAD_MINUTES=5)
+class TalkTimelineTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.now = timezone.now()
+        cls.speaker = Participant.objects.create(tg_id=500, first_name='Гвидо', is_speaker=True)
+        cls.event = Event.objects.create(name='Meetup', start_at=cls.now, end_at=cls.now, is_active=True)
+        cls.first = Talk.objects.create(
+            event=cls.event,
+            title='Asyncio',
+            speaker=cls.speaker,
+            order=1,
+            start_at=cls.now + timedelta(hours=1),
+            end_at=cls.now + timedelta(hours=2),
+        )
+        cls.second = Talk.objects.create(
+            event=cls.event,
+            title='GIL',
+            order=2,
+            start_at=cls.now + timedelta(hours=2),
+            end_at=cls.now + timedelta(hours=3),
+        )
+
+    def transition(self, kind: str, talk: Talk) -> TalkTransition:
+        at = {REMINDER: talk.start_at - timedelta(minutes=5), START: talk.start_at, END: talk.end_at}[kind]
+        return TalkTransition(at, kind, talk.pk, self.event.pk)
+
+    def test_scheduled_talk_has_reminder_start_and_end(self):
+        transitions = talk_transitions(1, 1, self.first.start_at, self.first.end_at, TalkStatus.SCHEDULED, self.now)
+
+        self.assertEqual([t.kind for t in transitions], [REMINDER, START, END])
+        self.assertEqual(transitions[0].at, self.first.start_at - timedelta(minutes=5))
+
+    def test_missed_transitions_are_caught_up_without_late_reminders(self):
+        started = talk_transitions(
+            1, 1, self.now - timedelta(minutes=1), self.now + timedelta(hours=1), TalkStatus.SCHEDULED, self.now
+        )
+        finished = talk_transitions(
+            1, 1, self.now - timedelta(hours=2), self.now - timedelta(hours=1), TalkStatus.SCHEDULED, self.now
+        )
+
+        self.assertEqual([t.kind for t in started], [START, END])
+        self.assertEqual([t.kind for t in finished], [END])
+
+    def test_timeline_is_loaded_in_one_query(self):
+        Talk.objects.create(
+            event=self.event, title='Отменён', status=TalkStatus.CANCELLED, start_at=self.now, end_at=self.now
+        )
+
+        with self.assertNumQueries(1):
+            transitions = load_timeline(self.now)
+
+        self.assertEqual(len(transitions), 6)
+        self.assertEqual({t.talk_id for t in transitions}, {self.first.pk, self.second.pk})
+
+    def test_start_advances_current_talk(self):
+        self.assertTrue(apply_transition(self.transition(START, self.first)))
+        self.assertFalse(apply_transition(self.transition(START, self.first)))
+
+        self.event.refresh_from_db()
+        self.first.refresh_from_db()
+        self.assertEqual(self.event.current_talk_id, self.first.pk)
+        self.assertEqual(self.first.status, TalkStatus.IN_PROGRESS)
+
+    def test_end_of_last_talk_clears_current(self):
+        apply_transition(self.transition(START, self.first))
+        apply_transition(self.transition(END, self.first))
+        self.event.refresh_from_db()
+        # до следующего доклада вопросы идут последнему докладчику
+        self.assertEqual(self.event.current_talk_id, self.first.pk)
+
+        apply_transition(self.transition(START, self.second))
+        apply_transition(self.transition(END, self.second))
+        self.event.refresh_from_db()
+        self.assertIsNone(self.event.current_talk_id)
+        self.assertEqual(Talk.objects.filter(status=TalkStatus.DONE).count(), 2)
+
+    def test_reminder_is_broadcast_to_event_subscribers(self):
+        self.assertTrue(apply_transition(self.transition(REMINDER, self.first)))
+
+        broadcast = Broadcast.objects.get()
+        self.assertEqual(broadcast.event, self.event)
+        self.assertIn('«Asyncio»', broadcast.text)
+        self.assertIn('Гвидо', broadcast.text)
+
+    def test_reminder_for_moved_talk_is_skipped(self):
+        stale = self.transition(REMINDER, self.first)
+        Talk.objects.filter(pk=self.first.pk).update(start_at=self.first.start_at + timedelta(minutes=30))
+
+        self.assertFalse(apply_transition(stale))
+        self.assertFalse(Broadcast.objects.exists())
+
+
+@asynccontextmanager
+async def talk_scheduler():
+    application = build_application('123:TEST', request=FakeBotApi())
+    await application.initialize()
+    await application.job_queue.start()
+    scheduler = TalkScheduler()
+    await scheduler.start(application)
+    try:
+        yield scheduler, application.job_queue
+    finally:
+        await application.job_queue.stop()
+        await scheduler.stop(application)
+        await application.shutdown()
+
+
+class TalkSchedulerTests(TransactionTestCase):
+    async def create_talk(self, event: Event, title: str, starts_in: timedelta) -> Talk:
+        now = timezone.now()
+        return await Talk.objects.acreate(
+            event=event, title=title, start_at=now + starts_in, end_at=now + starts_in + timedelta(hours=1)
+        )
+
+    async def test_talk_is_started_on_time(self):
+        now = timezone.now()
+        event = await Event.objects.acreate(name='Meetup', start_at=now, end_at=now, is_active=True)
+        talk = await self.create_talk(event, 'Asyncio', timedelta(milliseconds=200))
+
+        async with talk_scheduler() as (scheduler, job_queue):
+            self.assertEqual(scheduler.next_transition.kind, START)
+            self.assertEqual(len(job_queue.jobs()), 1)
+            # задача на конец доклада ставится после того, как начало применено
+            for _ in range(100):
+                jobs = job_queue.jobs()
+                if jobs and jobs[0].next_t == talk.end_at:
+                    break
+                await asyncio.sleep(0.02)
+
+            await talk.arefresh_from_db()
+            await event.arefresh_from_db()
+            self.assertEqual(talk.status, TalkStatus.IN_PROGRESS)
+            self.assertEqual(event.current_talk_id, talk.pk)
+            self.assertEqual(scheduler.next_transition.kind, END)
+            self.assertEqual(len(job_queue.jobs()), 1)
+
+    async def test_failed_transition_is_retried(self):
+        now = timezone.now()
+        event = await Event.objects.acreate(name='Meetup', start_at=now, end_at=now, is_active=True)
+        talk = await self.create_talk(event, 'Asyncio', timedelta(milliseconds=100))
+        calls = []
+
+        def flaky_apply(transition):
+            calls.append(transition)
+            if len(calls) == 1:
+                raise DatabaseError('connection lost')
+            return apply_transition(transition)
+
+        with mock.patch('meetbot.bot.timeline.apply_transition', flaky_apply), mock.patch(
+            'meetbot.bot.timeline.RETRY_DELAY', timedelta(milliseconds=100)
+        ):
+            async with talk_scheduler() as (scheduler, job_queue):
+                # после повтора задача переезжает на конец доклада
+                for _ in range(100):
+                    jobs = job_queue.jobs()
+                    if jobs and jobs[0].next_t == talk.end_at:
+                        break
+                    await asyncio.sleep(0.02)
+
+        await talk.arefresh_from_db()
+        self.assertEqual(talk.status, TalkStatus.IN_PROGRESS)
+        self.assertEqual(calls, [calls[0], calls[0]])
+        self.assertEqual(calls[0].kind, START)
+
+    async def test_moved_talk_is_rescheduled_alone(self):
+        now = timezone.now()
+        event = await Event.objects.acreate(name='Meetup', start_at=now, end_at=now, is_active=True)
+        first = await self.create_talk(event, 'Asyncio', timedelta(hours=1))
+        second = await self.create_talk(event, 'GIL', timedelta(hours=2))
+
+        async with talk_scheduler() as (scheduler, job_queue):
+            self.assertEqual(scheduler.next_transition.talk_id, first.pk)
+            await Talk.objects.filter(pk=first.pk).aupdate(
+                start_at=now + timedelta(hours=3), end_at=now + timedelta(hours=4)
+            )
+            await scheduler.refresh(first.pk)
+
+            self.assertEqual(scheduler.next_transition.talk_id, second.pk)
+            self.assertEqual(scheduler.next_transition.kind, REMINDER)
+            self.assertEqual(len(job_queue.jobs()), 1)
+
+
+class OutboxTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        cls.event = Event.objects.create(name='Meetup', start_at=now, end_at=now, is_active=True)
+        cls.talk = Talk.objects.create(event=cls.event, title='Asyncio', start_at=now, end_at=now)
+
+    def setUp(self):
+        OutboxMessage.objects.all().delete()
+
+    def topics(self) -> list[tuple[str, int]]:
+        return list(OutboxMessage.objects.values_list('topic', 'object_id'))
+
+    def test_message_is_written_in_the_same_transaction(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            self.talk.title = 'Asyncio в проде'
+            self.talk.save()
+            raise RuntimeError
+
+        self.assertEqual(self.topics(), [])
+        self.talk.save()
+        self.assertEqual(self.topics(), [(OutboxTopic.TALK_CHANGED, self.talk.pk)])
+
+    def test_event_publication_is_announced_once(self):
+        self.event.is_published = True
+        self.event.save()
+        self.event.save()
+
+        published = OutboxMessage.objects.filter(topic=OutboxTopic.EVENT_PUBLISHED)
+        self.assertEqual(list(published.values_list('object_id', flat=True)), [self.event.pk])
+
+    def test_answer_from_bot_is_published(self):
+        question = Question.objects.create(talk=self.talk, text='Что с GIL?')
+        OutboxMessage.objects.all().delete()
+
+        set_question_status([question.pk], QuestionStatus.ANSWERED, answered_at=timezone.now())
+
+        self.assertEqual(self.topics(), [(OutboxTopic.QUESTION_ANSWERED, question.pk)])
+
+    def test_announcement_respects_event_settings(self):
+        Event.objects.filter(pk=self.event.pk).update(is_published=True)
+        quiet = Event.objects.create(
+            name='Closed', start_at=self.event.start_at, end_at=self.event.end_at, is_published=True,
+            announcements_enabled=False,
+        )
+
+        self.assertEqual(announce_events([self.event.pk, quiet.pk]), 1)
+        broadcast = Broadcast.objects.get()
+        self.assertEqual(broadcast.subscription_type, SubscriptionType.FUTURE)
+        self.assertIn('Meetup', broadcast.text)
+
+
+class OutboxConsumerTests(TransactionTestCase):
+    def setUp(self):
+        self.calls: list[tuple[str, list[int]]] = []
+        self.consumer = OutboxConsumer(PgListener(), batch_size=2)
+        for topic in (OutboxTopic.TALK_CHANGED, OutboxTopic.EVENT_CHANGED):
+            self.consumer.register(topic, self.recorder(topic))
+
+    def recorder(self, topic: str):
+        async def handler(application, object_ids: list[int]) -> None:
+            self.calls.append((topic, object_ids))
+
+        return handler
+
+    async def test_batches_are_deduplicated_and_acknowledged(self):
+        await run_db(publish, OutboxTopic.TALK_CHANGED, [1, 1, 2])
+        await run_db(publish, OutboxTopic.EVENT_CHANGED, [5])
+
+        self.assertTrue(await self.consumer.drain())
+
+        self.assertEqual(
+            self.calls,
+            [(OutboxTopic.TALK_CHANGED, [1]), (OutboxTopic.TALK_CHANGED, [2]), (OutboxTopic.EVENT_CHANGED, [5])],
+        )
+        self.assertFalse(await OutboxMessage.objects.aexists())
+
+    async def test_handled_messages_are_not_repeated_after_failed_ack(self):
+        await run_db(publish, OutboxTopic.TALK_CHANGED, [1])
+
+        with mock.patch('meetbot.bot.outbox.acknowledge', side_effect=RuntimeError('db is down')):
+            with self.assertRaises(RuntimeError):
+                await self.consumer.drain()
+        self.assertTrue(await self.consumer.drain())
+
+        self.assertEqual(self.calls, [(OutboxTopic.TALK_CHANGED, [1])])
+        self.assertFalse(await OutboxMessage.objects.aexists())
+
+    async def test_failed_topic_stays_in_outbox(self):
+        async def broken(application, object_ids: list[int]) -> None:
+            raise RuntimeError('telegram is down')
+
+        self.consumer.register(OutboxTopic.EVENT_CHANGED, broken)
+        await run_db(publish, OutboxTopic.EVENT_CHANGED, [5])
+        await run_db(publish, OutboxTopic.TALK_CHANGED, [1])
+
+        self.assertFalse(await self.consumer.drain())
+
+        self.assertEqual(self.calls, [(OutboxTopic.TALK_CHANGED, [1])])
+        remaining = [message.topic async for message in OutboxMessage.objects.all()]
+        self.assertEqual(remaining, [OutboxTopic.EVENT_CHANGED])
+
+    async def test_failing_message_is_shelved_after_max_attempts(self):
+        attempts = []
+
+        async def broken(application, object_ids: list[int]) -> None:
+            attempts.append(object_ids)
+            raise RuntimeError('telegram is down')
+
+        self.consumer.max_attempts = 2
+        self.consumer.register(OutboxTopic.EVENT_CHANGED, broken)
+        await run_db(publish, OutboxTopic.EVENT_CHANGED, [5])
+
+        self.assertFalse(await self.consumer.drain())
+        self.assertFalse(await self.consumer.drain())
+        self.assertTrue(await self.consumer.drain())
+
+        self.assertEqual(attempts, [[5], [5]])
+        message = await OutboxMessage.objects.aget()
+        self.assertEqual(message.attempts, 2)
+        self.assertIsNotNone(message.failed_at)
+
+        await run_db(retry_failed, [message.pk])
+        self.assertFalse(await self.consumer.drain())
+        self.assertEqual(len(attempts), 3)
+
+
+@override_settings(TELEGRAM_WEBHOOK_SECRET='secret', TELEGRAM_WEBHOOK_URL='')
+class StartupTests(TransactionTestCase):
+    sender = FakeTelegramSender(secret_token='secret')
+
+    def test_lean_entry_point_skips_admin_and_numpy(self):
+        code = (
+            'import sys; from meetbot.bot.__main__ import setup; setup(); import meetbot.bot.runner; '
+            'print(sorted(name for name in ("django.contrib.admin", "numpy") if name in sys.modules))'
+        )
+        output = subprocess.run(
+            [sys.executable, '-c', code], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True
+        ).stdout
+
+        self.assertEqual(output.strip(), '[]')
+
+    async def test_updates_are_handled_before_warmup_finishes(self):
+        warmed_up = asyncio.Event()
+
+        async def slow_warmup(application):
+            await warmed_up.wait()
+
+        with mock.patch('meetbot.bot.runner.warm_program_caches', slow_warmup):
+            api = FakeBotApi()
+            await start_webhook_application(build_application('123:TEST', request=api))
+            try:
+                await self.sender.send(self.async_client, WEBHOOK_PATH, self.sender.message(42, '/start'))
+                await wait_for_calls(api, 'sendMessage')
+                self.assertFalse(warmed_up.is_set())
+            finally:
+                # прогрев, не успевший закончиться, отменяется при остановке
+                await stop_webhook_application()
+
+    def test_first_update_from_separate_process(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest('процесс бота не видит тестовую базу SQLite в памяти')
+
+        polling, first_reply = measure_startup('lean', os.environ | {'POSTGRES_DB': connection.settings_dict['NAME']})
+
+        self.assertLess(0, polling)
+        self.assertLessEqual(polling, first_reply)
+
+
+class StaticFilesTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.static_root = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(cls.static_root.cleanup)
+        overridden = override_settings(STATIC_ROOT=cls.static_root.name, STATICFILES_DIRS=[])
+        overridden.enable()
+        cls.addClassCleanup(overridden.disable)
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+    def hashed_url(self, name: str) -> str:
+        return staticfiles_storage.url(name)
+
+    def test_collectstatic_writes_hashed_compressed_files(self):
+        url = self.hashed_url('admin/css/base.css')
+        path = Path(self.static_root.name) / url.removeprefix(settings.STATIC_URL)
+
+        self.assertRegex(path.name, r'^base\.[0-9a-f]{12}\.css$')
+        self.assertTrue(path.with_name(path.name + '.gz').exists())
+        self.assertTrue(path.with_name(path.name + '.br').exists())
+
+    def test_hashed_file_is_cached_forever_and_revalidated(self):
+        url = self.hashed_url('admin/css/base.css')
+
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn('max-age=315360000', response['Cache-Control'])
+
+        cached = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, 304)
+
+    async def test_asgi_streams_compressed_file(self):
+        url = self.hashed_url('admin/css/base.css')
+        path = Path(self.static_root.name) / url.removeprefix(settings.STATIC_URL)
+
+        response = await self.async_client.get(url, headers={'Accept-Encoding': 'br'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertIn('immutable', response['Cache-Control'])
+        content = b''.join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(content, path.with_name(path.name + '.br').read_bytes())
+
+
+class WebServerTests(TestCase):
+    def test_worker_count(self):
+        self.assertEqual(worker_count(WSGI, 4), 9)
+        self.assertEqual(worker_count(ASGI, 4), 4)
+        # второй воркер запустил бы второй набор рассылок, планировщика и outbox
+        self.assertEqual(worker_count(ASGI, 4, webhook=True), 1)
+
+    def gunicorn_config(self, **environment) -> dict:
+        clean = {
+            name: value
+            for name, value in os.environ.items()
+            if name not in ('TELEGRAM_BOT_MODE', 'WEB_SERVER_MODE', 'WEB_CONCURRENCY', 'DB_CONN_MAX_AGE')
+        }
+        with mock.patch.dict('os.environ', clean | environment, clear=True):
+            config = runpy.run_path(str(Path(settings.BASE_DIR) / 'gunicorn.conf.py'))
+            # окружение, с которым воркеры загрузят настройки Django
+            config['environ'] = dict(os.environ)
+            return config
+
+    def test_gunicorn_config(self):
+        config = self.gunicorn_config(TELEGRAM_BOT_MODE='webhook')
+        self.assertEqual(config['wsgi_app'], 'meetuptg_bot.asgi:application')
+        self.assertEqual(config['worker_class'], 'uvicorn.workers.UvicornWorker')
+        self.assertEqual(config['workers'], 1)
+
+        config = self.gunicorn_config(WEB_SERVER_MODE='wsgi', WEB_CONCURRENCY='5')
+        self.assertEqual(config['wsgi_app'], 'meetuptg_bot.wsgi:application')
+        self.assertEqual(config['workers'], 5)
+
+    def test_dead_worker_is_removed_from_multiprocess_metrics(self):
+        child_exit = self.gunicorn_config()['child_exit']
+
+        with mock.patch('prometheus_client.multiprocess.mark_process_dead') as mark_dead:
+            with mock.patch.dict('os.environ', PROMETHEUS_MULTIPROC_DIR='/tmp/prometheus'):
+                child_exit(None, mock.Mock(pid=4242))
+            with mock.patch.dict('os.environ', clear=True):
+                child_exit(None, mock.Mock(pid=4243))
+
+        mark_dead.assert_called_once_with(4242)
+
+    def test_webhook_mode_rejects_extra_workers(self):
+        with self.assertRaisesMessage(RuntimeError, 'WEB_CONCURRENCY=2'):
+            self.gunicorn_config(TELEGRAM_BOT_MODE='webhook', WEB_CONCURRENCY='2')
+
+        self.assertEqual(self.gunicorn_config(TELEGRAM_BOT_MODE='webhook', WEB_CONCURRENCY='1')['workers'], 1)
+
+    def test_only_asgi_workers_drop_persistent_connections(self):
+        config = self.gunicorn_config(WEB_SERVER_MODE='asgi')
+        self.assertEqual(config['environ']['DB_CONN_MAX_AGE'], '0')
+
+        config = self.gunicorn_config(WEB_SERVER_MODE='wsgi')
+        self.assertNotIn('DB_CONN_MAX_AGE', config['environ'])
+
+    async def test_health(self):
+        response = await self.async_client.get('/health/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'status': 'ok'})
+
+    async def test_health_reports_database_outage(self):
+        with mock.patch('meetbot.views._ping_database', side_effect=DatabaseError('down')):
+            response = await self.async_client.get('/health/')
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json(), {'status': 'database unavailable'})
+
+    def test_run_load_counts_failed_responses(self):
+        transport = httpx.MockTransport(lambda request: httpx.Response(500 if request.url.path == '/bad/' else 200))
+
+        duration, latencies, errors = asyncio.run(
+            run_load('http://testserver', ['/health/', '/bad/'], requests=10, concurrency=3, transport=transport)
+        )
+
+        self.assertEqual(len(latencies), 10)
+        self.assertEqual(errors, 5)
+        self.assertGreater(duration, 0)
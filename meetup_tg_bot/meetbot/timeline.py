@@ -0,0 +1,143 @@
+"""Расписание докладов: переходы, которые бот выполняет сам.
+
+У каждого запланированного доклада активного мероприятия три перехода:
+напоминание подписчикам за `TALK_REMINDER_LEAD_MINUTES` до начала, начало
+(статус «в процессе» и текущий доклад) и конец (статус «завершено»).
+Процесс бота держит их в куче и просыпается только к ближайшему
+(`meetbot.bot.timeline`). Правки докладов и мероприятий из админки
+приходят через outbox (`meetbot.outbox`): правка доклада пересчитывает
+только его, правка мероприятия — всё расписание.
+
+Переходы меняют строки через `update()`, без сигналов, поэтому сами себя
+не перепланируют, и применяются условно: доклад, который организатор уже
+запустил или отменил вручную, не трогается.
+"""
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import Broadcast, Event, SubscriptionType, Talk, TalkStatus
+from .program import switch_current_talk
+
+REMINDER = 'reminder'
+START = 'start'
+END = 'end'
+
+OPEN_TALK_STATUSES = (TalkStatus.SCHEDULED, TalkStatus.IN_PROGRESS)
+
+
+@dataclass(frozen=True)
+class TalkTransition:
+    at: datetime
+    kind: str
+    talk_id: int
+    event_id: int
+
+
+def reminder_lead() -> timedelta:
+    return timedelta(minutes=settings.TALK_REMINDER_LEAD_MINUTES)
+
+
+def talk_transitions(
+    talk_id: int,
+    event_id: int,
+    start_at: datetime,
+    end_at: datetime,
+    status: str,
+    now: datetime,
+) -> list[TalkTransition]:
+    """Оставшиеся переходы доклада.
+
+    Пропущенное, пока бот не работал, догоняется: начало и конец в прошлом
+    выполнятся сразу. Просроченные напоминания не отправляются, а начало
+    уже закончившегося доклада пропускается.
+    """
+    transitions = []
+    if status == TalkStatus.SCHEDULED and end_at > now:
+        reminder_at = start_at - reminder_lead()
+        if reminder_at > now:
+            transitions.append(TalkTransition(reminder_at, REMINDER, talk_id, event_id))
+        transitions.append(TalkTransition(start_at, START, talk_id, event_id))
+    if status in OPEN_TALK_STATUSES:
+        transitions.append(TalkTransition(end_at, END, talk_id, event_id))
+    return transitions
+
+
+def _timeline(talks, now: datetime) -> list[TalkTransition]:
+    rows = talks.filter(event__is_active=True, status__in=OPEN_TALK_STATUSES).values_list(
+        'pk', 'event_id', 'start_at', 'end_at', 'status'
+    )
+    return [transition for row in rows for transition in talk_transitions(*row, now)]
+
+
+def load_timeline(now: datetime) -> list[TalkTransition]:
+    """Переходы всех незавершённых докладов активных мероприятий одним запросом."""
+    return _timeline(Talk.objects.all(), now)
+
+
+def talk_timeline(talk_id: int, now: datetime) -> list[TalkTransition]:
+    """Переходы одного доклада; пусто, если его удалили, отменили или мероприятие неактивно."""
+    return _timeline(Talk.objects.filter(pk=talk_id), now)
+
+
+def reminder_text(title: str, speaker: str, room: str) -> str:
+    minutes = settings.TALK_REMINDER_LEAD_MINUTES
+    text = f'⏰ Через {minutes} мин. начинается доклад «{title}»'
+    if speaker:
+        text += f' — {speaker}'
+    if room:
+        text += f' ({room})'
+    return text
+
+
+def _start_talk(transition: TalkTransition) -> bool:
+    with transaction.atomic():
+        started = Talk.objects.filter(
+            pk=transition.talk_id, event_id=transition.event_id, status=TalkStatus.SCHEDULED
+        ).update(status=TalkStatus.IN_PROGRESS)
+        if started:
+            switch_current_talk(transition.event_id, transition.talk_id)
+    return bool(started)
+
+
+def _end_talk(transition: TalkTransition) -> bool:
+    with transaction.atomic():
+        ended = Talk.objects.filter(pk=transition.talk_id, status__in=OPEN_TALK_STATUSES).update(
+            status=TalkStatus.DONE
+        )
+        if not ended:
+            return False
+        # в перерыве вопросы идут последнему докладчику; после последнего доклада — никому
+        is_current = Event.objects.filter(pk=transition.event_id, current_talk_id=transition.talk_id).exists()
+        has_next = Talk.objects.filter(event_id=transition.event_id, status=TalkStatus.SCHEDULED).exists()
+        if is_current and not has_next:
+            switch_current_talk(transition.event_id, None)
+    return True
+
+
+def _send_reminder(transition: TalkTransition) -> bool:
+    talk = (
+        Talk.objects.filter(pk=transition.talk_id, status=TalkStatus.SCHEDULED)
+        .select_related('speaker')
+        .first()
+    )
+    # доклад перенесли, а NOTIFY ещё не дошёл: напоминание придёт по новому расписанию
+    if talk is None or talk.start_at - reminder_lead() != transition.at:
+        return False
+    Broadcast.objects.create(
+        event_id=transition.event_id,
+        subscription_type=SubscriptionType.EVENT,
+        text=reminder_text(talk.title, str(talk.speaker) if talk.speaker else '', talk.room),
+    )
+    return True
+
+
+_APPLY = {REMINDER: _send_reminder, START: _start_talk, END: _end_talk}
+
+
+def apply_transition(transition: TalkTransition) -> bool:
+    """Выполняет переход; False, если доклад уже в другом состоянии."""
+    return _APPLY[transition.kind](transition)
+
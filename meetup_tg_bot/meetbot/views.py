@@ -1,5 +1,119 @@
-from django.http import HttpResponse
+import hmac
+import json
+import logging
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DatabaseError, connection
+from django.http import (
+    HttpResponse,
+    HttpResponseBadRequest,
+    HttpResponseForbidden,
+    HttpResponseNotAllowed,
+    JsonResponse,
+)
+from telegram import Update
+
+from .bot.webhook import get_application
+from .donations import apply_payment_statuses
+from .metrics import render_metrics
+from .yookassa import YooKassaError, yookassa_client
+
+logger = logging.getLogger(__name__)
 
 
 def index(request):
-    return HttpResponse("Hello, world. You're at the meetbot index.")
\ No newline at end of file
+    return HttpResponse("Hello, world. You're at the meetbot index.")
+
+
+async def metrics(request):
+    """Метрики Prometheus; при заданном `METRICS_TOKEN` — только с `Authorization: Bearer`."""
+    expected = settings.METRICS_TOKEN
+    if expected:
+        token = request.headers.get('Authorization', '').removeprefix('Bearer ')
+        if not hmac.compare_digest(token, expected):
+            return HttpResponseForbidden()
+    # с PROMETHEUS_MULTIPROC_DIR читаются файлы всех воркеров — не в event loop
+    body, content_type = await sync_to_async(render_metrics, thread_sensitive=False)()
+    return HttpResponse(body, content_type=content_type)
+
+
+def _ping_database() -> None:
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1')
+
+
+async def health(request):
+    """Проверка живости для docker и балансировщика: 200, если доступна БД."""
+    try:
+        await sync_to_async(_ping_database)()
+    except DatabaseError:
+        logger.exception('Health check: database is unavailable')
+        return JsonResponse({'status': 'database unavailable'}, status=503)
+    status = {'status': 'ok'}
+    if settings.TELEGRAM_BOT_MODE == 'webhook':
+        status['bot'] = 'running' if get_application() is not None else 'stopped'
+    return JsonResponse(status)
+
+
+async def telegram_webhook(request):
+    # декораторы csrf_exempt/require_POST в Django 4.2 делают view синхронной
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
+
+    secret = request.headers.get('X-Telegram-Bot-Api-Secret-Token', '')
+    expected = settings.TELEGRAM_WEBHOOK_SECRET
+    if not expected or not hmac.compare_digest(secret, expected):
+        return HttpResponseForbidden()
+
+    application = get_application()
+    if application is None:
+        return HttpResponse('Bot is not running', status=503)
+
+    try:
+        payload = json.loads(request.body)
+    except ValueError:
+        return HttpResponseBadRequest('Invalid JSON')
+
+    if not isinstance(payload, dict):
+        return HttpResponseBadRequest('Update must be an object')
+    try:
+        update = Update.de_json(payload, application.bot)
+    except (AttributeError, KeyError, TypeError, ValueError):
+        # вложенные объекты не той формы или нет обязательных полей, например update_id
+        return HttpResponseBadRequest('Invalid update')
+    if update is None:
+        return HttpResponseBadRequest('Empty update')
+    await application.update_queue.put(update)
+    return HttpResponse()
+
+
+telegram_webhook.csrf_exempt = True
+
+
+async def yookassa_webhook(request):
+    """Уведомление YooKassa о смене статуса платежа.
+
+    Телу уведомления не доверяем: статус перечитывается из API по id платежа.
+    Код не 2xx заставляет YooKassa повторить уведомление позже.
+    """
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
+
+    try:
+        payment_id = json.loads(request.body)['object']['id']
+    except (ValueError, KeyError, TypeError):
+        return HttpResponseBadRequest('Invalid notification')
+
+    try:
+        payment = await yookassa_client.get_payment(payment_id)
+    except YooKassaError:
+        logger.exception('Cannot fetch payment %s', payment_id)
+        return HttpResponse('Payment provider is unavailable', status=502)
+
+    await sync_to_async(apply_payment_statuses)([payment])
+    return HttpResponse()
+
+
+yookassa_webhook.csrf_exempt = True
+
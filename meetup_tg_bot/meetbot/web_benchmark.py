@@ -0,0 +1,139 @@
+"""Сравнение профилей веб-сервиса (WSGI и ASGI) под конкурентной нагрузкой.
+
+Для каждого режима поднимается настоящий gunicorn с `gunicorn.conf.py` на
+свободном порту, после ответа `/health/` на него подаётся `requests`
+GET-запросов по кругу из `paths`, не больше `concurrency` одновременно.
+Задержка — полное время запроса на клиенте, включая ожидание свободного
+воркера.
+"""
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from itertools import cycle, islice
+from typing import Any, Iterator, Optional
+
+import httpx
+from django.conf import settings
+
+from .bot.benchmark import percentile
+
+STARTUP_TIMEOUT = 30.0
+
+
+@dataclass
+class LoadResult:
+    mode: str
+    workers: int
+    requests: int
+    duration: float
+    errors: int
+    latencies: list[float] = field(default_factory=list)
+
+    @property
+    def throughput(self) -> float:
+        return self.requests / self.duration if self.duration else 0.0
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            'mode': self.mode,
+            'workers': self.workers,
+            'requests': self.requests,
+            'duration_s': round(self.duration, 3),
+            'throughput_per_s': round(self.throughput, 1),
+            'latency_ms': {
+                f'p{percent}': round(percentile(self.latencies, percent) * 1000, 2) for percent in (50, 95, 99)
+            } | {'max': round(max(self.latencies, default=0) * 1000, 2)},
+            'errors': self.errors,
+        }
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _wait_until_healthy(base_url: str, process: subprocess.Popen) -> None:
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'gunicorn завершился с кодом {process.returncode}')
+        try:
+            if httpx.get(f'{base_url}/health/', timeout=1).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError(f'gunicorn не ответил на /health/ за {STARTUP_TIMEOUT:.0f} с')
+
+
+@contextmanager
+def running_server(mode: str, workers: int) -> Iterator[str]:
+    """Запускает gunicorn в заданном режиме и отдаёт его адрес."""
+    port = free_port()
+    environment = os.environ | {
+        'WEB_SERVER_MODE': mode,
+        'WEB_BIND': f'127.0.0.1:{port}',
+        'WEB_CONCURRENCY': str(workers),
+        # бот не поднимается внутри веб-процесса: меряем только HTTP
+        'TELEGRAM_BOT_MODE': 'polling',
+    }
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--log-level', 'warning'],
+        cwd=settings.BASE_DIR,
+        env=environment,
+    )
+    base_url = f'http://127.0.0.1:{port}'
+    try:
+        _wait_until_healthy(base_url, process)
+        yield base_url
+    finally:
+        process.terminate()
+        process.wait(timeout=STARTUP_TIMEOUT)
+
+
+async def run_load(
+    base_url: str,
+    paths: list[str],
+    requests: int,
+    concurrency: int,
+    transport: Optional[httpx.AsyncBaseTransport] = None,
+) -> tuple[float, list[float], int]:
+    """Подаёт нагрузку; возвращает длительность, задержки и число ответов не 2xx/3xx."""
+    latencies: list[float] = []
+    errors = 0
+    slots = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, transport=transport, timeout=30) as client:
+
+        async def fetch(path: str) -> None:
+            nonlocal errors
+            async with slots:
+                started = time.perf_counter()
+                try:
+                    response = await client.get(path)
+                    failed = response.status_code >= 400
+                except httpx.TransportError:
+                    failed = True
+                latencies.append(time.perf_counter() - started)
+                errors += failed
+
+        started = time.perf_counter()
+        await asyncio.gather(*(fetch(path) for path in islice(cycle(paths), requests)))
+        return time.perf_counter() - started, latencies, errors
+
+
+def benchmark_mode(mode: str, workers: int, paths: list[str], requests: int, concurrency: int) -> LoadResult:
+    with running_server(mode, workers) as base_url:
+        # прогрев: соединения с БД, импорт модулей в воркерах
+        asyncio.run(run_load(base_url, paths, min(requests, concurrency * 2), concurrency))
+        duration, latencies, errors = asyncio.run(run_load(base_url, paths, requests, concurrency))
+    return LoadResult(
+        mode=mode, workers=workers, requests=requests, duration=duration, errors=errors, latencies=latencies
+    )
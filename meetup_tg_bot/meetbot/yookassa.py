@@ -0,0 +1,167 @@
+"""Асинхронный клиент API YooKassa.
+
+Бот и сверка донатов открывают один `httpx.AsyncClient` с пулом соединений
+и таймаутами (`open`), отдельный от пула Telegram, и ходят через него до
+`aclose`. Вызов из цикла событий, где клиент не открыт (вебхук YooKassa под
+WSGI, где `async_to_sync` создаёт цикл на каждый запрос), получает свой
+клиент на время вызова и закрывает его. Создание платежа повторяется при
+сетевых ошибках и ответах 5xx/429 с тем же `Idempotence-Key`, поэтому
+повтор не создаёт второй платёж.
+"""
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import Any, Optional
+
+import httpx
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class YooKassaError(Exception):
+    """YooKassa отклонила запрос или не ответила после всех повторов."""
+
+
+@dataclass(frozen=True)
+class Payment:
+    id: str
+    status: str
+    amount: Decimal
+    currency: str
+    confirmation_url: str = ''
+    metadata: dict = field(default_factory=dict)
+
+    @classmethod
+    def from_json(cls, data: dict) -> 'Payment':
+        return cls(
+            id=data['id'],
+            status=data['status'],
+            amount=Decimal(data['amount']['value']),
+            currency=data['amount']['currency'],
+            confirmation_url=(data.get('confirmation') or {}).get('confirmation_url', ''),
+            metadata=data.get('metadata') or {},
+        )
+
+
+class YooKassaClient:
+    """Клиент API; общий пул соединений — только в цикле, где вызван `open`.
+
+    `httpx.AsyncClient` привязан к циклу событий, в котором создан, и закрыть
+    его из другого цикла нельзя, поэтому клиенты для чужих циклов не кешируются.
+    """
+
+    def __init__(
+        self,
+        shop_id: Optional[str] = None,
+        secret_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        retries: Optional[int] = None,
+        retry_delay: float = 0.5,
+    ):
+        self.shop_id = shop_id or settings.YOOKASSA_SHOP_ID
+        self.secret_key = secret_key or settings.YOOKASSA_SECRET_KEY
+        self.base_url = base_url or settings.YOOKASSA_API_URL
+        self.retries = settings.YOOKASSA_RETRIES if retries is None else retries
+        self.retry_delay = retry_delay
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _new_client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            base_url=self.base_url,
+            auth=(self.shop_id, self.secret_key),
+            timeout=httpx.Timeout(settings.YOOKASSA_TIMEOUT, connect=settings.YOOKASSA_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=settings.YOOKASSA_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.YOOKASSA_MAX_CONNECTIONS,
+            ),
+            transport=self._transport,
+        )
+
+    def _shared_client(self) -> Optional[httpx.AsyncClient]:
+        if self._client is None or self._client.is_closed or self._loop is not asyncio.get_running_loop():
+            return None
+        return self._client
+
+    async def open(self, application: Any = None) -> None:
+        """Открывает общий пул соединений в текущем цикле событий до `aclose`."""
+        await self.aclose()
+        self._client = self._new_client()
+        self._loop = asyncio.get_running_loop()
+
+    async def aclose(self, application: Any = None) -> None:
+        client, self._client = self._client, None
+        if client is not None and self._loop is asyncio.get_running_loop():
+            await client.aclose()
+
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        json: Optional[dict] = None,
+        idempotence_key: Optional[str] = None,
+    ) -> dict:
+        client = self._shared_client()
+        if client is None:
+            async with self._new_client() as client:
+                return await self._send(client, method, path, json, idempotence_key)
+        return await self._send(client, method, path, json, idempotence_key)
+
+    async def _send(
+        self,
+        client: httpx.AsyncClient,
+        method: str,
+        path: str,
+        json: Optional[dict],
+        idempotence_key: Optional[str],
+    ) -> dict:
+        headers = {'Idempotence-Key': idempotence_key} if idempotence_key else {}
+        for attempt in range(self.retries + 1):
+            try:
+                response = await client.request(method, path, json=json, headers=headers)
+            except httpx.TransportError as exc:
+                error = f'{type(exc).__name__}: {exc}'
+            else:
+                if response.status_code not in RETRY_STATUSES:
+                    if response.is_error:
+                        raise YooKassaError(f'{method} {path}: {response.status_code} {response.text[:200]}')
+                    return response.json()
+                error = f'HTTP {response.status_code}'
+            if attempt < self.retries:
+                logger.warning('YooKassa %s %s failed (%s), retrying', method, path, error)
+                await asyncio.sleep(self.retry_delay * 2 ** attempt)
+        raise YooKassaError(f'{method} {path}: {error}')
+
+    async def create_payment(
+        self,
+        amount: Decimal,
+        currency: str,
+        description: str,
+        idempotence_key: str,
+        metadata: Optional[dict] = None,
+    ) -> Payment:
+        data = await self._request(
+            'POST',
+            'payments',
+            json={
+                'amount': {'value': f'{amount:.2f}', 'currency': currency},
+                'capture': True,
+                'confirmation': {'type': 'redirect', 'return_url': settings.YOOKASSA_RETURN_URL},
+                'description': description[:128],
+                'metadata': metadata or {},
+            },
+            idempotence_key=idempotence_key,
+        )
+        return Payment.from_json(data)
+
+    async def get_payment(self, payment_id: str) -> Payment:
+        return Payment.from_json(await self._request('GET', f'payments/{payment_id}'))
+
+
+yookassa_client = YooKassaClient()
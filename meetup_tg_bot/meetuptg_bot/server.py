@@ -0,0 +1,57 @@
+"""Профили веб-сервиса под gunicorn: WSGI на sync-воркерах или ASGI на uvicorn.
+
+Sync-воркер занят запросом целиком, включая ожидание БД и сети, поэтому их
+берут с запасом — 2 × CPU + 1. ASGI-воркер обслуживает запросы конкурентно
+в своём event loop, и больше одного воркера на ядро не нужно. В режиме
+webhook бот живёт внутри веб-процесса, и воркер ровно один (см. `worker_count`).
+"""
+import os
+
+WSGI = 'wsgi'
+ASGI = 'asgi'
+
+APPLICATIONS = {
+    WSGI: 'meetuptg_bot.wsgi:application',
+    ASGI: 'meetuptg_bot.asgi:application',
+}
+
+WORKER_CLASSES = {
+    WSGI: 'sync',
+    ASGI: 'uvicorn.workers.UvicornWorker',
+}
+
+
+def default_mode(bot_mode: str) -> str:
+    """Бот в режиме webhook запускается из ASGI lifespan, поэтому ему нужен ASGI."""
+    return ASGI if bot_mode == 'webhook' else WSGI
+
+
+def check_webhook_workers(workers: int) -> None:
+    """Второй воркер в режиме webhook запустил бы второй набор фоновых служб бота."""
+    if workers > 1:
+        raise RuntimeError(
+            f'В режиме webhook бот запускается в каждом воркере, нужен ровно один (WEB_CONCURRENCY={workers})'
+        )
+
+
+def available_cpus() -> int:
+    """Ядра, на которых процессу разрешено работать (cpuset контейнера учитывается)."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def worker_count(mode: str, cpu_count: int, webhook: bool = False) -> int:
+    """Число воркеров gunicorn по умолчанию.
+
+    В режиме webhook каждый воркер в ASGI lifespan запускает своего бота вместе
+    с фоновыми службами: `BroadcastEngine`, `TalkScheduler`, `PgListener` и
+    `OutboxConsumer`. Во втором воркере они работали бы параллельно первым —
+    дважды переключали бы доклады и разбирали outbox, — поэтому воркер один.
+    """
+    if webhook:
+        return 1
+    if mode == ASGI:
+        return max(cpu_count, 1)
+    return 2 * cpu_count + 1
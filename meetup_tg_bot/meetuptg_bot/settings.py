@@ -16,6 +16,77 @@ SECRET_KEY = env('SECRET_KEY')
 DEBUG = env.bool('DEBUG', False)
 ALLOWED_HOSTS = env.list('ALLOWED_HOSTS', ['127.0.0.1', 'localhost'])
 TELEGRAM_BOT_TOKEN = env.str('TELEGRAM_BOT_TOKEN', default='')
+# свой сервер Bot API (или поддельный в benchmark_startup); пусто — api.telegram.org
+TELEGRAM_API_BASE_URL = env.str('TELEGRAM_API_BASE_URL', default='')
+
+# polling — отдельный процесс runbot, webhook — бот внутри ASGI-приложения
+TELEGRAM_BOT_MODE = env.str('TELEGRAM_BOT_MODE', default='polling')
+TELEGRAM_WEBHOOK_PATH = env.str('TELEGRAM_WEBHOOK_PATH', default='telegram/webhook/')
+TELEGRAM_WEBHOOK_URL = env.str('TELEGRAM_WEBHOOK_URL', default='')
+TELEGRAM_WEBHOOK_SECRET = env.str('TELEGRAM_WEBHOOK_SECRET', default='')
+
+# Сколько апдейтов обрабатывать одновременно (апдейты одного чата — всегда по очереди)
+BOT_CONCURRENT_UPDATES = env.int('BOT_CONCURRENT_UPDATES', 32)
+
+# Потоки для запросов к БД из бота; столько же соединений с Postgres держит процесс бота
+BOT_DB_POOL_SIZE = env.int('BOT_DB_POOL_SIZE', 8)
+# Сколько секунд поток пула держит своё соединение (и внутри ASGI-процесса в режиме webhook)
+BOT_DB_CONN_MAX_AGE = env.int('BOT_DB_CONN_MAX_AGE', 600)
+
+# Кеш участников бота: сколько держать в памяти и сколько копить новых перед записью (сек)
+BOT_IDENTITY_CACHE_SIZE = env.int('BOT_IDENTITY_CACHE_SIZE', 10000)
+BOT_IDENTITY_BATCH_WINDOW = env.float('BOT_IDENTITY_BATCH_WINDOW', 0.01)
+
+# Сколько секунд копить вопросы перед записью в БД и отправкой сводки спикеру
+QUESTION_FLUSH_INTERVAL = env.float('QUESTION_FLUSH_INTERVAL', 1.0)
+# Как часто повторять доставку вопросов, которые не ушли спикеру (сек), и сколько раз пытаться
+QUESTION_RETRY_INTERVAL = env.float('QUESTION_RETRY_INTERVAL', 60.0)
+QUESTION_MAX_DELIVERY_ATTEMPTS = env.int('QUESTION_MAX_DELIVERY_ATTEMPTS', 5)
+
+# Раз в сколько секунд сохранять user_data/chat_data и состояния диалогов в БД
+BOT_PERSISTENCE_INTERVAL = env.float('BOT_PERSISTENCE_INTERVAL', 5.0)
+
+# Рассылки: общий лимит Telegram ~30 сообщений в секунду, держим запас
+BROADCAST_RATE_PER_SECOND = env.float('BROADCAST_RATE_PER_SECOND', 25.0)
+BROADCAST_WORKERS = env.int('BROADCAST_WORKERS', 8)
+BROADCAST_CHUNK_SIZE = env.int('BROADCAST_CHUNK_SIZE', 200)
+BROADCAST_POLL_INTERVAL = env.float('BROADCAST_POLL_INTERVAL', 5.0)
+# Сколько секунд рассылка закреплена за процессом бота без продления (после падения её подхватит другой)
+BROADCAST_LEASE_SECONDS = env.float('BROADCAST_LEASE_SECONDS', 60.0)
+
+# Outbox правок из админки: сколько сообщений бот забирает за раз и как часто опрашивает
+# таблицу, когда LISTEN/NOTIFY недоступен (не Postgres или обрыв соединения)
+OUTBOX_BATCH_SIZE = env.int('OUTBOX_BATCH_SIZE', 100)
+OUTBOX_POLL_INTERVAL = env.float('OUTBOX_POLL_INTERVAL', 1.0)
+# После скольких падений обработчика сообщение outbox откладывается и больше не повторяется
+OUTBOX_MAX_ATTEMPTS = env.int('OUTBOX_MAX_ATTEMPTS', 5)
+
+# За сколько минут до начала доклада бот напоминает о нём подписчикам мероприятия
+TALK_REMINDER_LEAD_MINUTES = env.int('TALK_REMINDER_LEAD_MINUTES', 5)
+
+# Раз в сколько секунд бот пересчитывает статистику активных мероприятий для админки
+EVENT_STATS_REFRESH_INTERVAL = env.float('EVENT_STATS_REFRESH_INTERVAL', 60.0)
+
+# Метрики Prometheus: адрес в веб-приложении, токен для Authorization: Bearer (пусто — без
+# проверки) и порт HTTP-листенера в процессе бота (0 — выключен)
+METRICS_PATH = env.str('METRICS_PATH', default='metrics/')
+METRICS_TOKEN = env.str('METRICS_TOKEN', default='')
+BOT_METRICS_PORT = env.int('BOT_METRICS_PORT', 9100)
+BOT_METRICS_ADDR = env.str('BOT_METRICS_ADDR', default='0.0.0.0')
+
+# YooKassa: ключи магазина, адрес возврата после оплаты и пул HTTP-соединений к API
+YOOKASSA_SHOP_ID = env.str('YOOKASSA_SHOP_ID', default='')
+YOOKASSA_SECRET_KEY = env.str('YOOKASSA_SECRET_KEY', default='')
+YOOKASSA_API_URL = env.str('YOOKASSA_API_URL', default='https://api.yookassa.ru/v3/')
+YOOKASSA_RETURN_URL = env.str('YOOKASSA_RETURN_URL', default='https://t.me/')
+YOOKASSA_WEBHOOK_PATH = env.str('YOOKASSA_WEBHOOK_PATH', default='yookassa/webhook/')
+YOOKASSA_TIMEOUT = env.float('YOOKASSA_TIMEOUT', 10.0)
+YOOKASSA_CONNECT_TIMEOUT = env.float('YOOKASSA_CONNECT_TIMEOUT', 3.0)
+YOOKASSA_MAX_CONNECTIONS = env.int('YOOKASSA_MAX_CONNECTIONS', 20)
+YOOKASSA_RETRIES = env.int('YOOKASSA_RETRIES', 3)
+
+# Суммы на кнопках доната, в рублях
+DONATION_AMOUNTS = env.list('DONATION_AMOUNTS', [100, 300, 500, 1000], subcast=int)
 
 
 # Application definition
@@ -32,6 +103,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # статика отдаётся до сессий и CSRF, не занимая воркер на обычном пути запроса
+    'meetuptg_bot.static.StaticFilesMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -69,7 +142,8 @@ DATABASES = {
         'PASSWORD': os.getenv('POSTGRES_PASSWORD'),
         'HOST': os.getenv('POSTGRES_HOST', 'localhost'),
         'PORT': os.getenv('POSTGRES_PORT', '5432'),
-        'CONN_MAX_AGE': 600,
+        # для ASGI-воркеров gunicorn.conf.py выставляет 0
+        'CONN_MAX_AGE': env.int('DB_CONN_MAX_AGE', 600),
         'CONN_HEALTH_CHECKS': True,
     }
 }
@@ -111,4 +185,11 @@ STATICFILES_DIRS = [
 STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
+# collectstatic добавляет к именам файлов хеш содержимого и кладёт рядом .gz и .br;
+# WhiteNoise отдаёт их с Cache-Control на год (immutable), ETag и ответом 304
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage'},
+}
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -0,0 +1,54 @@
+"""WhiteNoise, который не мешает async-стеку Django под ASGI.
+
+Стандартный `WhiteNoiseMiddleware` только синхронный: под ASGI из-за него
+каждый запрос, включая async-вьюхи вебхуков, перекладывался бы в поток.
+Здесь тот же индекс файлов и те же заголовки, но middleware работает в обоих
+режимах. Под WSGI файл отдаётся как `FileResponse` через `wsgi.file_wrapper`
+(sendfile у gunicorn), под ASGI — асинхронными кусками, чтение идёт в пуле
+потоков и не блокирует event loop.
+"""
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.http import StreamingHttpResponse
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+CHUNK_SIZE = 64 * 1024
+
+
+async def _file_chunks(file):
+    read = sync_to_async(file.read, thread_sensitive=False)
+    try:
+        while chunk := await read(CHUNK_SIZE):
+            yield chunk
+    finally:
+        file.close()
+
+
+class StaticFilesMiddleware(WhiteNoiseMiddleware):
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file, thread_sensitive=False)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is None:
+            return await self.get_response(request)
+
+        response = static_file.get_response(request.method, request.META)
+        content = _file_chunks(response.file) if response.file is not None else ()
+        http_response = StreamingHttpResponse(content, status=int(response.status))
+        del http_response['Content-Type']
+        for key, value in response.headers:
+            http_response[key] = value
+        return http_response
@@ -19,18 +19,23 @@ from django.urls import path, re_path
 from django.conf import settings
 from django.views.static import serve
 
+from meetbot.views import health, metrics, telegram_webhook, yookassa_webhook
+
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path(settings.TELEGRAM_WEBHOOK_PATH, telegram_webhook, name='telegram-webhook'),
+    path(settings.YOOKASSA_WEBHOOK_PATH, yookassa_webhook, name='yookassa-webhook'),
+    path(settings.METRICS_PATH, metrics, name='metrics'),
+    path('health/', health, name='health'),
 ]
 
-# Обслуживание статических файлов в production
+# Статику в production отдаёт WhiteNoise (см. STORAGES в settings)
 if settings.DEBUG:
     from django.conf.urls.static import static
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
 else:
-    # Для production используем встроенный serve
+    # загрузок в проекте нет; если появятся, их лучше отдавать nginx
     urlpatterns += [
-        re_path(r'^static/(?P<path>.*)$', serve, {'document_root': settings.STATIC_ROOT}),
         re_path(r'^media/(?P<path>.*)$', serve, {'document_root': settings.MEDIA_ROOT}),
     ]